@@ -1,32 +1,84 @@
 """Application configuration settings."""
-from pydantic_settings import BaseSettings
-from pydantic import ConfigDict
-from typing import Optional
+import os
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Any, Dict
 
+from dotenv import dotenv_values
 
-class Settings(BaseSettings):
+
+_TRUE_VALUES = frozenset({"1", "true", "yes", "on"})
+
+
+@dataclass(frozen=True)
+class Settings:
     """Application settings loaded from environment variables."""
-    
+
     # Database
     database_url: str = "sqlite:///./workflow.db"
-    
+    # Connection pool of file-backed SQLite and server databases
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    db_pool_recycle: int = 1800  # seconds, server databases only
+
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     api_reload: bool = True
-    
+    cors_origins: str = "http://localhost:3000,http://localhost:8000"  # comma-separated
+
     # Worker
     max_workers: int = 5
     task_timeout: int = 300  # seconds
-    
+    # Cap on workflow runs in flight at once (0 = only bounded by the DB pool)
+    max_concurrent_runs: int = 0
+    # Insert a run's transition rows together when it ends instead of one per state.
+    # The history endpoints don't show a run's transitions until then.
+    batch_transitions: bool = False
+    # Move finished workflows older than this many days to the archive table (0 = never)
+    archive_after_days: int = 0
+    archive_interval: int = 3600  # seconds between archive passes
+
     # Logging
     log_level: str = "INFO"
-    
-    model_config = ConfigDict(
-        env_file=".env",
-        case_sensitive=False
-    )
+
+    @classmethod
+    def from_env(cls, env_file: str = ".env") -> "Settings":
+        """
+        Build settings from the environment.
+
+        Variables are matched case-insensitively; real environment variables
+        take precedence over values from `env_file`.
+
+        Args:
+            env_file: Optional dotenv file to read defaults from
+        """
+        raw: Dict[str, Any] = {}
+        for source in (dotenv_values(env_file), os.environ):
+            raw.update({key.lower(): value for key, value in source.items() if value is not None})
+
+        values = {}
+        for field in fields(cls):
+            if field.name in raw:
+                values[field.name] = _coerce(raw[field.name], field.type, field.name)
+        return cls(**values)
+
+
+def _coerce(value: str, target: type, name: str) -> Any:
+    """Convert a raw environment string to the field's type."""
+    if target is bool:
+        return value.strip().lower() in _TRUE_VALUES
+    try:
+        return target(value)
+    except ValueError:
+        raise ValueError(f"Invalid value for {name.upper()}: {value!r}")
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, parsing the environment only once."""
+    return Settings.from_env()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
@@ -10,15 +10,23 @@ This demo showcases the key features of the workflow orchestrator:
 6. System statistics and resource monitoring
 """
 import asyncio
-import requests
+import sys
 import time
-import json
-from typing import Optional, Dict, Any
-from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Dict, Any, Tuple
+
+if TYPE_CHECKING:
+    import httpx
 
 
 # API Configuration
 BASE_URL = "http://localhost:8000"
+
+# Shared client so every helper reuses pooled keep-alive connections
+# instead of paying a fresh TCP handshake per request. Created in _run()
+# so that `--help` doesn't pay for building the SSL context.
+_client: Optional["httpx.AsyncClient"] = None
+
 COLORS = {
     'HEADER': '\033[95m',
     'BLUE': '\033[94m',
@@ -30,10 +38,53 @@ COLORS = {
     'BOLD': '\033[1m',
 }
 
+# Message prefixes and templates built once instead of on every print
+END = COLORS['END']
+COLOR_BYTES = {name: code.encode() for name, code in COLORS.items()}
+GREEN_CHECK = COLOR_BYTES['GREEN'] + "✓ ".encode()
+RED_CROSS = COLOR_BYTES['RED'] + "✗ ".encode()
+CYAN_INFO = COLOR_BYTES['CYAN'] + "ℹ ".encode()
+YELLOW_WARN = COLOR_BYTES['YELLOW'] + "⚠ ".encode()
+STATE_LINE = {
+    color: COLORS[color] + "[{timestamp}] State: {state} → Status: {status}" + END
+    for color in ('GREEN', 'YELLOW')
+}
+
 
-def print_banner():
-    """Print a welcome banner."""
-    banner = f"""
+_last_second = 0
+_last_timestamp = ""
+
+
+def _timestamp() -> str:
+    """Return the current wall-clock time as HH:MM:SS, formatted at most once per second."""
+    global _last_second, _last_timestamp
+    second = int(time.time())
+    if second != _last_second:
+        _last_second = second
+        _last_timestamp = time.strftime('%H:%M:%S', time.localtime(second))
+    return _last_timestamp
+
+
+def _write(data: bytes):
+    """Write pre-encoded output straight to the stdout byte buffer."""
+    buffer = getattr(sys.stdout, 'buffer', None)
+    if buffer is None:
+        # stdout replaced by a text-only stream (e.g. captured output)
+        sys.stdout.write(data.decode())
+        return
+    # Push out anything print() left in the text layer so lines stay ordered
+    sys.stdout.flush()
+    buffer.write(data)
+    if sys.stdout.line_buffering:
+        buffer.flush()
+
+
+def _emit(prefix: bytes, message: str, end: bytes = COLOR_BYTES['END']):
+    """Write a colored line."""
+    _write(prefix + message.encode() + end + b"\n")
+
+
+_BANNER = f"""
 {COLORS['CYAN']}{COLORS['BOLD']}
 ╔════════════════════════════════════════════════════════════════════╗
 ║                                                                    ║
@@ -48,51 +99,81 @@ def print_banner():
 ║                                                                    ║
 ╚════════════════════════════════════════════════════════════════════╝
 {COLORS['END']}
-    """
-    print(banner)
+    
+""".encode()
+
+
+def print_banner():
+    """Print a welcome banner."""
+    _write(_BANNER)
+
+
+@lru_cache(maxsize=32)
+def _section(title: str, color: str) -> bytes:
+    """Render a section header once per (title, color)."""
+    width = 70
+    lines = [
+        f"\n{COLORS[color]}{COLORS['BOLD']}",
+        "=" * width,
+        f"  {title}",
+        "=" * width,
+        COLORS['END'],
+    ]
+    return ("\n".join(lines) + "\n").encode()
 
 
 def print_section(title: str, color: str = 'BLUE'):
     """Print a formatted section header."""
-    width = 70
-    print(f"\n{COLORS[color]}{COLORS['BOLD']}")
-    print("=" * width)
-    print(f"  {title}")
-    print("=" * width)
-    print(COLORS['END'])
+    _write(_section(title, color))
 
 
 def print_success(message: str):
     """Print a success message."""
-    print(f"{COLORS['GREEN']}✓ {message}{COLORS['END']}")
+    _emit(GREEN_CHECK, message)
 
 
 def print_error(message: str):
     """Print an error message."""
-    print(f"{COLORS['RED']}✗ {message}{COLORS['END']}")
+    _emit(RED_CROSS, message)
 
 
 def print_info(message: str):
     """Print an info message."""
-    print(f"{COLORS['CYAN']}ℹ {message}{COLORS['END']}")
+    _emit(CYAN_INFO, message)
 
 
 def print_warning(message: str):
     """Print a warning message."""
-    print(f"{COLORS['YELLOW']}⚠ {message}{COLORS['END']}")
+    _emit(YELLOW_WARN, message)
 
 
-def check_server_health() -> bool:
+async def is_server_listening(timeout: float = 0.5) -> bool:
+    """Cheap liveness probe: check that the API port accepts TCP connections."""
+    url = httpx.URL(BASE_URL)
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(url.host, url.port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    await writer.wait_closed()
+    return True
+
+
+async def check_server_health() -> bool:
     """Check if the API server is running."""
+    # Fail fast without an HTTP round trip when nothing is listening
+    if not await is_server_listening():
+        return False
+    
     try:
-        response = requests.get(f"{BASE_URL}/health", timeout=5)
+        response = await _client.get("/health", timeout=5)
         print(response.text)
         return response.status_code == 200
-    except requests.exceptions.RequestException:
+    except httpx.HTTPError:
         return False
 
 
-def start_workflow(name: str, description: str, config: Optional[Dict[str, Any]] = None, auto_start: bool = True) -> Optional[int]:
+async def start_workflow(name: str, description: str, config: Optional[Dict[str, Any]] = None, auto_start: bool = True) -> Optional[int]:
     """Start a new workflow."""
     payload = {
         "name": name,
@@ -102,32 +183,74 @@ def start_workflow(name: str, description: str, config: Optional[Dict[str, Any]]
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/workflow/start", json=payload)
+        response = await _client.post("/workflow/start", json=payload)
         response.raise_for_status()
-        result = response.json()
+        result = orjson.loads(response.content)
         
         print_success(f"Workflow Created: ID={result['workflow_id']}, State={result['current_state']}")
         print(f"  Name: {result['name']}")
         print(f"  Status: {result['status']}")
         
         return result['workflow_id']
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print_error(f"Failed to start workflow: {e}")
         return None
 
 
-def get_workflow_status(workflow_id: int) -> Optional[Dict[str, Any]]:
+# Last (ETag, status) seen per workflow, for conditional status requests
+_status_etags: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+
+
+async def get_workflow_status(workflow_id: int) -> Optional[Dict[str, Any]]:
     """Get current workflow status."""
+    cached = _status_etags.get(workflow_id)
+    headers = {"If-None-Match": cached[0]} if cached else None
     try:
-        response = requests.get(f"{BASE_URL}/workflow/{workflow_id}")
+        response = await _client.get(f"/workflow/{workflow_id}", headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1]
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        status = orjson.loads(response.content)
+        etag = response.headers.get("etag")
+        if etag:
+            _status_etags[workflow_id] = (etag, status)
+        return status
+    except httpx.HTTPError as e:
         print_error(f"Failed to get workflow status: {e}")
         return None
 
 
-def monitor_workflow(workflow_id: int, max_wait: int = 30, show_progress: bool = True) -> Optional[Dict[str, Any]]:
+async def wait_for_state_change(workflow_id: int, since_state: Optional[str], timeout: float = 25) -> Optional[Dict[str, Any]]:
+    """Long-poll until the workflow leaves `since_state` or the timeout expires."""
+    params = {"timeout": timeout}
+    if since_state is not None:
+        params["since_state"] = since_state
+    
+    try:
+        response = await _client.get(f"/workflow/{workflow_id}/wait", params=params, timeout=timeout + 5)
+        if response.status_code == 404 and orjson.loads(response.content).get('detail') == 'Not Found':
+            # Server predates the /wait endpoint
+            return await poll_for_state_change(workflow_id, since_state, timeout)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    except httpx.HTTPError as e:
+        print_error(f"Failed to get workflow status: {e}")
+        return None
+
+
+async def poll_for_state_change(workflow_id: int, since_state: Optional[str], timeout: float = 25) -> Optional[Dict[str, Any]]:
+    """Poll with exponential backoff until the workflow leaves `since_state` or the timeout expires."""
+    deadline = time.time() + timeout
+    delay = 0.1
+    while True:
+        status = await get_workflow_status(workflow_id)
+        if not status or status['current_state'] != since_state or time.time() >= deadline:
+            return status
+        await asyncio.sleep(min(delay, max(deadline - time.time(), 0)))
+        delay = min(delay * 1.5, 1.0)
+
+
+async def monitor_workflow(workflow_id: int, max_wait: int = 30, show_progress: bool = True) -> Optional[Dict[str, Any]]:
     """Monitor workflow execution until completion."""
     if show_progress:
         print_info(f"Monitoring workflow {workflow_id}...")
@@ -136,7 +259,8 @@ def monitor_workflow(workflow_id: int, max_wait: int = 30, show_progress: bool =
     previous_state = None
     
     while time.time() - start_time < max_wait:
-        status = get_workflow_status(workflow_id)
+        remaining = max_wait - (time.time() - start_time)
+        status = await wait_for_state_change(workflow_id, previous_state, timeout=min(25, remaining))
         if not status:
             return None
         
@@ -144,10 +268,9 @@ def monitor_workflow(workflow_id: int, max_wait: int = 30, show_progress: bool =
         
         # Print state changes
         if show_progress and current_state != previous_state:
-            timestamp = datetime.now().strftime('%H:%M:%S')
+            timestamp = _timestamp()
             state_color = 'GREEN' if status['status'] == 'COMPLETE' else 'YELLOW'
-            print(f"{COLORS[state_color]}[{timestamp}] State: {current_state} → Status: {status['status']}{COLORS['END']}")
-            previous_state = current_state
+            print(STATE_LINE[state_color].format(timestamp=timestamp, state=current_state, status=status['status']))
         
         # Check if workflow is complete
         if status['status'] in ['COMPLETE', 'FAILED', 'CANCELLED']:
@@ -159,16 +282,16 @@ def monitor_workflow(workflow_id: int, max_wait: int = 30, show_progress: bool =
                 print_warning(f"Workflow {workflow_id} was cancelled")
             break
         
-        time.sleep(0.5)
+        previous_state = current_state
     else:
         print_warning(f"Monitoring timeout reached ({max_wait}s)")
     
     return status
 
 
-def print_workflow_details(workflow_id: int):
+async def print_workflow_details(workflow_id: int):
     """Print detailed workflow information."""
-    status = get_workflow_status(workflow_id)
+    status = await get_workflow_status(workflow_id)
     if not status:
         return
     
@@ -197,54 +320,55 @@ def print_workflow_details(workflow_id: int):
         print(f"\n{COLORS['BOLD']}Task Results by State:{COLORS['END']}")
         for state, result in status['task_results'].items():
             print(f"  {COLORS['CYAN']}{state}:{COLORS['END']}")
-            print(f"    {json.dumps(result['result'], indent=6)}")
+            pretty = orjson.dumps(result['result'], option=orjson.OPT_INDENT_2).decode()
+            print("    " + pretty.replace("\n", "\n    "))
 
 
-def trigger_next_step(workflow_id: int) -> bool:
+async def trigger_next_step(workflow_id: int) -> bool:
     """Manually trigger the next step."""
     try:
-        response = requests.post(f"{BASE_URL}/workflow/{workflow_id}/next")
+        response = await _client.post(f"/workflow/{workflow_id}/next")
         response.raise_for_status()
-        result = response.json()
+        result = orjson.loads(response.content)
         print_success(f"{result['message']} → State: {result['current_state']}")
         return True
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print_error(f"Failed to trigger next step: {e}")
         return False
 
 
-def retry_workflow(workflow_id: int) -> bool:
+async def retry_workflow(workflow_id: int) -> bool:
     """Retry a failed workflow."""
     try:
-        response = requests.post(f"{BASE_URL}/workflow/{workflow_id}/retry")
+        response = await _client.post(f"/workflow/{workflow_id}/retry")
         response.raise_for_status()
-        result = response.json()
+        result = orjson.loads(response.content)
         print_success(f"Retry initiated (attempt #{result['retries']}) → State: {result['current_state']}")
         return True
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print_error(f"Failed to retry workflow: {e}")
         return False
 
 
-def cancel_workflow(workflow_id: int) -> bool:
+async def cancel_workflow(workflow_id: int) -> bool:
     """Cancel a workflow."""
     try:
-        response = requests.post(f"{BASE_URL}/workflow/{workflow_id}/cancel")
+        response = await _client.post(f"/workflow/{workflow_id}/cancel")
         response.raise_for_status()
-        result = response.json()
+        result = orjson.loads(response.content)
         print_success(result['message'])
         return True
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print_error(f"Failed to cancel workflow: {e}")
         return False
 
 
-def get_system_stats():
+async def get_system_stats():
     """Get and display system execution statistics."""
     try:
-        response = requests.get(f"{BASE_URL}/execution/stats")
+        response = await _client.get("/execution/stats")
         response.raise_for_status()
-        stats = response.json()
+        stats = orjson.loads(response.content)
         
         print(f"\n{COLORS['BOLD']}System Statistics:{COLORS['END']}")
         print(f"\n{COLORS['CYAN']}Worker Pool:{COLORS['END']}")
@@ -257,17 +381,17 @@ def get_system_stats():
             print(f"  {status_name.capitalize()}: {count}")
         
         return stats
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print_error(f"Failed to get system stats: {e}")
         return None
 
 
-def list_workflows():
+async def list_workflows():
     """List all workflows."""
     try:
-        response = requests.get(f"{BASE_URL}/workflows/")
+        response = await _client.get("/workflows/summary")
         response.raise_for_status()
-        workflows = response.json()
+        workflows = orjson.loads(response.content)
         
         if not workflows:
             print_info("No workflows found")
@@ -280,67 +404,67 @@ def list_workflows():
             print(f"  [{wf['id']}] {wf['name']} - {COLORS[status_color]}{wf['status']}{COLORS['END']} ({wf['current_state']})")
         
         return workflows
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print_error(f"Failed to list workflows: {e}")
         return []
 
 
-def demo_automatic_workflow():
+async def demo_automatic_workflow():
     """Demo 1: Automatic workflow execution."""
     print_section("Demo 1: Automatic Workflow Execution", 'HEADER')
     print_info("Starting a workflow that automatically progresses through all states")
     
-    workflow_id = start_workflow(
+    workflow_id = await start_workflow(
         "Data Processing Pipeline",
         "Demonstrates automatic state progression: INIT → PREPARE → EXECUTE → VALIDATE → COMPLETE"
     )
     
     if workflow_id:
-        time.sleep(1)
-        final_status = monitor_workflow(workflow_id, max_wait=30)
+        await asyncio.sleep(1)
+        final_status = await monitor_workflow(workflow_id, max_wait=30)
         
         if final_status:
             print("\n")
-            print_workflow_details(workflow_id)
+            await print_workflow_details(workflow_id)
         
         return workflow_id
     return None
 
 
-def demo_manual_workflow():
+async def demo_manual_workflow():
     """Demo 2: Manual step-by-step execution."""
     print_section("Demo 2: Manual Step-by-Step Execution", 'HEADER')
     print_info("Starting a workflow and manually triggering each state transition")
     
-    workflow_id = start_workflow(
+    workflow_id = await start_workflow(
         "Manual Processing Workflow",
         "Demonstrates manual control over workflow progression",
         auto_start=False
     )
     
     if workflow_id:
-        time.sleep(2)
+        await asyncio.sleep(2)
         
         print_info("\nManually advancing through states...")
         
         # Trigger each step manually (INIT -> PREPARE -> EXECUTE -> VALIDATE -> COMPLETE)
         states = ['PREPARE', 'EXECUTE', 'VALIDATE', 'COMPLETE']
         for expected_state in states:
-            time.sleep(1.5)
-            if trigger_next_step(workflow_id):
-                status = get_workflow_status(workflow_id)
+            await asyncio.sleep(1.5)
+            if await trigger_next_step(workflow_id):
+                status = await get_workflow_status(workflow_id)
                 if status:
                     print(f"  Current State: {COLORS['CYAN']}{status['current_state']}{COLORS['END']}")
         
-        time.sleep(1)
+        await asyncio.sleep(1)
         print("\n")
-        print_workflow_details(workflow_id)
+        await print_workflow_details(workflow_id)
         
         return workflow_id
     return None
 
 
-def demo_concurrent_workflows():
+async def demo_concurrent_workflows():
     """Demo 3: Multiple concurrent workflows."""
     print_section("Demo 3: Concurrent Workflow Execution", 'HEADER')
     print_info("Starting multiple workflows simultaneously to demonstrate parallel execution")
@@ -349,27 +473,29 @@ def demo_concurrent_workflows():
     
     # Start multiple workflows
     for i in range(3):
-        workflow_id = start_workflow(
+        workflow_id = await start_workflow(
             f"Concurrent Workflow #{i+1}",
             f"Parallel execution demo - Workflow {i+1}",
             {"priority": "normal", "worker_id": i+1}
         )
         if workflow_id:
             workflow_ids.append(workflow_id)
-        time.sleep(0.3)
+        await asyncio.sleep(0.3)
     
     print_info(f"\nStarted {len(workflow_ids)} workflows, monitoring completion...")
     
-    # Monitor all workflows
-    for wf_id in workflow_ids:
+    # Monitor all workflows concurrently
+    await asyncio.gather(*[
         monitor_workflow(wf_id, max_wait=15, show_progress=False)
+        for wf_id in workflow_ids
+    ])
     
     print_success(f"\nAll {len(workflow_ids)} workflows completed!")
     
     # Show summary
     print(f"\n{COLORS['BOLD']}Summary:{COLORS['END']}")
-    for wf_id in workflow_ids:
-        status = get_workflow_status(wf_id)
+    statuses = await asyncio.gather(*[get_workflow_status(wf_id) for wf_id in workflow_ids])
+    for wf_id, status in zip(workflow_ids, statuses):
         if status:
             status_symbol = '✓' if status['status'] == 'COMPLETE' else '✗'
             print(f"  {status_symbol} Workflow {wf_id}: {status['name']} - {status['status']}")
@@ -377,10 +503,10 @@ def demo_concurrent_workflows():
     return workflow_ids
 
 
-def inject_failed_workflow() -> Optional[int]:
+async def inject_failed_workflow() -> Optional[int]:
     """Helper to create a workflow that is guaranteed to fail."""
     print_info("Injecting a failed workflow...")
-    return start_workflow(
+    return await start_workflow(
         "Flaky Workflow",
         "Demonstrates retry mechanism by simulating failure on first attempt",
         config={
@@ -391,50 +517,50 @@ def inject_failed_workflow() -> Optional[int]:
     )
 
 
-def demo_retry_mechanism():
+async def demo_retry_mechanism():
     """Demo 4: Workflow retry after failure."""
     print_section("Demo 4: Retry Mechanism", 'HEADER')
     print_info("Starting a workflow configured to fail initially, then succeeding on retry")
     
     # Start workflow with failure simulation
-    workflow_id = inject_failed_workflow()
+    workflow_id = await inject_failed_workflow()
     
     if workflow_id:
-        time.sleep(1)
+        await asyncio.sleep(1)
         print_info("Monitoring workflow (expecting failure)...")
         
         # Monitor until failure
-        status = monitor_workflow(workflow_id, max_wait=15)
+        status = await monitor_workflow(workflow_id, max_wait=15)
         
         if status and status['status'] == 'FAILED':
             print("\n")
             print_warning(f"Workflow failed as expected: {status.get('error_message')}")
             
-            time.sleep(1)
+            await asyncio.sleep(1)
             print_info("Initiating retry...")
             
             # Retry workflow
-            if retry_workflow(workflow_id):
-                time.sleep(1)
+            if await retry_workflow(workflow_id):
+                await asyncio.sleep(1)
                 print_info("Monitoring workflow after retry (expecting success)...")
-                monitor_workflow(workflow_id, max_wait=15)
+                await monitor_workflow(workflow_id, max_wait=15)
                 
                 print("\n")
-                print_workflow_details(workflow_id)
+                await print_workflow_details(workflow_id)
         else:
             print_warning("Workflow did not fail as expected!")
 
 
-def demo_system_monitoring():
+async def demo_system_monitoring():
     """Demo 5: System statistics and monitoring."""
     print_section("Demo 5: System Monitoring & Statistics", 'HEADER')
     
-    get_system_stats()
+    await get_system_stats()
     print("\n")
-    list_workflows()
+    await list_workflows()
 
 
-def interactive_menu():
+async def interactive_menu():
     """Interactive menu for exploring features."""
     print_section("Interactive Mode", 'HEADER')
     
@@ -460,22 +586,22 @@ def interactive_menu():
                 desc = input("Description: ").strip()
                 auto_start_input = input("Auto-start workflow? (y/N): ").strip().lower()
                 auto_start = auto_start_input == 'y' or auto_start_input == 'yes'
-                start_workflow(name, desc, auto_start=auto_start)
+                await start_workflow(name, desc, auto_start=auto_start)
             elif choice == '2':
                 wf_id = int(input("Workflow ID: ").strip())
-                trigger_next_step(wf_id)
+                await trigger_next_step(wf_id)
             elif choice == '3':
                 wf_id = int(input("Workflow ID: ").strip())
-                cancel_workflow(wf_id)
+                await cancel_workflow(wf_id)
             elif choice == '4':
                 wf_id = int(input("Workflow ID: ").strip())
-                print_workflow_details(wf_id)
+                await print_workflow_details(wf_id)
             elif choice == '5':
-                list_workflows()
+                await list_workflows()
             elif choice == '6':
-                get_system_stats()
+                await get_system_stats()
             elif choice == '7':
-                run_all_demos()
+                await run_all_demos(verify_server=False)
             else:
                 print_warning("Invalid choice, please try again")
         except KeyboardInterrupt:
@@ -485,13 +611,20 @@ def interactive_menu():
             print_error(f"Error: {e}")
 
 
-def run_all_demos():
-    """Run all demonstration scenarios."""
+async def run_all_demos(verify_server: bool = True):
+    """
+    Run all demonstration scenarios.
+    
+    Args:
+        verify_server: Run the full /health check first; interactive mode
+            has already done so and only needs the cheap liveness probe
+    """
     print_banner()
     
     # Check server health
     print_info("Checking server connection...")
-    if not check_server_health():
+    healthy = await check_server_health() if verify_server else await is_server_listening()
+    if not healthy:
         print_error("Cannot connect to API server at " + BASE_URL)
         print_info("Please start the server with: python main.py")
         return
@@ -499,19 +632,19 @@ def run_all_demos():
     print_success("Connected to server successfully!\n")
     
     # Run demos
-    demo_automatic_workflow()
-    time.sleep(2)
+    await demo_automatic_workflow()
+    await asyncio.sleep(2)
     
-    demo_manual_workflow()
-    time.sleep(2)
+    await demo_manual_workflow()
+    await asyncio.sleep(2)
     
-    demo_concurrent_workflows()
-    time.sleep(2)
+    await demo_concurrent_workflows()
+    await asyncio.sleep(2)
     
-    demo_retry_mechanism()
-    time.sleep(1)
+    await demo_retry_mechanism()
+    await asyncio.sleep(1)
     
-    demo_system_monitoring()
+    await demo_system_monitoring()
     
     # Final summary
     print_section("Demo Complete!", 'GREEN')
@@ -532,30 +665,71 @@ def run_all_demos():
     print("  • Worker pool resource management")
 
 
-def main():
-    """Main entry point."""
-    import sys
-    
+async def _main():
+    """Dispatch on command line arguments."""
     if len(sys.argv) > 1:
         if sys.argv[1] == '--interactive' or sys.argv[1] == '-i':
             print_banner()
-            if not check_server_health():
+            if not await check_server_health():
                 print_error("Cannot connect to API server at " + BASE_URL)
                 print_info("Please start the server with: python main.py")
                 return
             print_success("Connected to server successfully!\n")
-            interactive_menu()
-        elif sys.argv[1] == '--help' or sys.argv[1] == '-h':
-            print("Usage: python demo.py [OPTIONS]")
-            print("\nOptions:")
-            print("  (none)        Run all automated demos")
-            print("  -i, --interactive   Start interactive mode")
-            print("  -h, --help         Show this help message")
+            await interactive_menu()
         else:
             print_warning(f"Unknown option: {sys.argv[1]}")
             print("Use --help for usage information")
     else:
-        run_all_demos()
+        await run_all_demos()
+
+
+async def _run():
+    """Run the demo and release pooled connections on exit."""
+    # Imported here rather than at the top so `--help` doesn't pay for them,
+    # binding the module globals every helper below uses
+    global _client, httpx, orjson
+    import httpx
+    import orjson
+    
+    # Retry connection failures (e.g. a keep-alive socket the server already
+    # closed) instead of surfacing them as failed demo steps
+    transport = httpx.AsyncHTTPTransport(
+        retries=2,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+    _client = httpx.AsyncClient(
+        base_url=BASE_URL,
+        transport=transport,
+        headers={"Connection": "keep-alive"},
+        timeout=30.0,
+    )
+    try:
+        await _main()
+    finally:
+        await _client.aclose()
+
+
+def print_usage():
+    """Print command line usage."""
+    print("Usage: python demo.py [OPTIONS]")
+    print("\nOptions:")
+    print("  (none)        Run all automated demos")
+    print("  -i, --interactive   Start interactive mode")
+    print("  -h, --help         Show this help message")
+
+
+def main():
+    """Main entry point."""
+    if len(sys.argv) > 1 and sys.argv[1] in ('--help', '-h'):
+        # No event loop or HTTP client needed just to print usage
+        print_usage()
+        return
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass  # e.g. on Windows, the default loop works too
+    asyncio.run(_run())
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 """Main application entry point."""
+import asyncio
 import logging
 import sys
 from pathlib import Path
@@ -7,13 +8,7 @@ from contextlib import asynccontextmanager
 # Add src to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-
 from config import settings
-from src.db import init_db
-from src.api import workflow_router, task_router, execution_router, workflow_api_router
-from src.core.logging import setup_logging
 
 
 # Initialize logging immediately for module-level logs
@@ -22,86 +17,148 @@ logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
-async def lifespan(app: FastAPI):
+async def lifespan(app):
     """Manage application lifespan."""
+    from src.db import init_db
+    from src.api.execution import get_worker_manager
+
     # Startup
     logger.info("Starting Async Workflow Orchestrator")
-    logger.info(f"Database URL: {settings.database_url}")
-    
+    logger.info("Database URL: %s", settings.database_url)
+
     # Initialize database
     init_db()
     logger.info("Database initialized")
-    
+
+    # Build the worker pool up front instead of on the first request
+    get_worker_manager()
+
+    # Sync endpoints run in AnyIO's thread pool (40 threads by default); let it
+    # grow to what the DB pool can serve so requests queue on the pool, not the threads
+    import anyio.to_thread
+    from src.db import pool_capacity
+    capacity = pool_capacity()
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    if capacity is not None and capacity > limiter.total_tokens:
+        limiter.total_tokens = capacity
+        logger.info("Request thread pool raised to %s threads", capacity)
+
+    # Keep finished workflows out of the live tables once they are old enough
+    archiver = None
+    if settings.archive_after_days > 0:
+        from src.core.archive import archive_periodically
+        archiver = asyncio.create_task(
+            archive_periodically(settings.archive_after_days, settings.archive_interval)
+        )
+
     yield
-    
+
     # Shutdown
     logger.info("Shutting down Async Workflow Orchestrator")
-    
-    # Shutdown worker manager if it exists
-    from src.api.execution import _worker_manager
+    if archiver is not None:
+        archiver.cancel()
+        await asyncio.gather(archiver, return_exceptions=True)
+
+    # Stop in-flight workflow runs, then the worker manager if it exists
+    from src.api.execution import _worker_manager, cancel_running_workflows
+    await cancel_running_workflows()
     if _worker_manager:
         _worker_manager.shutdown()
 
 
-# Create FastAPI app
-app = FastAPI(
-    title="Async Workflow Orchestrator",
-    description="A lightweight workflow orchestrator using async I/O, threads, and state machines",
-    version="1.0.0",
-    lifespan=lifespan,
-)
+def create_app():
+    """
+    Build the FastAPI application.
+
+    FastAPI, SQLAlchemy and the routers are imported here rather than at
+    module level so that CLI paths such as `--help` stay fast.
+    """
+    from fastapi import FastAPI
+    from fastapi.responses import ORJSONResponse
+    from fastapi.middleware.cors import CORSMiddleware
+
+    from src.api import workflow_router, task_router, execution_router, workflow_api_router
+
+    # Create FastAPI app
+    app = FastAPI(
+        title="Async Workflow Orchestrator",
+        description="A lightweight workflow orchestrator using async I/O, threads, and state machines",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
+
+    # Add CORS middleware
+    # Explicit lists are matched exactly instead of echoing every request
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[origin.strip() for origin in settings.cors_origins.split(",") if origin.strip()],
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE"],
+        allow_headers=["Content-Type", "If-None-Match"],
+        expose_headers=["ETag"],
+    )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    # Include routers
+    app.include_router(workflow_api_router)  # New simplified /workflow/* endpoints
+    app.include_router(workflow_router)
+    app.include_router(task_router)
+    app.include_router(execution_router)
 
-# Include routers
-app.include_router(workflow_api_router)  # New simplified /workflow/* endpoints
-app.include_router(workflow_router)
-app.include_router(task_router)
-app.include_router(execution_router)
+    @app.get("/")
+    async def root():
+        """Root endpoint."""
+        return {
+            "message": "Async Workflow Orchestrator API",
+            "version": "1.0.0",
+            "docs": "/docs",
+        }
 
+    @app.get("/health")
+    async def health_check():
+        """Health check endpoint."""
+        return {"status": "healthy"}
 
-@app.get("/")
-async def root():
-    """Root endpoint."""
-    return {
-        "message": "Async Workflow Orchestrator API",
-        "version": "1.0.0",
-        "docs": "/docs",
-    }
+    return app
 
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+def __getattr__(name):
+    """Build `app` on first access (e.g. by uvicorn or the tests)."""
+    if name == "app":
+        app = create_app()
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    import uvicorn
     import argparse
-    
+
     parser = argparse.ArgumentParser(description="Async Workflow Orchestrator")
     parser.add_argument("--debug", action="store_true", help="Enable debug mode")
     args = parser.parse_args()
-    
+
+    import uvicorn
+    from src.core.logging import setup_logging
+
     if args.debug:
         setup_logging("DEBUG")
         logger.info("Debug mode enabled via command line")
     else:
         setup_logging()
-    
-    logger.info(f"Starting server on {settings.api_host}:{settings.api_port}")
+
+    # uvloop/httptools ship with uvicorn[standard] but not on Windows
+    from importlib.util import find_spec
+    loop = "uvloop" if find_spec("uvloop") else "asyncio"
+    http = "httptools" if find_spec("httptools") else "h11"
+
+    logger.info("Starting server on %s:%s (loop=%s, http=%s)", settings.api_host, settings.api_port, loop, http)
     uvicorn.run(
         "main:app",
         host=settings.api_host,
         port=settings.api_port,
         reload=settings.api_reload,
         log_level="debug" if args.debug else settings.log_level.lower(),
+        loop=loop,
+        http=http,
     )
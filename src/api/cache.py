@@ -0,0 +1,140 @@
+"""In-process caches for API responses."""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from src.db import WorkflowStatus
+
+
+# Statuses whose status payload no longer changes on its own
+TERMINAL_STATUSES = frozenset({
+    WorkflowStatus.COMPLETE,
+    WorkflowStatus.FAILED,
+    WorkflowStatus.CANCELLED,
+})
+
+
+class TerminalStatusCache:
+    """
+    Bounded LRU of status snapshots for workflows in a terminal state.
+
+    Entries are tagged with the workflow's `updated_at` so a snapshot is
+    never served once the row has changed (e.g. after a retry).
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of workflows to keep snapshots for
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, Tuple[datetime, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, workflow_id: int, updated_at: datetime) -> Optional[Any]:
+        """Return the cached snapshot if it matches the workflow's version."""
+        with self._lock:
+            entry = self._entries.get(workflow_id)
+            if entry is None:
+                return None
+            if entry[0] != updated_at:
+                del self._entries[workflow_id]
+                return None
+            self._entries.move_to_end(workflow_id)
+            return entry[1]
+
+    def put(self, workflow_id: int, updated_at: datetime, snapshot: Any):
+        """Store a snapshot, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[workflow_id] = (updated_at, snapshot)
+            self._entries.move_to_end(workflow_id)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, workflow_id: int):
+        """Drop the snapshot for a workflow."""
+        with self._lock:
+            self._entries.pop(workflow_id, None)
+
+    def clear(self):
+        """Drop all snapshots."""
+        with self._lock:
+            self._entries.clear()
+
+
+class StatusBodyCache:
+    """
+    Short-lived cache of encoded status response bodies.
+
+    Keys are `(workflow_id, updated_at)`, so a changed row never hits a
+    stale body; the TTL only bounds how long idle entries are kept.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 0.5):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of bodies to keep
+            ttl: Seconds an entry stays valid after it was stored
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: Dict[Tuple[int, datetime], Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, workflow_id: int, updated_at: datetime) -> Optional[bytes]:
+        """Return the cached body if it is still fresh."""
+        key = (workflow_id, updated_at)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, workflow_id: int, updated_at: datetime, body: bytes):
+        """Store a body, first dropping expired entries if the cache is full."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+                    del self._entries[key]
+                if len(self._entries) >= self.maxsize:
+                    # Still full of live entries, drop the oldest insert
+                    del self._entries[next(iter(self._entries))]
+            self._entries[(workflow_id, updated_at)] = (now + self.ttl, body)
+
+    def clear(self):
+        """Drop all bodies."""
+        with self._lock:
+            self._entries.clear()
+
+
+def workflow_etag(workflow_id: int, updated_at: datetime) -> str:
+    """Build the entity tag for a workflow's current row version."""
+    return f'"{workflow_id}:{updated_at.timestamp()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an entity tag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+# Global cache for GET /workflow/{id}
+terminal_status_cache = TerminalStatusCache()
+
+# Global cache for GET /execution/workflows/{id}/status
+status_body_cache = StatusBodyCache()
+
+# Global cache of encoded GET /workflow/{id} bodies, the key already tracks changes
+state_body_cache = StatusBodyCache(maxsize=10_000, ttl=5.0)
@@ -1,3 +1,6 @@
+from functools import cached_property
+from typing import Annotated
+
 from fastapi import Depends
 from sqlalchemy.orm import Session
 
@@ -17,3 +20,34 @@ def get_task_dao(db: Session = Depends(get_db)) -> TaskDAO:
 def get_workflow_transition_dao(db: Session = Depends(get_db)) -> WorkflowTransitionDAO:
     """Dependency for WorkflowTransitionDAO."""
     return WorkflowTransitionDAO(db)
+
+class DAOBundle:
+    """Request-scoped DAOs sharing one session, each built on first use."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @cached_property
+    def workflow(self) -> WorkflowDAO:
+        return WorkflowDAO(self.db)
+
+    @cached_property
+    def task(self) -> TaskDAO:
+        return TaskDAO(self.db)
+
+    @cached_property
+    def transition(self) -> WorkflowTransitionDAO:
+        return WorkflowTransitionDAO(self.db)
+
+def get_daos(db: Session = Depends(get_db)) -> DAOBundle:
+    """Dependency for routes that need more than one DAO."""
+    return DAOBundle(db)
+
+
+# Annotated aliases so routes declare `workflow_dao: WorkflowDAODep`.
+# FastAPI resolves each dependency once per request and shares the result.
+SessionDep = Annotated[Session, Depends(get_db)]
+WorkflowDAODep = Annotated[WorkflowDAO, Depends(get_workflow_dao)]
+TaskDAODep = Annotated[TaskDAO, Depends(get_task_dao)]
+TransitionDAODep = Annotated[WorkflowTransitionDAO, Depends(get_workflow_transition_dao)]
+DAOsDep = Annotated[DAOBundle, Depends(get_daos)]
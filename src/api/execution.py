@@ -1,14 +1,19 @@
 """Workflow execution endpoints."""
 import asyncio
 import logging
-from typing import Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+import threading
+import time
+from contextlib import nullcontext
+from typing import Annotated, AsyncContextManager, Dict, Any, Awaitable, Callable, Optional, Set
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 
 from config import settings
-from src.db import get_db, Workflow, WorkflowStatus
+from src.db import pool_capacity, WorkflowStatus
 from src.db.dao.workflow_dao import WorkflowDAO
-from src.api.dependencies import get_workflow_dao
+from src.api.dependencies import WorkflowDAODep
+from src.api.cache import terminal_status_cache, status_body_cache, workflow_etag, etag_matches
 from src.core import WorkflowOrchestrator, WorkerManager
 from .schemas import WorkflowExecutionResponse
 
@@ -16,125 +21,243 @@ from .schemas import WorkflowExecutionResponse
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/execution", tags=["execution"])
 
+# Status sets checked on every request
+_STARTABLE = frozenset({WorkflowStatus.INIT, WorkflowStatus.FAILED, WorkflowStatus.CANCELLED})
+_CANCELLABLE = frozenset({WorkflowStatus.INIT, WorkflowStatus.PREPARE, WorkflowStatus.EXECUTE, WorkflowStatus.VALIDATE})
+
+# Connections kept free for ordinary API requests
+RESERVED_DB_CONNECTIONS = 4
+
+
+def _db_slots() -> Optional[int]:
+    """
+    Number of DB connections background work may hold at once.
+    None when the pool doesn't bound it.
+    """
+    capacity = pool_capacity()
+    if capacity is None:
+        return None
+    return max(1, capacity - RESERVED_DB_CONNECTIONS)
+
+
+def _run_limit() -> Optional[int]:
+    """Number of workflow runs allowed in flight at once, None for no limit."""
+    limits = [limit for limit in (_db_slots(), settings.max_concurrent_runs) if limit]
+    return min(limits) if limits else None
+
+
 # Global worker manager (initialized at startup)
 _worker_manager = None
+_worker_manager_lock = threading.Lock()
+
+# Bounds concurrent workflow runs, each holds a session for its duration.
+# Created on first use so it belongs to the loop that serves the runs.
+_run_semaphore: Optional[asyncio.Semaphore] = None
+_run_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _run_slot() -> AsyncContextManager:
+    """Slot a workflow run holds while it runs (a no-op without a limit)."""
+    global _run_semaphore, _run_semaphore_loop
+    limit = _run_limit()
+    if limit is None:
+        return nullcontext()
+    loop = asyncio.get_running_loop()
+    if _run_semaphore_loop is not loop:
+        _run_semaphore = asyncio.Semaphore(limit)
+        _run_semaphore_loop = loop
+    return _run_semaphore
 
 
 def get_worker_manager() -> WorkerManager:
     """Get the global worker manager instance."""
     global _worker_manager
     if _worker_manager is None:
-        _worker_manager = WorkerManager(max_workers=settings.max_workers)
+        # Concurrent first callers must not each spin up a thread pool
+        with _worker_manager_lock:
+            if _worker_manager is None:
+                # Worker threads hold a session per task, never more than the DB can serve
+                db_slots = _db_slots()
+                max_workers = settings.max_workers if db_slots is None else min(settings.max_workers, db_slots)
+                logger.info(
+                    "Sizing worker pool to %s (configured %s, DB pool %s)",
+                    max_workers, settings.max_workers, pool_capacity()
+                )
+                _worker_manager = WorkerManager(max_workers=max_workers)
     return _worker_manager
 
 
-async def execute_workflow_background(workflow_id: int):
+WorkerManagerDep = Annotated[WorkerManager, Depends(get_worker_manager)]
+
+
+# Workflow runs scheduled on the event loop, kept referenced until they finish
+_running_workflows: Set[asyncio.Task] = set()
+
+
+async def run_detached(func: Callable[..., Awaitable[Any]], *args: Any) -> None:
+    """
+    Start `func(*args)` as its own task on the event loop and return at once.
+    
+    Used as the background task of a request so a multi-second workflow run
+    is not tied to the request/response cycle that started it.
+    """
+    task = asyncio.create_task(func(*args))
+    _running_workflows.add(task)
+    task.add_done_callback(_running_workflows.discard)
+
+
+async def cancel_running_workflows() -> None:
+    """Cancel workflow runs that are still in flight (called on shutdown)."""
+    tasks = list(_running_workflows)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def execute_workflow_background(workflow_id: int, worker_manager: WorkerManager):
     """Execute workflow in the background (automatic execution through all states)."""
-    db = None
-    try:
-        from src.db import SessionLocal
-        db = SessionLocal()
-        
-        orchestrator = WorkflowOrchestrator(workflow_id, db)
-        worker_manager = get_worker_manager()
-        
-        await orchestrator.execute_automatic(worker_manager)
-        
-    except Exception as e:
-        logger.error(f"Background workflow execution error: {e}")
-    finally:
-        if db:
-            db.close()
+    async with _run_slot():
+        db = None
+        try:
+            from src.db import SessionLocal
+            db = SessionLocal()
+            
+            # Loading the workflow is a blocking query, keep it off the event loop
+            orchestrator = await asyncio.to_thread(WorkflowOrchestrator, workflow_id, db)
+            
+            await orchestrator.execute_automatic(worker_manager)
+            
+        except Exception as e:
+            logger.error("Background workflow execution error: %s", e)
+        finally:
+            if db:
+                db.close()
 
 
-async def execute_next_step_background(workflow_id: int):
+async def execute_next_step_background(workflow_id: int, worker_manager: WorkerManager):
     """Execute only the next step of workflow in the background."""
+    async with _run_slot():
+        db = None
+        try:
+            from src.db import SessionLocal
+            db = SessionLocal()
+            
+            # Loading the workflow is a blocking query, keep it off the event loop
+            orchestrator = await asyncio.to_thread(WorkflowOrchestrator, workflow_id, db)
+            
+            await orchestrator.execute_next_step(worker_manager)
+            
+        except Exception as e:
+            logger.error("Background next step execution error: %s", e)
+        finally:
+            if db:
+                db.close()
+
+
+def cancel_workflow_background(workflow_id: int):
+    """Cancel a workflow in the background."""
     db = None
     try:
         from src.db import SessionLocal
         db = SessionLocal()
         
         orchestrator = WorkflowOrchestrator(workflow_id, db)
-        worker_manager = get_worker_manager()
-        
-        await orchestrator.execute_next_step(worker_manager)
+        # The workflow may have finished since the request was accepted, and a
+        # run advancing it meanwhile makes the guarded write miss, so retry
+        # from the state it moved to
+        while orchestrator.may_cancel() and not orchestrator.cancel():
+            pass
         
     except Exception as e:
-        logger.error(f"Background next step execution error: {e}")
+        logger.error("Background workflow cancellation error: %s", e)
     finally:
         if db:
             db.close()
 
 
 @router.post("/workflows/{workflow_id}/start", response_model=WorkflowExecutionResponse)
-async def start_workflow(
+def start_workflow(
     workflow_id: int,
     background_tasks: BackgroundTasks,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao),
-    db: Session = Depends(get_db)
+    workflow_dao: WorkflowDAODep,
+    worker_manager: WorkerManagerDep
 ):
     """Start workflow execution."""
-    # Verify workflow exists
-    workflow = workflow_dao.get_by_id(workflow_id)
-    if not workflow:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Workflow {workflow_id} not found"
-        )
-    
-    # Check if workflow can be started
-    if workflow.status not in [WorkflowStatus.INIT, WorkflowStatus.FAILED, WorkflowStatus.CANCELLED]:
+    # Check and reset in one atomic statement, failed/cancelled runs go back to INIT
+    workflow = workflow_dao.reset_to_init(workflow_id, _STARTABLE, include_children=True)
+    if workflow is None:
+        # Only look up why on the error path
+        workflow = workflow_dao.get_by_id(workflow_id)
+        if not workflow:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Workflow {workflow_id} not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Workflow in status '{workflow.status.value}' cannot be started"
         )
+    terminal_status_cache.invalidate(workflow_id)
     
-    # Reset workflow status to INIT if it was failed/cancelled
-    if workflow.status in [WorkflowStatus.FAILED, WorkflowStatus.CANCELLED]:
-        workflow_dao.update(workflow_id, {
-            "status": WorkflowStatus.INIT,
-            "current_state": "INIT"
-        })
-    
-    logger.info(f"Starting workflow {workflow_id}")
+    logger.info("Starting workflow %s", workflow_id)
     
     # Execute workflow in background
-    background_tasks.add_task(execute_workflow_background, workflow_id)
+    background_tasks.add_task(run_detached, execute_workflow_background, workflow_id, worker_manager)
     
-    # Create orchestrator to get initial status
-    orchestrator = WorkflowOrchestrator(workflow_id, db)
-    status_info = orchestrator.get_status()
-    
-    return WorkflowExecutionResponse(**status_info)
+    # Initial status straight from the row we already hold
+    return WorkflowExecutionResponse(**WorkflowOrchestrator.status_from_row(workflow, include_tasks=True))
 
 
-@router.get("/workflows/{workflow_id}/status", response_model=WorkflowExecutionResponse)
+@router.get(
+    "/workflows/{workflow_id}/status",
+    response_model=None,
+    responses={200: {"model": WorkflowExecutionResponse}}
+)
 def get_workflow_status(
     workflow_id: int,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao),
-    db: Session = Depends(get_db)
+    request: Request,
+    workflow_dao: WorkflowDAODep
 ):
     """Get current workflow execution status."""
-    # Verify workflow exists
-    workflow = workflow_dao.get_by_id(workflow_id)
-    if not workflow:
+    # Cheap version check first, the full row is only loaded on a cache miss
+    updated_at = workflow_dao.get_updated_at(workflow_id)
+    if updated_at is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Workflow {workflow_id} not found"
         )
     
-    # Get status from orchestrator
-    orchestrator = WorkflowOrchestrator(workflow_id, db)
-    status_info = orchestrator.get_status()
+    etag = workflow_etag(workflow_id, updated_at)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return WorkflowExecutionResponse(**status_info)
+    body = status_body_cache.get(workflow_id, updated_at)
+    if body is None:
+        workflow = workflow_dao.get_full(workflow_id, include_tasks=True)
+        if not workflow:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Workflow {workflow_id} not found"
+            )
+        status_info = WorkflowExecutionResponse(**WorkflowOrchestrator.status_from_row(workflow, include_tasks=True))
+        body = ORJSONResponse(status_info.model_dump()).body
+        # Tag with the version actually encoded, it may be newer than the probe
+        status_body_cache.put(workflow_id, workflow.updated_at, body)
+        headers["ETag"] = workflow_etag(workflow_id, workflow.updated_at)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
-@router.post("/workflows/{workflow_id}/cancel", response_model=Dict[str, Any])
-async def cancel_workflow(
+@router.post(
+    "/workflows/{workflow_id}/cancel",
+    response_model=Dict[str, Any],
+    status_code=status.HTTP_202_ACCEPTED
+)
+def cancel_workflow(
     workflow_id: int,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    workflow_dao: WorkflowDAODep
 ):
     """Cancel a running workflow."""
     # Verify workflow exists
@@ -146,41 +269,33 @@ async def cancel_workflow(
         )
     
     # Check if workflow is running
-    if workflow.status not in [WorkflowStatus.INIT, WorkflowStatus.PREPARE, WorkflowStatus.EXECUTE, WorkflowStatus.VALIDATE]:
+    if workflow.status not in _CANCELLABLE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Workflow in status '{workflow.status.value}' cannot be cancelled"
         )
     
-    logger.info(f"Cancelling workflow {workflow_id}")
+    logger.info("Cancelling workflow %s", workflow_id)
     
-    # Create orchestrator and emit cancel event
-    orchestrator = WorkflowOrchestrator(workflow_id, db)
-    await orchestrator.emit_event('cancel')
+    # Apply the transition after the response is sent
+    background_tasks.add_task(cancel_workflow_background, workflow_id)
     
-    # Process the event
-    orchestrator._running = True
-    await asyncio.wait_for(orchestrator.process_events(), timeout=2.0)
-    
-    return {"message": f"Workflow {workflow_id} cancelled", "status": "cancelled"}
+    return {"message": f"Workflow {workflow_id} cancellation requested", "status": "cancelling"}
 
 
-@router.get("/stats", response_model=Dict[str, Any])
-def get_execution_stats(
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
-):
-    """Get execution statistics."""
-    worker_manager = get_worker_manager()
-    
-    # Count workflows by status
-    total_workflows = workflow_dao.count()
-    init = workflow_dao.count(WorkflowStatus.INIT)
-    prepare = workflow_dao.count(WorkflowStatus.PREPARE)
-    execute = workflow_dao.count(WorkflowStatus.EXECUTE)
-    validate = workflow_dao.count(WorkflowStatus.VALIDATE)
-    complete = workflow_dao.count(WorkflowStatus.COMPLETE)
-    failed = workflow_dao.count(WorkflowStatus.FAILED)
-    cancelled = workflow_dao.count(WorkflowStatus.CANCELLED)
+# Stats are shared by every poller for this many seconds
+STATS_TTL = 1.0
+
+_stats_cache: Dict[str, Any] = {"ts": 0.0, "value": None}
+_stats_lock = asyncio.Lock()
+
+
+def _compute_stats(workflow_dao: WorkflowDAO, worker_manager: WorkerManager) -> Dict[str, Any]:
+    """Collect execution statistics from the database and the worker pool."""
+    # Count workflows by status in one grouped query
+    counts = workflow_dao.count_by_status()
+    workflows = {"total": sum(counts.values())}
+    workflows.update({workflow_status.value.lower(): count for workflow_status, count in counts.items()})
     
     return {
         "worker_pool": {
@@ -188,14 +303,27 @@ def get_execution_stats(
             "active_tasks": worker_manager.get_active_count(),
             "queue_size": worker_manager.get_queue_size(),
         },
-        "workflows": {
-            "total": total_workflows,
-            "init": init,
-            "prepare": prepare,
-            "execute": execute,
-            "validate": validate,
-            "complete": complete,
-            "failed": failed,
-            "cancelled": cancelled
-        }
+        "workflows": workflows
     }
+
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_execution_stats(
+    workflow_dao: WorkflowDAODep,
+    worker_manager: WorkerManagerDep
+):
+    """
+    Get execution statistics.
+    Results are up to `STATS_TTL` seconds old; concurrent pollers share one computation.
+    """
+    if time.monotonic() - _stats_cache["ts"] < STATS_TTL:
+        return _stats_cache["value"]
+    
+    async with _stats_lock:
+        # Another request may have refreshed the stats while we waited
+        if time.monotonic() - _stats_cache["ts"] < STATS_TTL:
+            return _stats_cache["value"]
+        
+        stats = await run_in_threadpool(_compute_stats, workflow_dao, worker_manager)
+        _stats_cache.update(ts=time.monotonic(), value=stats)
+        return stats
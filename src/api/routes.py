@@ -1,19 +1,19 @@
 """FastAPI route handlers for workflow management."""
 import logging
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-
-from src.db import get_db, Workflow, Task, WorkflowTransition, WorkflowStatus, TaskStatus
-from src.db.dao.workflow_dao import WorkflowDAO
-from src.db.dao.task_dao import TaskDAO
-from src.db.dao.workflow_transition_dao import WorkflowTransitionDAO
-from src.api.dependencies import get_workflow_dao, get_task_dao, get_workflow_transition_dao
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from src.db import Workflow, WorkflowStatus
+from src.api.dependencies import DAOsDep, WorkflowDAODep
+from src.api.cache import terminal_status_cache
 from .schemas import (
     WorkflowCreate,
     WorkflowUpdate,
     WorkflowResponse,
-    TaskCreate,
+    WorkflowSummary,
     TaskResponse,
     TransitionResponse,
 )
@@ -22,11 +22,14 @@ from .schemas import (
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/workflows", tags=["workflows"])
 
+# Workflows in these statuses are being executed
+_RUNNING = frozenset({WorkflowStatus.PREPARE, WorkflowStatus.EXECUTE, WorkflowStatus.VALIDATE})
+
 
 @router.post("/", response_model=WorkflowResponse, status_code=status.HTTP_201_CREATED)
 def create_workflow(
     workflow: WorkflowCreate,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
+    workflow_dao: WorkflowDAODep
 ):
     """Create a new workflow."""
     db_workflow = Workflow(
@@ -39,37 +42,78 @@ def create_workflow(
     )
     db_workflow = workflow_dao.create(db_workflow)
     
-    logger.info(f"Created workflow {db_workflow.id}: {db_workflow.name}")
+    logger.info("Created workflow %s: %s", db_workflow.id, db_workflow.name)
     return db_workflow
 
 
-@router.get("/", response_model=List[WorkflowResponse])
+# Listings return plain row dicts straight from the DAO; response_model=None
+# skips re-validating every row through Pydantic, the schema is still
+# published for OpenAPI via `responses`.
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {"model": List[WorkflowResponse]}}
+)
 def list_workflows(
+    workflow_dao: WorkflowDAODep,
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[str] = None,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
+    after_id: Optional[int] = None
 ):
-    """List all workflows with optional filtering."""
-    workflows: List[Workflow] = workflow_dao.list_workflows(skip=skip, limit=limit)
-    
+    """
+    List all workflows with optional filtering.
+    Pass the last ID of the previous page as `after_id` to page without offsets.
+    """
+    status_enum = None
     if status_filter:
         try:
             status_enum = WorkflowStatus(status_filter)
-            workflows = [w for w in workflows if w.status == status_enum]
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid status: {status_filter}"
             )
-            
+    
+    workflows = workflow_dao.list_rows(
+        skip=skip, limit=limit, status=status_enum, after_id=after_id
+    )
     return workflows
 
 
+@router.get("/summary", response_model=List[WorkflowSummary])
+def list_workflow_summaries(
+    workflow_dao: WorkflowDAODep,
+    skip: int = 0,
+    limit: int = 100,
+    status_filter: Optional[str] = None,
+    after_id: Optional[int] = None
+):
+    """
+    List workflows with just their id, name, status and current state.
+    Pass the last ID of the previous page as `after_id` to page without offsets.
+    """
+    status_enum = None
+    if status_filter:
+        try:
+            status_enum = WorkflowStatus(status_filter)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid status: {status_filter}"
+            )
+    
+    rows = workflow_dao.list_summary(skip=skip, limit=limit, status=status_enum, after_id=after_id)
+    return [
+        {"id": id_, "name": name, "status": status_.value, "current_state": current_state}
+        for id_, name, status_, current_state in rows
+    ]
+
+
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
 def get_workflow(
     workflow_id: int,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
+    workflow_dao: WorkflowDAODep
 ):
     """Get a specific workflow by ID."""
     workflow = workflow_dao.get_by_id(workflow_id)
@@ -87,24 +131,9 @@ def get_workflow(
 def update_workflow(
     workflow_id: int,
     workflow_update: WorkflowUpdate,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
+    workflow_dao: WorkflowDAODep
 ):
     """Update a workflow."""
-    workflow = workflow_dao.get_by_id(workflow_id)
-    
-    if not workflow:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Workflow {workflow_id} not found"
-        )
-    
-    # Only allow updates if workflow is not running
-    if workflow.status in [WorkflowStatus.PREPARE, WorkflowStatus.EXECUTE, WorkflowStatus.VALIDATE]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot update a running workflow"
-        )
-    
     # Prepare update data
     update_data = {}
     if workflow_update.name is not None:
@@ -114,74 +143,114 @@ def update_workflow(
     if workflow_update.config is not None:
         update_data["config"] = workflow_update.config
     
-    if update_data:
-        workflow = workflow_dao.update(workflow_id, update_data)
+    # Only allow updates if workflow is not running, checked by the UPDATE itself
+    workflow = workflow_dao.update(workflow_id, update_data, exclude_statuses=_RUNNING)
+    if workflow is None:
+        # Nothing updated, only now look up why
+        if workflow_dao.get_by_id(workflow_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Workflow {workflow_id} not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot update a running workflow"
+        )
     
-    logger.info(f"Updated workflow {workflow_id}")
+    logger.info("Updated workflow %s", workflow_id)
     return workflow
 
 
 @router.delete("/{workflow_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_workflow(
     workflow_id: int,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
+    workflow_dao: WorkflowDAODep
 ):
     """Delete a workflow."""
-    workflow = workflow_dao.get_by_id(workflow_id)
-    
-    if not workflow:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Workflow {workflow_id} not found"
-        )
-    
     # Don't allow deletion of running workflows
-    if workflow.status in [WorkflowStatus.PREPARE, WorkflowStatus.EXECUTE, WorkflowStatus.VALIDATE]:
+    if not workflow_dao.delete(workflow_id, exclude_statuses=_RUNNING):
+        # Nothing deleted, only now look up why
+        if workflow_dao.get_by_id(workflow_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Workflow {workflow_id} not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete a running workflow"
         )
     
-    workflow_dao.delete(workflow_id)
+    terminal_status_cache.invalidate(workflow_id)
     
-    logger.info(f"Deleted workflow {workflow_id}")
+    logger.info("Deleted workflow %s", workflow_id)
     return None
 
 
-@router.get("/{workflow_id}/tasks", response_model=List[TaskResponse])
+# The history endpoints below return DAO row dicts the same way
+@router.get(
+    "/{workflow_id}/tasks",
+    response_model=None,
+    responses={200: {"model": List[TaskResponse]}}
+)
 def get_workflow_tasks(
     workflow_id: int,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao),
-    task_dao: TaskDAO = Depends(get_task_dao)
+    daos: DAOsDep
 ):
     """Get all tasks for a workflow."""
-    workflow = workflow_dao.get_by_id(workflow_id)
-    
-    if not workflow:
+    if not daos.workflow.exists(workflow_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Workflow {workflow_id} not found"
         )
     
-    tasks = task_dao.get_by_workflow_id(workflow_id)
+    tasks = daos.task.get_rows_by_workflow_id(workflow_id)
     return tasks
 
 
-@router.get("/{workflow_id}/transitions", response_model=List[TransitionResponse])
+@router.get(
+    "/{workflow_id}/transitions",
+    response_model=None,
+    responses={200: {"model": List[TransitionResponse]}}
+)
 def get_workflow_transitions(
     workflow_id: int,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao),
-    transition_dao: WorkflowTransitionDAO = Depends(get_workflow_transition_dao)
+    daos: DAOsDep,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None
 ):
-    """Get all state transitions for a workflow."""
-    workflow = workflow_dao.get_by_id(workflow_id)
-    
-    if not workflow:
+    """
+    Get state transitions for a workflow in order, the full history unless `limit` is given.
+    Pass the last transition ID of the previous page as `after_id` for the next page.
+    """
+    if not daos.workflow.exists(workflow_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Workflow {workflow_id} not found"
         )
     
-    transitions = transition_dao.get_by_workflow_id(workflow_id)
+    # A stale or foreign cursor would otherwise look like the end of the history
+    if after_id is not None and not daos.transition.is_cursor(workflow_id, after_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Transition {after_id} is not part of workflow {workflow_id}"
+        )
+    
+    transitions = daos.transition.iter_rows_by_workflow_id(workflow_id, after_id=after_id, limit=limit)
     
-    return transitions
+    # Encode row by row so long histories never sit in memory as one list
+    return StreamingResponse(_json_array(transitions), media_type="application/json")
+
+
+def _json_array(rows: Iterable[Dict[str, Any]], chunk_size: int = 500) -> Iterator[bytes]:
+    """Encode rows as a JSON array, sent `chunk_size` elements at a time."""
+    prefix = b"["
+    chunk = []
+    for row in rows:
+        chunk.append(orjson.dumps(row))
+        if len(chunk) == chunk_size:
+            yield prefix + b",".join(chunk)
+            prefix, chunk = b",", []
+    if chunk:
+        yield prefix + b",".join(chunk)
+        prefix = b","
+    yield b"]" if prefix == b"," else b"[]"
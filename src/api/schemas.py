@@ -38,6 +38,14 @@ class WorkflowResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class WorkflowSummary(BaseModel):
+    """Schema for the lightweight workflow listing."""
+    id: int
+    name: str
+    status: str
+    current_state: str
+
+
 # Task Schemas
 class TaskCreate(BaseModel):
     """Schema for creating a new task."""
@@ -68,16 +76,25 @@ class TaskResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TaskSummary(BaseModel):
+    """Schema for the lightweight task listing."""
+    id: int
+    workflow_id: int
+    name: str
+    task_type: str
+    status: str
+
+
 # Workflow Execution Schema
 class WorkflowExecutionResponse(BaseModel):
     """Schema for workflow execution status."""
     workflow_id: int
     name: str
     status: str
-    started_at: Optional[str]
-    completed_at: Optional[str]
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
     error_message: Optional[str]
-    tasks: List[Dict[str, Any]]
+    tasks: List[Dict[str, Any]] = []
 
 
 # Transition Schema
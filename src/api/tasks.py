@@ -1,30 +1,44 @@
 """Task-related API endpoints."""
 import logging
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, status
 
-from src.db import get_db, Task, Workflow, TaskStatus
-from src.db.dao.task_dao import TaskDAO
-from src.db.dao.workflow_dao import WorkflowDAO
-from src.api.dependencies import get_task_dao, get_workflow_dao
-from .schemas import TaskCreate, TaskResponse
+from src.db import Task, TaskStatus
+from src.api.dependencies import DAOsDep, TaskDAODep
+from .schemas import TaskCreate, TaskResponse, TaskSummary
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# Upper bound on `limit` for task listings
+MAX_PAGE_SIZE = 1000
+
+# Query-string value -> status, looked up without raising on bad input
+_STATUS_BY_VALUE = {task_status.value: task_status for task_status in TaskStatus}
+
+
+def _parse_status(status_filter: Optional[str]) -> Optional[TaskStatus]:
+    """Convert the `status_filter` query parameter, rejecting unknown values."""
+    if not status_filter:
+        return None
+    task_status = _STATUS_BY_VALUE.get(status_filter)
+    if task_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid status: {status_filter}"
+        )
+    return task_status
+
 
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 def create_task(
     task: TaskCreate,
-    task_dao: TaskDAO = Depends(get_task_dao),
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
+    daos: DAOsDep
 ):
     """Create a new task for a workflow."""
     # Verify workflow exists
-    workflow = workflow_dao.get_by_id(task.workflow_id)
-    if not workflow:
+    if not daos.workflow.exists(task.workflow_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Workflow {task.workflow_id} not found"
@@ -38,43 +52,107 @@ def create_task(
         config=task.config,
         status=TaskStatus.PENDING,
     )
-    db_task = task_dao.create(db_task)
+    db_task = daos.task.create(db_task)
     
-    logger.info(f"Created task {db_task.id}: {db_task.name} for workflow {task.workflow_id}")
+    logger.info("Created task %s: %s for workflow %s", db_task.id, db_task.name, task.workflow_id)
     return db_task
 
 
+@router.post("/bulk", response_model=List[TaskResponse], status_code=status.HTTP_201_CREATED)
+def create_tasks_bulk(
+    tasks: List[TaskCreate],
+    daos: DAOsDep
+):
+    """
+    Create many tasks at once.
+    All workflows are checked with one query and all tasks are written in
+    one transaction, returned in request order.
+    """
+    if len(tasks) > MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_PAGE_SIZE} tasks per request"
+        )
+    
+    workflow_ids = {task.workflow_id for task in tasks}
+    missing = sorted(workflow_ids - daos.workflow.existing_ids(workflow_ids))
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Workflows not found: {missing}"
+        )
+    
+    db_tasks = daos.task.create_many([
+        {**task.model_dump(), "status": TaskStatus.PENDING}
+        for task in tasks
+    ])
+    
+    logger.info("Created %s tasks for %s workflows", len(db_tasks), len(workflow_ids))
+    return db_tasks
+
+
 @router.get("/", response_model=List[TaskResponse])
 def list_tasks(
+    task_dao: TaskDAODep,
     skip: int = 0,
     limit: int = 100,
     workflow_id: Optional[int] = None,
     status_filter: Optional[str] = None,
-    task_dao: TaskDAO = Depends(get_task_dao)
+    after_id: Optional[int] = None
 ):
-    """List all tasks with optional filtering."""
-    if workflow_id:
-        tasks = task_dao.get_by_workflow_id(workflow_id)
-    else:
-        tasks = task_dao.list_tasks(skip=skip, limit=limit)
-    
-    if status_filter:
-        try:
-            status_enum = TaskStatus(status_filter)
-            tasks = [t for t in tasks if t.status == status_enum]
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid status: {status_filter}"
-            )
-    
+    """
+    List all tasks with optional filtering.
+    Pass the last ID of the previous page as `after_id` to page without offsets.
+    """
+    tasks = task_dao.list_tasks(
+        skip=skip,
+        limit=min(limit, MAX_PAGE_SIZE),
+        after_id=after_id,
+        workflow_id=workflow_id,
+        status=_parse_status(status_filter),
+        # The response only has column fields, a relationship access is a bug
+        strict=True
+    )
     return tasks
 
 
+@router.get("/summary", response_model=List[TaskSummary])
+def list_task_summaries(
+    task_dao: TaskDAODep,
+    skip: int = 0,
+    limit: int = 100,
+    workflow_id: Optional[int] = None,
+    status_filter: Optional[str] = None,
+    after_id: Optional[int] = None
+):
+    """List tasks with just their id, workflow, name, type and status."""
+    rows = task_dao.list_summary(
+        skip=skip,
+        limit=min(limit, MAX_PAGE_SIZE),
+        after_id=after_id,
+        workflow_id=workflow_id,
+        status=_parse_status(status_filter)
+    )
+    return [
+        {"id": id_, "workflow_id": workflow_id_, "name": name, "task_type": task_type, "status": status_.value}
+        for id_, workflow_id_, name, task_type, status_ in rows
+    ]
+
+
+@router.get("/count", response_model=Dict[str, int])
+def count_tasks(
+    task_dao: TaskDAODep,
+    workflow_id: Optional[int] = None,
+    status_filter: Optional[str] = None
+):
+    """Count tasks matching the same filters as the listing."""
+    return {"count": task_dao.count(workflow_id=workflow_id, status=_parse_status(status_filter))}
+
+
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
     task_id: int,
-    task_dao: TaskDAO = Depends(get_task_dao)
+    task_dao: TaskDAODep
 ):
     """Get a specific task by ID."""
     task = task_dao.get_by_id(task_id)
@@ -91,26 +169,22 @@ def get_task(
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_task(
     task_id: int,
-    task_dao: TaskDAO = Depends(get_task_dao)
+    task_dao: TaskDAODep
 ):
     """Delete a task."""
-    task = task_dao.get_by_id(task_id)
-    
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Task {task_id} not found"
-        )
-    
     # Don't allow deletion of running tasks
-    if task.status == TaskStatus.RUNNING:
+    if not task_dao.delete(task_id, exclude_statuses=[TaskStatus.RUNNING]):
+        # Nothing deleted, only now look up why
+        if task_dao.get_by_id(task_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Task {task_id} not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete a running task"
         )
     
-    task_dao.delete(task_id)
-    
-    logger.info(f"Deleted task {task_id}")
+    logger.info("Deleted task %s", task_id)
     return None
 
@@ -1,25 +1,39 @@
 """Workflow API endpoints matching the specification."""
+import asyncio
 import logging
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 
-from src.db import get_db, Workflow, WorkflowStatus, WorkflowTransition
-from src.api.schemas import WorkflowCreate, WorkflowResponse, WorkflowStatusDetail
-from src.db.dao.workflow_dao import WorkflowDAO
+from src.db import Workflow, WorkflowStatus
+from src.api.schemas import WorkflowCreate, WorkflowStatusDetail
 from src.db.dao.workflow_transition_dao import WorkflowTransitionDAO
-from src.api.dependencies import get_workflow_dao, get_workflow_transition_dao
+from src.api.dependencies import DAOBundle, DAOsDep, SessionDep, WorkflowDAODep
+from src.api.cache import (
+    TERMINAL_STATUSES,
+    terminal_status_cache,
+    state_body_cache,
+    workflow_etag,
+    etag_matches,
+)
+from src.api.execution import WorkerManagerDep
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/workflow", tags=["workflow"])
 
+# Status sets checked on every request
+_CANNOT_PROGRESS = frozenset({WorkflowStatus.COMPLETE, WorkflowStatus.CANCELLED})
+_ACTIVE = frozenset({WorkflowStatus.INIT, WorkflowStatus.PREPARE, WorkflowStatus.EXECUTE, WorkflowStatus.VALIDATE})
+
 
 @router.post("/start", response_model=dict, status_code=status.HTTP_201_CREATED)
-async def start_workflow(
+def start_workflow(
     workflow: WorkflowCreate,
     background_tasks: BackgroundTasks,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
+    workflow_dao: WorkflowDAODep,
+    worker_manager: WorkerManagerDep
 ):
     """
     Start a new workflow.
@@ -38,12 +52,12 @@ async def start_workflow(
     )
     db_workflow = workflow_dao.create(db_workflow)
     
-    logger.info(f"Created workflow {db_workflow.id}: {db_workflow.name} in INIT state")
+    logger.info("Created workflow %s: %s in INIT state", db_workflow.id, db_workflow.name)
     
     # Execute workflow in background if auto_start is True
     if workflow.auto_start:
-        from src.api.execution import execute_workflow_background
-        background_tasks.add_task(execute_workflow_background, db_workflow.id)
+        from src.api.execution import execute_workflow_background, run_detached
+        background_tasks.add_task(run_detached, execute_workflow_background, db_workflow.id, worker_manager)
     
     return {
         "message": "Workflow started",
@@ -54,59 +68,146 @@ async def start_workflow(
     }
 
 
-@router.get("/{workflow_id}", response_model=WorkflowStatusDetail)
+def _build_workflow_state(workflow: Workflow, transition_dao: WorkflowTransitionDAO) -> dict:
+    """
+    Assemble the detailed status payload for a workflow.
+    Terminal workflows are served from the snapshot cache.
+    
+    The payload is built straight from trusted rows in the shape of
+    `WorkflowStatusDetail`, so callers encode it without revalidating.
+    The history comes from a column query, no transition objects are built.
+    """
+    if workflow.status in TERMINAL_STATUSES:
+        snapshot = terminal_status_cache.get(workflow.id, workflow.updated_at)
+        if snapshot is not None:
+            return snapshot
+    
+    from src.core import WorkflowOrchestrator
+    status_info = WorkflowOrchestrator.status_from_row(
+        workflow, transitions=transition_dao.get_rows_by_workflow_id(workflow.id)
+    )
+    
+    if workflow.status in TERMINAL_STATUSES:
+        terminal_status_cache.put(workflow.id, workflow.updated_at, status_info)
+    
+    return status_info
+
+
+@router.get(
+    "/{workflow_id}",
+    response_model=None,
+    responses={200: {"model": WorkflowStatusDetail}}
+)
 def get_workflow_state(
     workflow_id: int,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao),
-    transition_dao: WorkflowTransitionDAO = Depends(get_workflow_transition_dao),
-    db: Session = Depends(get_db)
+    request: Request,
+    daos: DAOsDep
 ):
     """
     Get current workflow state and full history.
     
     GET /workflow/{id}
     """
-    # Verify workflow exists
-    workflow = workflow_dao.get_by_id(workflow_id)
-    if not workflow:
+    # Cheap version check first, the history is only loaded on a cache miss
+    version = daos.workflow.get_version(workflow_id)
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Workflow {workflow_id} not found"
         )
+    _, updated_at = version
     
-    # Get status from orchestrator
-    from src.core import WorkflowOrchestrator
+    # Unchanged row, so the client's copy is still current. Even finished
+    # workflows are revalidated: they can still be deleted or archived.
+    etag = workflow_etag(workflow_id, updated_at)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    body = state_body_cache.get(workflow_id, updated_at)
+    if body is None:
+        workflow = daos.workflow.get_full(workflow_id, include_transitions=False)
+        if not workflow:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Workflow {workflow_id} not found"
+            )
+        body = ORJSONResponse(_build_workflow_state(workflow, daos.transition)).body
+        # Tag with the version actually encoded, it may be newer than the probe
+        state_body_cache.put(workflow_id, workflow.updated_at, body)
+        headers["ETag"] = workflow_etag(workflow_id, workflow.updated_at)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _read_and_release(daos: DAOBundle, workflow_id: int) -> Optional[Workflow]:
+    """
+    Load a workflow, then close the session so its pooled connection is
+    handed back; a parked long-poll must not hold one while it waits.
+    The loaded attributes stay readable on the detached object.
+    """
     try:
-        orchestrator = WorkflowOrchestrator(workflow_id, db)
-        status_info = orchestrator.get_status()
-    except Exception as e:
-        logger.error(f"Error getting orchestrator status: {e}")
-        # Fallback to DB data if orchestrator fails
-        transitions = transition_dao.get_by_workflow_id(workflow_id)
-        status_info = {
-            "workflow_id": workflow_id,
-            "name": workflow.name,
-            "description": workflow.description,
-            "status": workflow.status.value,
-            "current_state": workflow.current_state,
-            "retries": workflow.retries,
-            "started_at": workflow.started_at,
-            "completed_at": workflow.completed_at,
-            "error_message": workflow.error_message,
-            "next_trigger": None,
-            "transitions": transitions,
-            "task_results": {}
-        }
+        return daos.workflow.get_full(workflow_id, include_transitions=False)
+    finally:
+        daos.db.close()
+
+
+@router.get(
+    "/{workflow_id}/wait",
+    response_model=None,
+    responses={200: {"model": WorkflowStatusDetail}}
+)
+async def wait_for_workflow_state(
+    workflow_id: int,
+    daos: DAOsDep,
+    since_state: Optional[str] = None,
+    timeout: float = Query(25.0, ge=0, le=60)
+):
+    """
+    Long-poll for a workflow state change.
+    Returns as soon as the current state differs from `since_state`,
+    or with the unchanged state once `timeout` seconds have passed.
     
-    return status_info
+    GET /workflow/{id}/wait?since_state=X&timeout=25
+    """
+    from src.core import state_notifier
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    
+    while True:
+        # Subscribe before reading so a transition in between is not missed
+        waiter = state_notifier.subscribe(workflow_id)
+        try:
+            # Read off the event loop, other long-polls keep waiting meanwhile
+            workflow = await run_in_threadpool(_read_and_release, daos, workflow_id)
+            if not workflow:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Workflow {workflow_id} not found"
+                )
+            
+            remaining = deadline - loop.time()
+            if since_state is None or workflow.current_state != since_state or remaining <= 0:
+                break
+            
+            try:
+                await asyncio.wait_for(waiter, timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            state_notifier.unsubscribe(workflow_id, waiter)
+    
+    return await run_in_threadpool(_build_workflow_state, workflow, daos.transition)
 
 
 @router.post("/{workflow_id}/next", response_model=dict)
 
-async def trigger_next_step(
+def trigger_next_step(
     workflow_id: int,
     background_tasks: BackgroundTasks,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
+    workflow_dao: WorkflowDAODep,
+    worker_manager: WorkerManagerDep
 ):
     """
     Manually trigger the next step in the workflow.
@@ -122,7 +223,7 @@ async def trigger_next_step(
         )
     
     # Check if workflow is in a state that can progress
-    if workflow.status in [WorkflowStatus.COMPLETE, WorkflowStatus.CANCELLED]:
+    if workflow.status in _CANNOT_PROGRESS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Workflow in terminal state '{workflow.status.value}' cannot progress"
@@ -134,11 +235,11 @@ async def trigger_next_step(
             detail="Workflow has failed. Use /retry endpoint to restart"
         )
     
-    logger.info(f"Triggering next step for workflow {workflow_id}")
+    logger.info("Triggering next step for workflow %s", workflow_id)
     
     # Execute next step in background
-    from src.api.execution import execute_next_step_background
-    background_tasks.add_task(execute_next_step_background, workflow_id)
+    from src.api.execution import execute_next_step_background, run_detached
+    background_tasks.add_task(run_detached, execute_next_step_background, workflow_id, worker_manager)
     
     return {
         "message": f"Next step triggered for workflow {workflow_id}",
@@ -150,11 +251,12 @@ async def trigger_next_step(
 
 @router.post("/{workflow_id}/retry", response_model=dict)
 
-async def retry_workflow(
+def retry_workflow(
     workflow_id: int,
     background_tasks: BackgroundTasks,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao),
-    db: Session = Depends(get_db)
+    workflow_dao: WorkflowDAODep,
+    worker_manager: WorkerManagerDep,
+    db: SessionDep
 ):
     """
     Retry a failed workflow from the beginning.
@@ -176,7 +278,7 @@ async def retry_workflow(
             detail=f"Can only retry FAILED workflows. Current status: {workflow.status.value}"
         )
     
-    logger.info(f"Retrying workflow {workflow_id} (attempt {workflow.retries + 1})")
+    logger.info("Retrying workflow %s (attempt %s)", workflow_id, workflow.retries + 1)
     
     # Create orchestrator and trigger retry
     from src.core import WorkflowOrchestrator
@@ -184,10 +286,11 @@ async def retry_workflow(
     
     # Use synchronous retry trigger
     orchestrator.retry()
+    terminal_status_cache.invalidate(workflow_id)
     
     # Execute workflow in background
-    from src.api.execution import execute_workflow_background
-    background_tasks.add_task(execute_workflow_background, workflow_id)
+    from src.api.execution import execute_workflow_background, run_detached
+    background_tasks.add_task(run_detached, execute_workflow_background, workflow_id, worker_manager)
     
     return {
         "message": f"Workflow {workflow_id} retry initiated",
@@ -199,33 +302,29 @@ async def retry_workflow(
 
 
 @router.delete("/{workflow_id}", status_code=status.HTTP_204_NO_CONTENT)
-
 def delete_workflow(
     workflow_id: int,
-    workflow_dao: WorkflowDAO = Depends(get_workflow_dao)
+    workflow_dao: WorkflowDAODep
 ):
     """
     Delete a workflow and all its history.
     
     DELETE /workflow/{id}
     """
-    workflow = workflow_dao.get_by_id(workflow_id)
-    
-    if not workflow:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Workflow {workflow_id} not found"
-        )
-    
-    # Don't allow deletion of running workflows
-    if workflow.status in [WorkflowStatus.INIT, WorkflowStatus.PREPARE, 
-                           WorkflowStatus.EXECUTE, WorkflowStatus.VALIDATE]:
+    # Check and delete in one statement, running workflows are left in place
+    if not workflow_dao.delete(workflow_id, exclude_statuses=_ACTIVE):
+        # Nothing deleted, only now look up why
+        if workflow_dao.get_by_id(workflow_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Workflow {workflow_id} not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete a running workflow"
         )
     
-    workflow_dao.delete(workflow_id)
+    terminal_status_cache.invalidate(workflow_id)
     
-    logger.info(f"Deleted workflow {workflow_id}")
+    logger.info("Deleted workflow %s", workflow_id)
     return None
@@ -1,5 +1,6 @@
 """Core orchestration package."""
 from .orchestrator import WorkflowOrchestrator
 from .worker_manager import WorkerManager
+from .notifier import WorkflowStateNotifier, state_notifier
 
-__all__ = ["WorkflowOrchestrator", "WorkerManager"]
+__all__ = ["WorkflowOrchestrator", "WorkerManager", "WorkflowStateNotifier", "state_notifier"]
@@ -0,0 +1,55 @@
+"""Periodic archiving of finished workflows."""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from src.db.dao.workflow_dao import WorkflowDAO
+
+
+logger = logging.getLogger(__name__)
+
+
+def archive_terminal_workflows(after_days: int) -> int:
+    """
+    Archive every terminal workflow not updated for `after_days` days.
+    Runs in batches, one transaction each, so the write lock is never held long.
+
+    Args:
+        after_days: Age in days a finished workflow must reach to be archived
+
+    Returns:
+        Number of workflows archived
+    """
+    from src.db import SessionLocal
+
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=after_days)
+    db = SessionLocal()
+    try:
+        workflow_dao = WorkflowDAO(db)
+        total = 0
+        while True:
+            archived = workflow_dao.archive_terminal(cutoff)
+            if not archived:
+                return total
+            total += archived
+    finally:
+        db.close()
+
+
+async def archive_periodically(after_days: int, interval: float) -> None:
+    """
+    Archive old terminal workflows every `interval` seconds until cancelled.
+    Each pass runs in a worker thread, off the event loop.
+
+    Args:
+        after_days: Age in days a finished workflow must reach to be archived
+        interval: Seconds between passes
+    """
+    while True:
+        try:
+            archived = await asyncio.to_thread(archive_terminal_workflows, after_days)
+            if archived:
+                logger.info("Archived %s finished workflows", archived)
+        except Exception as e:
+            logger.error("Workflow archiving failed: %s", e)
+        await asyncio.sleep(interval)
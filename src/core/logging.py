@@ -1,29 +1,52 @@
+import atexit
 import logging
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 from typing import Optional
 
 from config import settings
 
+# Background thread writing queued records to stdout and the log file
+_listener: Optional[QueueListener] = None
+
+
 def setup_logging(log_level: Optional[str] = None) -> None:
     """
     Configure the application logging.
-    
+
+    Log calls only enqueue the record; a listener thread does the actual
+    writes, so request threads never block on the file or the terminal.
+    Calling this again only changes the level.
+
     Args:
         log_level: Optional override for the log level. If not provided,
                   uses the level from settings.
     """
+    global _listener
     level_name = log_level.upper() if log_level else settings.log_level.upper()
     level = getattr(logging, level_name, logging.INFO)
 
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler("workflow_orchestrator.log"),
-        ]
-    )
-    
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    handlers = [
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler("workflow_orchestrator.log"),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = SimpleQueue()
+    root.addHandler(QueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers)
+    _listener.start()
+    # Flush whatever is still queued on exit
+    atexit.register(_listener.stop)
+
     # Set third-party loggers to a higher level to reduce noise
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
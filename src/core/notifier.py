@@ -0,0 +1,64 @@
+"""Wake-ups for clients long-polling on workflow state changes."""
+import asyncio
+import threading
+from typing import Dict, Set, Tuple
+
+
+class WorkflowStateNotifier:
+    """
+    Tracks coroutines waiting for a workflow to change state.
+
+    Transitions may be logged from the event loop or from a worker thread,
+    so waiters are resolved through their owning loop in a thread-safe way.
+    """
+
+    def __init__(self):
+        """Initialize an empty waiter registry."""
+        self._waiters: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, workflow_id: int) -> asyncio.Future:
+        """
+        Register interest in the next state change of a workflow.
+
+        Subscribe before reading the current state so a transition that lands
+        in between is not missed.
+
+        Args:
+            workflow_id: ID of the workflow to watch
+
+        Returns:
+            Future resolved on the next state change
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._waiters.setdefault(workflow_id, set()).add((loop, future))
+        return future
+
+    def unsubscribe(self, workflow_id: int, future: asyncio.Future):
+        """Drop a waiter that is no longer interested."""
+        with self._lock:
+            waiters = self._waiters.get(workflow_id)
+            if not waiters:
+                return
+            waiters.discard((future.get_loop(), future))
+            if not waiters:
+                del self._waiters[workflow_id]
+
+    def notify(self, workflow_id: int):
+        """Wake every waiter subscribed to a workflow."""
+        with self._lock:
+            waiters = self._waiters.pop(workflow_id, ())
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+
+def _resolve(future: asyncio.Future):
+    """Complete a waiter future unless it was already cancelled."""
+    if not future.done():
+        future.set_result(None)
+
+
+# Global notifier shared by the orchestrator and the API
+state_notifier = WorkflowStateNotifier()
@@ -1,19 +1,45 @@
-"""Workflow orchestrator with state machine using transitions library."""
+"""Workflow orchestrator with a table-driven state machine."""
 import asyncio
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
-from transitions import Machine
+from typing import Optional, Dict, Any, List, Tuple
+from sqlalchemy import inspect, insert, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
+from config import settings
 from src.db import Workflow, WorkflowTransition, WorkflowStatus
+from src.db.database import commit_keeping
 from src.db.dao.workflow_dao import WorkflowDAO
 from src.db.dao.workflow_transition_dao import WorkflowTransitionDAO
+from .notifier import state_notifier
 
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class TransitionEvent:
+    """What the state machine callbacks receive for a single transition."""
+    trigger: str
+    source: str
+    dest: str
+    kwargs: Dict[str, Any]
+    # Read once per transition, every timestamp it writes uses this value.
+    # Naive UTC, the form DateTime columns hold and read back as.
+    now: datetime
+
+
+def _trigger_method(name: str):
+    """Build the public method that fires trigger `name`, e.g. `orchestrator.prepare()`."""
+    def trigger(self, **kwargs) -> bool:
+        return self._trigger(name, **kwargs)
+    trigger.__name__ = name
+    trigger.__doc__ = f"Fire the `{name}` trigger."
+    return trigger
+
+
 class WorkflowOrchestrator:
     """
     Orchestrates workflow execution using a state machine.
@@ -24,6 +50,46 @@ class WorkflowOrchestrator:
     # State machine states
     states = ['INIT', 'PREPARE', 'EXECUTE', 'VALIDATE', 'COMPLETE', 'FAILED', 'CANCELLED']
     
+    # Transitions for the workflow lifecycle
+    # INIT → PREPARE → EXECUTE → VALIDATE → COMPLETE
+    transitions = [
+        {'trigger': 'prepare', 'source': 'INIT', 'dest': 'PREPARE', 'before': '_on_state_enter', 'after': '_log_transition'},
+        {'trigger': 'execute', 'source': 'PREPARE', 'dest': 'EXECUTE', 'before': '_on_state_enter', 'after': '_log_transition'},
+        {'trigger': 'validate', 'source': 'EXECUTE', 'dest': 'VALIDATE', 'before': '_on_state_enter', 'after': '_log_transition'},
+        {'trigger': 'complete', 'source': 'VALIDATE', 'dest': 'COMPLETE', 'before': '_on_complete', 'after': '_log_transition'},
+        {'trigger': 'fail', 'source': ['INIT', 'PREPARE', 'EXECUTE', 'VALIDATE'], 'dest': 'FAILED', 'before': '_on_fail', 'after': '_log_transition'},
+        {'trigger': 'cancel', 'source': ['INIT', 'PREPARE', 'EXECUTE', 'VALIDATE'], 'dest': 'CANCELLED', 'before': '_on_cancel', 'after': '_log_transition'},
+        {'trigger': 'retry', 'source': 'FAILED', 'dest': 'INIT', 'before': '_on_retry', 'after': '_log_transition'}
+    ]
+    
+    # (source state, trigger) -> transition, so firing a trigger is one dict lookup
+    _TRANSITION_TABLE: Dict[Tuple[str, str], Dict[str, Any]] = {
+        (source, transition['trigger']): transition
+        for transition in transitions
+        for source in ([transition['source']] if isinstance(transition['source'], str) else transition['source'])
+    }
+    
+    prepare = _trigger_method('prepare')
+    execute = _trigger_method('execute')
+    validate = _trigger_method('validate')
+    complete = _trigger_method('complete')
+    fail = _trigger_method('fail')
+    cancel = _trigger_method('cancel')
+    retry = _trigger_method('retry')
+    
+    # Trigger that advances a workflow out of each state, looked up on every step
+    NEXT_TRIGGER: Dict[str, str] = {
+        transition['source']: transition['trigger']
+        for transition in transitions
+        if isinstance(transition['source'], str)
+    }
+    
+    # States where a run ends or starts over, buffered transitions are written here
+    FLUSH_STATES = frozenset({'INIT', 'COMPLETE', 'FAILED', 'CANCELLED'})
+    
+    # States a run stops in short of COMPLETE
+    STOPPED_STATES = frozenset({'FAILED', 'CANCELLED'})
+    
     # State to task type mapping
     STATE_TASKS = {
         'INIT': 'initialize',
@@ -33,6 +99,10 @@ class WorkflowOrchestrator:
         'COMPLETE': 'complete'
     }
     
+    # The automatic run as (state, task type) steps in order, and each state's position
+    _STEP_PLAN: Tuple[Tuple[str, str], ...] = tuple(STATE_TASKS.items())
+    _STEP_INDEX: Dict[str, int] = {state: index for index, (state, _) in enumerate(_STEP_PLAN)}
+    
     def __init__(self, workflow_id: int, db: Session):
         """Initialize the orchestrator for a specific workflow."""
         self.workflow_id = workflow_id
@@ -40,32 +110,57 @@ class WorkflowOrchestrator:
         self.workflow_dao = WorkflowDAO(db)
         self.transition_dao = WorkflowTransitionDAO(db)
         self.workflow = self._load_workflow()
-
-        # Define transitions for the workflow lifecycle
-        # INIT → PREPARE → EXECUTE → VALIDATE → COMPLETE
-        self.transitions = [
-            {'trigger': 'prepare', 'source': 'INIT', 'dest': 'PREPARE', 'before': '_on_state_enter', 'after': '_log_transition'},
-            {'trigger': 'execute', 'source': 'PREPARE', 'dest': 'EXECUTE', 'before': '_on_state_enter', 'after': '_log_transition'},
-            {'trigger': 'validate', 'source': 'EXECUTE', 'dest': 'VALIDATE', 'before': '_on_state_enter', 'after': '_log_transition'},
-            {'trigger': 'complete', 'source': 'VALIDATE', 'dest': 'COMPLETE', 'before': '_on_complete', 'after': '_log_transition'},
-            {'trigger': 'fail', 'source': ['INIT', 'PREPARE', 'EXECUTE', 'VALIDATE'], 'dest': 'FAILED', 'before': '_on_fail', 'after': '_log_transition'},
-            {'trigger': 'cancel', 'source': ['INIT', 'PREPARE', 'EXECUTE', 'VALIDATE'], 'dest': 'CANCELLED', 'before': '_on_cancel', 'after': '_log_transition'},
-            {'trigger': 'retry', 'source': 'FAILED', 'dest': 'INIT', 'before': '_on_retry', 'after': '_log_transition'}
-        ]
-
-        # Initialize state machine
-        self.machine = Machine(
-            model=self,
-            states=WorkflowOrchestrator.states,
-            initial=self.workflow.status.value,
-            transitions=self.transitions,
-            auto_transitions=False,
-            send_event=True,
-        )
+        self.state: str = self.workflow.status.value
         
-        self._event_queue = asyncio.Queue()
-        self._running = False
         self._task_results = {}
+        # Transition rows not yet inserted (only with settings.batch_transitions)
+        self._pending_transitions: List[Dict[str, Any]] = []
+    
+    def _trigger(self, name: str, **kwargs) -> bool:
+        """
+        Move along the transition `name` from the current state.
+        Runs its `before` callback, switches state, then runs its `after` callback;
+        if `before` raises the state is left unchanged.
+        
+        Returns:
+            False if the workflow was moved by another session first, nothing
+            is written then and the state is reloaded from the database
+        
+        Raises:
+            ValueError: If `name` isn't valid from the current state
+        """
+        transition = self._TRANSITION_TABLE.get((self.state, name))
+        if transition is None:
+            raise ValueError(f"Can't trigger event {name} from state {self.state}")
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        event = TransitionEvent(name, self.state, transition['dest'], kwargs, now)
+        getattr(self, transition['before'])(event)
+        self.state = event.dest
+        return getattr(self, transition['after'])(event)
+    
+    def may_trigger(self, name: str) -> bool:
+        """Whether trigger `name` is valid from the current state."""
+        return (self.state, name) in self._TRANSITION_TABLE
+    
+    def may_cancel(self) -> bool:
+        """Whether the workflow can still be cancelled."""
+        return self.may_trigger('cancel')
+    
+    def _release_connection(self):
+        """
+        End the session's current read transaction before a long wait,
+        so its pooled connection goes back to the pool meanwhile.
+        Loaded objects are expired and reload on next access.
+        """
+        self.db.commit()
+    
+    def _cancel_requested(self) -> bool:
+        """
+        Check whether the workflow was cancelled from outside this run
+        (the cancel endpoint applies the transition in its own session).
+        """
+        self.db.refresh(self.workflow)
+        return self.workflow.status == WorkflowStatus.CANCELLED
     
     def _load_workflow(self) -> Workflow:
         """Load workflow from database."""
@@ -74,82 +169,152 @@ class WorkflowOrchestrator:
             raise ValueError(f"Workflow {self.workflow_id} not found")
         return workflow
     
-    def _log_transition(self, event):
-        """Log state transitions to database."""
-        transition = WorkflowTransition(
-            workflow_id=self.workflow_id,
-            from_state=event.transition.source,
-            to_state=event.transition.dest,
-            trigger=event.event.name,
-            metadata={"timestamp": datetime.now(timezone.utc).isoformat()}
-        )
-        self.transition_dao.create(transition)
+    def _log_transition(self, event) -> bool:
+        """
+        Log state transitions to database.
         
-        # Update workflow status and current_state
-        self.workflow_dao.update(self.workflow_id, {
-            "status": WorkflowStatus(event.transition.dest),
-            "current_state": event.transition.dest,
-            "updated_at": datetime.now(timezone.utc)
-        })
+        The transition row, the new status and whatever the `before` hook
+        changed on the workflow go out in a single commit, and the workflow
+        object is kept as is instead of being reloaded.
         
-        # Refresh local workflow object
-        self.workflow = self.workflow_dao.get_by_id(self.workflow_id)
+        With `settings.batch_transitions` the rows are buffered instead and
+        inserted together once the run reaches one of `FLUSH_STATES`.
+        
+        Returns:
+            False if another session moved the workflow out of `event.source`
+            first (e.g. a cancel), see `_write_status`
+        """
+        if not self._write_status(event):
+            return False
+        
+        row = {
+            "workflow_id": self.workflow_id,
+            "from_state": event.source,
+            "to_state": event.dest,
+            "trigger": event.trigger,
+            "transition_metadata": {"timestamp": event.now.replace(tzinfo=timezone.utc).isoformat()},
+            # A buffered row keeps its place in the history
+            "created_at": event.now,
+        }
+        keep = [self.workflow]
+        if settings.batch_transitions:
+            self._pending_transitions.append(row)
+            if event.dest in self.FLUSH_STATES:
+                self._insert_pending_transitions()
+        else:
+            transition = WorkflowTransition(**row)
+            self.db.add(transition)
+            keep.append(transition)
+        
+        commit_keeping(self.db, *keep)
+        
+        # Wake any long-poll clients waiting on this workflow
+        state_notifier.notify(self.workflow_id)
         
         logger.info(
-            f"Workflow {self.workflow_id}: {event.transition.source} → "
-            f"{event.transition.dest} (trigger: {event.event.name})"
+            "Workflow %s: %s → %s (trigger: %s)",
+            self.workflow_id, event.source, event.dest, event.trigger
         )
+        return True
+    
+    def _write_status(self, event) -> bool:
+        """
+        Write the new status, together with whatever the `before` hook staged
+        on the workflow, in one UPDATE that only matches while the row is
+        still in `event.source`.
+        
+        The status is read and written in separate transactions, so a cancel
+        committed in between must not be overwritten by the advance. When the
+        UPDATE matches nothing the staged changes are rolled back and the
+        workflow and state are reloaded, leaving the caller to stop.
+        """
+        state = inspect(self.workflow)
+        values = {
+            key: state.attrs[key].history.added[0]
+            for key in state.mapper.column_attrs.keys()
+            if state.attrs[key].history.added
+        }
+        values.update(status=WorkflowStatus(event.dest), current_state=event.dest, updated_at=event.now)
+        
+        with self.db.no_autoflush:
+            result = self.db.execute(
+                update(Workflow)
+                .where(Workflow.id == self.workflow_id, Workflow.status == WorkflowStatus(event.source))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        if result.rowcount == 0:
+            self.db.rollback()
+            self.workflow = self._load_workflow()
+            self.state = self.workflow.status.value
+            logger.warning(
+                "Workflow %s left %s meanwhile (now %s), dropping transition to %s",
+                self.workflow_id, event.source, self.state, event.dest
+            )
+            return False
+        
+        # Already written, record them as loaded so the commit doesn't repeat them
+        for key, value in values.items():
+            set_committed_value(self.workflow, key, value)
+        return True
+    
+    def _insert_pending_transitions(self):
+        """Insert the buffered transition rows in one statement, without committing."""
+        if self._pending_transitions:
+            self.db.execute(insert(WorkflowTransition), self._pending_transitions)
+            self._pending_transitions = []
+    
+    def flush_transitions(self):
+        """Write any buffered transitions, e.g. when a run stops short of a terminal state."""
+        if self._pending_transitions:
+            self._insert_pending_transitions()
+            self.db.commit()
+    
+    # The `before` hooks only stage changes on self.workflow,
+    # `_log_transition` commits them together with the new status.
     
     def _on_state_enter(self, event):
         """Handle entering a new workflow state."""
-        logger.info(f"Entering state {event.transition.dest} for workflow {self.workflow_id}")
+        logger.info("Entering state %s for workflow %s", event.dest, self.workflow_id)
         if self.workflow.started_at is None:
-            self.workflow.started_at = datetime.now(timezone.utc)
-            self.workflow_dao.update(self.workflow_id, {"started_at": self.workflow.started_at})
+            self.workflow.started_at = event.now
     
     def _on_complete(self, event):
         """Handle workflow completion."""
-        completed_at = datetime.now(timezone.utc)
-        self.workflow_dao.update(self.workflow_id, {"completed_at": completed_at})
-        self.workflow.completed_at = completed_at
-        logger.info(f"Completed workflow {self.workflow_id}")
+        self.workflow.completed_at = event.now
+        logger.info("Completed workflow %s", self.workflow_id)
     
     def _on_fail(self, event):
         """Handle workflow failure."""
-        completed_at = datetime.now(timezone.utc)
         error_msg = str(event.kwargs.get('error', 'Unknown error'))
-        
-        self.workflow_dao.update(self.workflow_id, {
-            "completed_at": completed_at,
-            "error_message": error_msg
-        })
-        
-        self.workflow.completed_at = completed_at
+        self.workflow.completed_at = event.now
         self.workflow.error_message = error_msg
-        logger.error(f"Failed workflow {self.workflow_id}: {error_msg}")
+        logger.error("Failed workflow %s: %s", self.workflow_id, error_msg)
     
     def _on_cancel(self, event):
         """Handle workflow cancellation."""
-        completed_at = datetime.now(timezone.utc)
-        self.workflow_dao.update(self.workflow_id, {"completed_at": completed_at})
-        self.workflow.completed_at = completed_at
-        logger.info(f"Cancelled workflow {self.workflow_id}")
+        self.workflow.completed_at = event.now
+        logger.info("Cancelled workflow %s", self.workflow_id)
     
     def _on_retry(self, event):
         """Handle workflow retry."""
-        self.workflow_dao.update(self.workflow_id, {
-            "retries": self.workflow.retries + 1,
-            "error_message": None,
-            "completed_at": None,
-            "started_at": None
-        })
-        # Refresh local state
-        self.workflow = self.workflow_dao.get_by_id(self.workflow_id)
-        logger.info(f"Retrying workflow {self.workflow_id} (attempt {self.workflow.retries})")
-    
-    async def emit_event(self, event_name: str, **kwargs):
-        """Emit an event to the orchestrator."""
-        await self._event_queue.put((event_name, kwargs))
+        self.workflow.retries += 1
+        self.workflow.error_message = None
+        self.workflow.completed_at = None
+        self.workflow.started_at = None
+        logger.info("Retrying workflow %s (attempt %s)", self.workflow_id, self.workflow.retries)
+    
+    def _fire(self, event_name: str, **kwargs):
+        """
+        Apply a state machine trigger right away.
+        A trigger that raises fails the workflow instead, unless it was `fail` itself.
+        """
+        try:
+            getattr(self, event_name)(**kwargs)
+        except Exception as e:
+            logger.error("Error processing event %s: %s", event_name, e)
+            if self.state != 'FAILED' and event_name != 'fail':
+                self._fire('fail', error=str(e))
     
     def _transition_to_next_state(self):
         """
@@ -158,11 +323,11 @@ class WorkflowOrchestrator:
         """
         next_trigger = self.get_next_trigger()
         if next_trigger:
-            logger.info(f"Transitioning workflow {self.workflow_id} via trigger: {next_trigger}")
+            logger.info("Transitioning workflow %s via trigger: %s", self.workflow_id, next_trigger)
             trigger_method = getattr(self, next_trigger)
             trigger_method()
         else:
-            logger.info(f"Workflow {self.workflow_id} in terminal state: {self.state}")
+            logger.info("Workflow %s in terminal state: %s", self.workflow_id, self.state)
     
     async def execute_workflow(self, worker_manager):
         """
@@ -174,56 +339,26 @@ class WorkflowOrchestrator:
         """
         return await self.execute_automatic(worker_manager)
     
-    async def process_events(self):
-        """Process events from the queue."""
-        self._running = True
-        
-        while self._running:
-            try:
-                # Wait for event with timeout
-                event_name, kwargs = await asyncio.wait_for(
-                    self._event_queue.get(),
-                    timeout=1.0
-                )
-                
-                # Trigger state machine transition
-                if hasattr(self, event_name):
-                    trigger = getattr(self, event_name)
-                    trigger(**kwargs)
-                else:
-                    logger.warning(f"Unknown event: {event_name}")
-                
-            except asyncio.TimeoutError:
-                # No events, continue
-                continue
-            except Exception as e:
-                logger.error(f"Error processing event: {e}")
-                # Only emit fail event if we are not already in FAILED state
-                # and if the error didn't occur while trying to process a 'fail' event
-                if self.state != 'FAILED' and event_name != 'fail':
-                    await self.emit_event('fail', error=str(e))
-                else:
-                    # If we are already failed or failed to process 'fail', stop running
-                    self._running = False
-    
     def get_next_trigger(self) -> Optional[str]:
         """
         Determine the next trigger based on current state.
         Returns the trigger name to advance to the next state.
         """
-        for transition in self.transitions:
-            if transition['source'] == self.state:
-                return transition['trigger']
-        return None
+        return self.next_trigger_for(self.state)
+    
+    @classmethod
+    def next_trigger_for(cls, state: str) -> Optional[str]:
+        """Return the trigger that advances a workflow out of `state`."""
+        return cls.NEXT_TRIGGER.get(state)
     
-    async def advance_to_next_state(self):
+    def advance_to_next_state(self):
         """Advance workflow to the next state after task completion."""
         next_trigger = self.get_next_trigger()
         if next_trigger:
-            logger.info(f"Advancing workflow {self.workflow_id} via trigger: {next_trigger}")
-            await self.emit_event(next_trigger)
+            logger.info("Advancing workflow %s via trigger: %s", self.workflow_id, next_trigger)
+            self._fire(next_trigger)
         else:
-            logger.info(f"Workflow {self.workflow_id} in terminal state: {self.state}")
+            logger.info("Workflow %s in terminal state: %s", self.workflow_id, self.state)
     
     async def execute_automatic(self, worker_manager):
         """
@@ -233,26 +368,19 @@ class WorkflowOrchestrator:
             worker_manager: WorkerManager instance for executing tasks
         """
         try:
-            # Start event processor
-            event_task = asyncio.create_task(self.process_events())
-            
             # Progress through all workflow states
-            workflow_sequence = ['INIT', 'PREPARE', 'EXECUTE', 'VALIDATE', 'COMPLETE']
-            current_index = workflow_sequence.index(self.state)
+            current_index = self._STEP_INDEX[self.state]
             
-            logger.info(f"Starting automatic execution from state {self.state}")
+            logger.info("Starting automatic execution from state %s", self.state)
             
             # Execute each state in sequence
-            for state in workflow_sequence[current_index:]:
+            for state, task_type in self._STEP_PLAN[current_index:]:
                 if state == 'COMPLETE':
                     # Trigger final completion
-                    await self.advance_to_next_state()
-                    break
-                
-                # Get task type for this state
-                task_type = self.STATE_TASKS.get(state, 'default')
+                    await asyncio.to_thread(self.advance_to_next_state)
+                    return self.state == 'COMPLETE'
                 
-                logger.info(f"Executing {task_type} task for state {state}")
+                logger.info("Executing %s task for state %s", task_type, state)
                 
                 # Submit task to worker manager
                 task_config = {
@@ -263,45 +391,36 @@ class WorkflowOrchestrator:
                     'retries': self.workflow.retries
                 }
                 
-                # Execute task in thread pool
-                future = worker_manager.submit_workflow_task(
-                    self.workflow_id, 
-                    task_type, 
-                    task_config,
-                    self.db
-                )
+                # Run the task, the session gives its connection back while waiting
+                await asyncio.to_thread(self._release_connection)
+                result = await worker_manager.run_workflow_task(self.workflow_id, task_type, task_config)
                 
-                # Wait for task completion
-                result = await asyncio.get_event_loop().run_in_executor(None, future.result)
+                if await asyncio.to_thread(self._cancel_requested):
+                    logger.info("Workflow %s was cancelled, stopping in state %s", self.workflow_id, state)
+                    return False
                 
                 if not result.get('success', False):
                     # Task failed
                     error = result.get('error', 'Task execution failed')
-                    await self.emit_event('fail', error=error)
-                    self._running = False
-                    await event_task
+                    await asyncio.to_thread(self._fire, 'fail', error=error)
                     return False
                 
                 # Store result
                 self._task_results[state] = result
                 
-                # Advance to next state
-                await self.advance_to_next_state()
-                
-                # Small delay to allow state transition to complete
-                await asyncio.sleep(2)
-            
-            # Stop event processor
-            self._running = False
-            await event_task
+                # Advance to next state, the transition is applied before this returns
+                await asyncio.to_thread(self.advance_to_next_state)
+                if self.state in self.STOPPED_STATES:
+                    return False
             
             return True
             
         except Exception as e:
-            logger.error(f"Workflow execution error: {e}")
-            await self.emit_event('fail', error=str(e))
-            self._running = False
+            logger.error("Workflow execution error: %s", e)
+            await asyncio.to_thread(self._fire, 'fail', error=str(e))
             return False
+        finally:
+            await asyncio.to_thread(self.flush_transitions)
     
     async def execute_next_step(self, worker_manager):
         """
@@ -316,16 +435,13 @@ class WorkflowOrchestrator:
             
             # Check if in terminal state
             if current_state in ['COMPLETE', 'FAILED', 'CANCELLED']:
-                logger.warning(f"Cannot execute next step from terminal state: {current_state}")
+                logger.warning("Cannot execute next step from terminal state: %s", current_state)
                 return False
             
-            # Start event processor
-            event_task = asyncio.create_task(self.process_events())
-            
             # Get task type for current state
             task_type = self.STATE_TASKS.get(current_state, 'default')
             
-            logger.info(f"Executing next step: {task_type} for state {current_state}")
+            logger.info("Executing next step: %s for state %s", task_type, current_state)
             
             # Submit task to worker manager
             task_config = {
@@ -336,62 +452,87 @@ class WorkflowOrchestrator:
                 'retries': self.workflow.retries
             }
             
-            # Execute task in thread pool
-            future = worker_manager.submit_workflow_task(
-                self.workflow_id, 
-                task_type, 
-                task_config,
-                self.db
-            )
+            # Run the task, the session gives its connection back while waiting
+            await asyncio.to_thread(self._release_connection)
+            result = await worker_manager.run_workflow_task(self.workflow_id, task_type, task_config)
             
-            # Wait for task completion
-            result = await asyncio.get_event_loop().run_in_executor(None, future.result)
+            if await asyncio.to_thread(self._cancel_requested):
+                logger.info("Workflow %s was cancelled, stopping in state %s", self.workflow_id, current_state)
+                return False
             
             if not result.get('success', False):
                 # Task failed
                 error = result.get('error', 'Task execution failed')
-                await self.emit_event('fail', error=error)
-                self._running = False
-                await event_task
+                await asyncio.to_thread(self._fire, 'fail', error=error)
                 return False
             
             # Store result
             self._task_results[current_state] = result
             
             # Advance to next state
-            await self.advance_to_next_state()
+            await asyncio.to_thread(self.advance_to_next_state)
             
-            # Stop event processor
-            self._running = False
-            await event_task
-            
-            return True
+            return self.state not in self.STOPPED_STATES
             
         except Exception as e:
-            logger.error(f"Next step execution error: {e}")
-            await self.emit_event('fail', error=str(e))
-            self._running = False
+            logger.error("Next step execution error: %s", e)
+            await asyncio.to_thread(self._fire, 'fail', error=str(e))
             return False
+        finally:
+            await asyncio.to_thread(self.flush_transitions)
     
     def get_status(self) -> Dict[str, Any]:
         """Get current workflow status."""
-        # Refresh workflow data
-        self.workflow = self.workflow_dao.get_by_id(self.workflow_id)
+        # Refresh workflow data together with its transition history
+        self.workflow = self.workflow_dao.get_full(self.workflow_id)
         
-        # Get all transitions for history
-        transitions = self.transition_dao.get_by_workflow_id(self.workflow_id)
+        return self.status_from_row(self.workflow, self._task_results)
+    
+    @classmethod
+    def status_from_row(
+        cls,
+        workflow: Workflow,
+        task_results: Optional[Dict[str, Any]] = None,
+        include_tasks: bool = False,
+        transitions: Optional[List[Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the status payload from an already loaded workflow row.
         
-        return {
-            "workflow_id": self.workflow_id,
-            "name": self.workflow.name,
-            "description": self.workflow.description,
-            "status": self.workflow.status.value,
-            "current_state": self.workflow.current_state,
-            "retries": self.workflow.retries,
-            "started_at": self.workflow.started_at,
-            "completed_at": self.workflow.completed_at,
-            "error_message": self.workflow.error_message,
-            "next_trigger": self.get_next_trigger(),
-            "transitions": transitions,
-            "task_results": self._task_results
+        Args:
+            workflow: Workflow row, ideally with transitions eagerly loaded
+            task_results: Task results collected during execution
+            include_tasks: Add a `tasks` summary list; load the row with
+                `get_full(..., include_tasks=True)` to avoid a lazy load
+            transitions: Transition history fetched separately (e.g. as
+                plain rows); defaults to `workflow.transitions`
+        """
+        payload = {
+            "workflow_id": workflow.id,
+            "name": workflow.name,
+            "description": workflow.description,
+            "status": workflow.status.value,
+            "current_state": workflow.current_state,
+            "retries": workflow.retries,
+            "started_at": workflow.started_at,
+            "completed_at": workflow.completed_at,
+            "error_message": workflow.error_message,
+            "next_trigger": cls.next_trigger_for(workflow.status.value),
+            "transitions": workflow.transitions if transitions is None else transitions,
+            "task_results": task_results or {}
         }
+        if include_tasks:
+            payload["tasks"] = [
+                {
+                    "id": task.id,
+                    "name": task.name,
+                    "task_type": task.task_type,
+                    "status": task.status.value,
+                    "result": task.result,
+                    "error_message": task.error_message,
+                    "started_at": task.started_at,
+                    "completed_at": task.completed_at,
+                }
+                for task in workflow.tasks
+            ]
+        return payload
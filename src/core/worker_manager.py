@@ -1,12 +1,12 @@
 """Worker manager for parallel task execution using threads and queue."""
+import asyncio
 import logging
-import queue
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, Future
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, Callable
-from sqlalchemy.orm import Session, sessionmaker
+from typing import Optional, Dict, Any, Callable, Set
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 
 from config import settings
 from src.db import Task, TaskStatus, SessionLocal as DefaultSessionLocal
@@ -16,11 +16,28 @@ from src.db.dao.task_dao import TaskDAO
 logger = logging.getLogger(__name__)
 
 
+def _sum_of_squares(n: int) -> int:
+    """Closed form of `sum(i * i for i in range(n))`, without a Python-level loop."""
+    n = max(n, 0)
+    return n * (n - 1) * (2 * n - 1) // 6
+
+
 class WorkerManager:
     """
-    Manages parallel task execution using a thread pool and queue.Queue.
+    Manages parallel task execution using a thread pool.
+    The API keeps one instance per process (see `get_worker_manager`).
     """
     
+    # Simulated duration of each built-in workflow state task, in seconds.
+    # These tasks only wait, so they run on the event loop instead of a worker thread.
+    SIMULATED_DURATIONS: Dict[str, float] = {
+        "initialize": 0.5,
+        "prepare": 0.7,
+        "execute": 1.0,
+        "validate": 0.6,
+        "complete": 0.3,
+    }
+    
     def __init__(self, max_workers: Optional[int] = None, session_factory: Optional[sessionmaker] = None):
         """
         Initialize the worker manager.
@@ -30,13 +47,16 @@ class WorkerManager:
             session_factory: Optional session factory for database access (for testing)
         """
         self.max_workers = max_workers or settings.max_workers
+        # Threads are only started as work is submitted
         self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
-        self.task_queue = queue.Queue()
-        self.active_tasks: Dict[int, Future] = {}
+        # Futures submitted to the pool and not finished yet, each removes itself when done
+        self.active_tasks: Set[Future] = set()
         self._shutdown = False
         self.session_factory = session_factory or DefaultSessionLocal
+        # One Session object per worker thread, reused from task to task
+        self._thread_sessions = scoped_session(self.session_factory)
         
-        logger.info(f"WorkerManager initialized with {self.max_workers} workers")
+        logger.info("WorkerManager initialized with %s workers", self.max_workers)
     
     def submit_workflow_task(self, workflow_id: int, task_type: str, task_config: Dict[str, Any], db: Session) -> Future:
         """
@@ -51,12 +71,45 @@ class WorkerManager:
         Returns:
             Future object representing the task execution
         """
-        logger.info(f"Submitting workflow task {task_type} for workflow {workflow_id}")
+        logger.info("Submitting workflow task %s for workflow %s", task_type, workflow_id)
         
         # Submit task to thread pool
         future = self.executor.submit(self._execute_workflow_task, workflow_id, task_type, task_config)
         
-        return future
+        return self._track(future)
+    
+    async def run_workflow_task(self, workflow_id: int, task_type: str, task_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a workflow state task and return its result.
+        
+        The built-in state tasks are simulated waits and run as coroutines, so
+        they don't hold a worker thread. Any other task type goes to the thread pool.
+        
+        Args:
+            workflow_id: ID of the workflow
+            task_type: Type of task to execute
+            task_config: Task configuration
+            
+        Returns:
+            Task execution result with success flag
+        """
+        duration = self.SIMULATED_DURATIONS.get(task_type)
+        if duration is None:
+            future = self.executor.submit(self._execute_workflow_task, workflow_id, task_type, task_config)
+            return await asyncio.wrap_future(self._track(future))
+        
+        try:
+            logger.info("Executing workflow task %s for workflow %s on the event loop", task_type, workflow_id)
+            self._check_simulated_failure(task_type, task_config)
+            await asyncio.sleep(duration)
+            result = self._run_workflow_task_logic(task_type, task_config)
+            
+            logger.info("Workflow task %s completed successfully", task_type)
+            return {"success": True, "result": result, "task_type": task_type}
+            
+        except Exception as e:
+            logger.error("Workflow task %s failed: %s", task_type, e)
+            return {"success": False, "error": str(e), "task_type": task_type}
     
     def _execute_workflow_task(self, workflow_id: int, task_type: str, task_config: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -71,21 +124,37 @@ class WorkerManager:
             Task execution result with success flag
         """
         try:
-            logger.info(f"Executing workflow task {task_type} for workflow {workflow_id} in thread {threading.current_thread().name}")
+            logger.info("Executing workflow task %s for workflow %s in thread %s", task_type, workflow_id, threading.current_thread().name)
             
             # Execute task logic based on task type
+            self._check_simulated_failure(task_type, task_config)
+            if task_type in self.SIMULATED_DURATIONS:
+                time.sleep(self.SIMULATED_DURATIONS[task_type])
             result = self._run_workflow_task_logic(task_type, task_config)
             
-            logger.info(f"Workflow task {task_type} completed successfully")
+            logger.info("Workflow task %s completed successfully", task_type)
             return {"success": True, "result": result, "task_type": task_type}
             
         except Exception as e:
-            logger.error(f"Workflow task {task_type} failed: {e}")
+            logger.error("Workflow task %s failed: %s", task_type, e)
             return {"success": False, "error": str(e), "task_type": task_type}
     
+    def _check_simulated_failure(self, task_type: str, config: Dict[str, Any]):
+        """Raise if the workflow config asks for a simulated failure on this attempt."""
+        workflow_config = config.get("workflow_config", {})
+        if workflow_config.get("simulate_failure", False):
+            retries = config.get("retries", 0)
+            fail_until_retry = workflow_config.get("fail_until_retry", 1)
+            
+            if retries < fail_until_retry:
+                logger.warning("Simulating failure for task %s (retry %s/%s)", task_type, retries, fail_until_retry)
+                raise Exception(f"Simulated failure for demo (retry {retries})")
+    
     def _run_workflow_task_logic(self, task_type: str, config: Dict[str, Any]) -> Dict[str, Any]:
         """
         Execute the actual workflow task logic based on task type.
+        The simulated wait of the built-in types (`SIMULATED_DURATIONS`)
+        is applied by the caller.
         
         Args:
             task_type: Type of task to execute
@@ -94,22 +163,11 @@ class WorkerManager:
         Returns:
             Task execution result
         """
-        logger.debug(f"Running workflow task type: {task_type} with config: {config}")
+        logger.debug("Running workflow task type: %s with config: %s", task_type, config)
         
-        # Check for failure simulation
-        workflow_config = config.get("workflow_config", {})
-        if workflow_config.get("simulate_failure", False):
-            retries = config.get("retries", 0)
-            fail_until_retry = workflow_config.get("fail_until_retry", 1)
-            
-            if retries < fail_until_retry:
-                logger.warning(f"Simulating failure for task {task_type} (retry {retries}/{fail_until_retry})")
-                raise Exception(f"Simulated failure for demo (retry {retries})")
-
         # Task implementations for each workflow state
         if task_type == "initialize":
             # INIT state: Set up initial resources
-            time.sleep(0.5)  # Simulate initialization
             return {
                 "status": "initialized",
                 "message": "Workflow resources initialized",
@@ -118,7 +176,6 @@ class WorkerManager:
         
         elif task_type == "prepare":
             # PREPARE state: Prepare data and resources
-            time.sleep(0.7)  # Simulate preparation
             return {
                 "status": "prepared",
                 "message": "Data and resources prepared",
@@ -129,8 +186,7 @@ class WorkerManager:
         elif task_type == "execute":
             # EXECUTE state: Run main computation
             iterations = config.get("iterations", 5000)
-            result = sum(i * i for i in range(iterations))
-            time.sleep(1.0)  # Simulate heavy computation
+            result = _sum_of_squares(iterations)
             return {
                 "status": "executed",
                 "message": "Main computation completed",
@@ -141,7 +197,6 @@ class WorkerManager:
         
         elif task_type == "validate":
             # VALIDATE state: Validate results
-            time.sleep(0.6)  # Simulate validation
             validation_passed = True  # In real scenario, would check actual results
             return {
                 "status": "validated",
@@ -153,7 +208,6 @@ class WorkerManager:
         
         elif task_type == "complete":
             # COMPLETE state: Finalize workflow
-            time.sleep(0.3)  # Simulate finalization
             return {
                 "status": "completed",
                 "message": "Workflow finalized",
@@ -162,7 +216,7 @@ class WorkerManager:
         
         else:
             # Default task execution
-            logger.warning(f"Unknown workflow task type: {task_type}, executing as default")
+            logger.warning("Unknown workflow task type: %s, executing as default", task_type)
             time.sleep(0.5)
             return {
                 "status": "success",
@@ -189,18 +243,19 @@ class WorkerManager:
         if not task:
             raise ValueError(f"Task {task_id} not found")
         
-        # Update task status to queued
-        task_dao.update(task_id, {
-            "status": TaskStatus.QUEUED,
-            "updated_at": datetime.now(timezone.utc)
-        })
-        
-        logger.info(f"Submitting task {task_id} ({task.name}) to worker pool")
+        # No separate QUEUED commit, the worker marks the task RUNNING when it picks it up
+        logger.info("Submitting task %s (%s) to worker pool", task_id, task.name)
         
         # Submit task to thread pool
         future = self.executor.submit(self._execute_task, task_id)
-        self.active_tasks[task_id] = future
         
+        return self._track(future)
+    
+    def _track(self, future: Future) -> Future:
+        """Count `future` as active until it finishes, however it finishes."""
+        self.active_tasks.add(future)
+        # Runs at once if the future is already done
+        future.add_done_callback(self.active_tasks.discard)
         return future
     
     def _execute_task(self, task_id: int) -> bool:
@@ -213,25 +268,26 @@ class WorkerManager:
         Returns:
             True if task succeeded, False otherwise
         """
-        # Create new database session for this thread
-        db = self.session_factory()
+        # This thread's session; its connection is only checked out while a query runs
+        db = self._thread_sessions()
         task_dao = TaskDAO(db)
         
         try:
             # Load task
             task = task_dao.get_by_id(task_id)
             if not task:
-                logger.error(f"Task {task_id} not found in database")
+                logger.error("Task %s not found in database", task_id)
                 return False
             
-            # Update status to running
+            # First of the task's two commits; the second records the outcome
+            started_at = datetime.now(timezone.utc)
             task_dao.update(task_id, {
                 "status": TaskStatus.RUNNING,
-                "started_at": datetime.now(timezone.utc),
-                "updated_at": datetime.now(timezone.utc)
+                "started_at": started_at,
+                "updated_at": started_at
             })
             
-            logger.info(f"Executing task {task_id} ({task.name}) in thread {threading.current_thread().name}")
+            logger.info("Executing task %s (%s) in thread %s", task_id, task.name, threading.current_thread().name)
             
             # Execute task based on task type
             result = self._run_task_logic(task)
@@ -244,11 +300,11 @@ class WorkerManager:
                 "result": result
             })
             
-            logger.info(f"Task {task_id} completed successfully")
+            logger.info("Task %s completed successfully", task_id)
             return True
             
         except Exception as e:
-            logger.error(f"Task {task_id} failed: {e}")
+            logger.error("Task %s failed: %s", task_id, e)
             
             # Update task status to failed
             task_dao.update(task_id, {
@@ -261,9 +317,8 @@ class WorkerManager:
             return False
             
         finally:
+            # Hand the connection back and clear the identity map, but keep the session
             db.close()
-            # Remove from active tasks
-            self.active_tasks.pop(task_id, None)
     
     def _run_task_logic(self, task: Task) -> Dict[str, Any]:
         """
@@ -281,7 +336,7 @@ class WorkerManager:
         task_type = task.task_type
         config = task.config or {}
         
-        logger.debug(f"Running task type: {task_type} with config: {config}")
+        logger.debug("Running task type: %s with config: %s", task_type, config)
         
         # Simulate task execution
         if task_type == "sleep":
@@ -293,7 +348,7 @@ class WorkerManager:
         elif task_type == "compute":
             # Simulate computation
             iterations = config.get("iterations", 1000)
-            result = sum(i * i for i in range(iterations))
+            result = _sum_of_squares(iterations)
             return {"status": "success", "result": result}
         
         elif task_type == "http_request":
@@ -304,16 +359,17 @@ class WorkerManager:
         
         else:
             # Default task execution
-            logger.warning(f"Unknown task type: {task_type}, executing as no-op")
+            logger.warning("Unknown task type: %s, executing as no-op", task_type)
             return {"status": "success", "task_type": task_type}
     
     def get_queue_size(self) -> int:
-        """Get the number of tasks in the queue."""
-        return self.task_queue.qsize()
+        """Get the number of submitted tasks still waiting for a free worker thread."""
+        # The executor's own work queue, there is no separate task queue
+        return self.executor._work_queue.qsize()
     
     def get_active_count(self) -> int:
         """Get the number of currently executing tasks."""
-        return len(self.active_tasks)
+        return sum(1 for future in list(self.active_tasks) if future.running())
     
     def shutdown(self, wait: bool = True):
         """
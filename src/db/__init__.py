@@ -1,16 +1,18 @@
 """Database package."""
-from .database import init_db, get_db, SessionLocal, engine
-from .models import Base, Workflow, Task, WorkflowTransition, WorkflowStatus, TaskStatus
+from .database import init_db, get_db, SessionLocal, engine, pool_capacity
+from .models import Base, Workflow, Task, WorkflowTransition, WorkflowArchive, WorkflowStatus, TaskStatus
 
 __all__ = [
     "init_db",
     "get_db",
     "SessionLocal",
     "engine",
+    "pool_capacity",
     "Base",
     "Workflow",
     "Task",
     "WorkflowTransition",
+    "WorkflowArchive",
     "WorkflowStatus",
     "TaskStatus",
 ]
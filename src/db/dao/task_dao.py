@@ -1,5 +1,7 @@
-from typing import List, Optional, Any, Dict
-from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional, Any, Dict
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session, raiseload
+from src.db.database import commit_keeping
 from src.db.models import Task, TaskStatus
 
 class TaskDAO:
@@ -9,21 +11,121 @@ class TaskDAO:
     def create(self, task: Task) -> Task:
         """Create a new task."""
         self.db.add(task)
-        self.db.commit()
-        self.db.refresh(task)
+        # The INSERT fills in the ID and defaults, no need to read the row back
+        commit_keeping(self.db, task)
         return task
 
+    def create_many(self, rows: List[Dict[str, Any]]) -> List[Task]:
+        """
+        Create several tasks with INSERT ... RETURNING, in one transaction.
+        The tasks come back in the order of `rows`. Backends that can match
+        returned rows to their parameters batch the INSERT; SQLite can't, so
+        it runs one INSERT per task.
+        
+        Args:
+            rows: Column values per task; unset columns get their defaults.
+        """
+        if not rows:
+            return []
+        tasks = list(self.db.scalars(insert(Task).returning(Task, sort_by_parameter_order=True), rows))
+        commit_keeping(self.db, *tasks)
+        return tasks
+
     def get_by_id(self, task_id: int) -> Optional[Task]:
         """Get a task by its ID."""
-        return self.db.query(Task).filter(Task.id == task_id).first()
+        return self.db.get(Task, task_id)
 
     def get_by_workflow_id(self, workflow_id: int) -> List[Task]:
-        """Get all tasks for a specific workflow."""
-        return self.db.query(Task).filter(Task.workflow_id == workflow_id).all()
+        """Get all tasks for a specific workflow, in ID order."""
+        return self.db.query(Task)\
+            .filter(Task.workflow_id == workflow_id)\
+            .order_by(Task.id)\
+            .all()
+
+    def get_rows_by_workflow_id(self, workflow_id: int, batch_size: int = 500) -> List[Dict[str, Any]]:
+        """
+        Get all tasks for a workflow as plain column dicts, without ORM objects.
+        Rows are fetched from the cursor in batches of `batch_size`.
+        """
+        query = select(*Task.__table__.columns)\
+            .where(Task.workflow_id == workflow_id)\
+            .order_by(Task.id)\
+            .execution_options(yield_per=batch_size)
+        return [dict(row) for row in self.db.execute(query).mappings()]
+
+    def list_tasks(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        workflow_id: Optional[int] = None,
+        status: Optional[TaskStatus] = None,
+        strict: bool = False
+    ) -> List[Task]:
+        """
+        List tasks in ID order with pagination and optional filters.
+        
+        Args:
+            skip: Number of rows to skip (offset pagination).
+            limit: Maximum number of rows to return.
+            after_id: Keyset cursor, only return tasks with a larger ID.
+                Prefer this over `skip` for deep pages.
+            workflow_id: Only return tasks of this workflow.
+            status: Only return tasks in this status.
+            strict: Raise instead of lazy-loading a relationship of a listed
+                task, so an N+1 access pattern fails loudly.
+        """
+        query = self.db.query(Task)\
+            .filter(*self._list_criteria(after_id, workflow_id, status))\
+            .order_by(Task.id)
+        if strict:
+            query = query.options(raiseload("*"))
+        if skip:
+            query = query.offset(skip)
+        return query.limit(limit).all()
 
-    def list_tasks(self, skip: int = 0, limit: int = 100) -> List[Task]:
-        """List tasks with pagination."""
-        return self.db.query(Task).offset(skip).limit(limit).all()
+    def list_summary(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        workflow_id: Optional[int] = None,
+        status: Optional[TaskStatus] = None
+    ) -> List[Any]:
+        """
+        Same page as `list_tasks` with only the overview columns, without
+        building ORM objects or loading the config/result JSON.
+        
+        Returns:
+            Rows of (id, workflow_id, name, task_type, status)
+        """
+        query = select(Task.id, Task.workflow_id, Task.name, Task.task_type, Task.status)\
+            .where(*self._list_criteria(after_id, workflow_id, status))\
+            .order_by(Task.id)
+        if skip:
+            query = query.offset(skip)
+        return self.db.execute(query.limit(limit)).all()
+
+    def count(self, workflow_id: Optional[int] = None, status: Optional[TaskStatus] = None) -> int:
+        """Count tasks, optionally filtered by workflow and status."""
+        query = select(func.count(Task.id)).where(*self._list_criteria(None, workflow_id, status))
+        return self.db.execute(query).scalar_one()
+
+    def _list_criteria(
+        self,
+        after_id: Optional[int],
+        workflow_id: Optional[int],
+        status: Optional[TaskStatus]
+    ) -> List[Any]:
+        """Filter criteria for a task listing page."""
+        criteria = []
+        if workflow_id is not None:
+            criteria.append(Task.workflow_id == workflow_id)
+        if status:
+            criteria.append(Task.status == status)
+        if after_id is not None:
+            criteria.append(Task.id > after_id)
+        return criteria
 
     def update(self, task_id: int, update_data: Dict[str, Any]) -> Optional[Task]:
         """
@@ -41,16 +143,24 @@ class TaskDAO:
             if hasattr(task, key):
                 setattr(task, key, value)
         
-        self.db.commit()
-        self.db.refresh(task)
+        # The object already holds every new value, no refresh needed
+        commit_keeping(self.db, task)
         return task
 
-    def delete(self, task_id: int) -> bool:
-        """Delete a task by ID."""
-        task = self.get_by_id(task_id)
-        if not task:
-            return False
-            
-        self.db.delete(task)
+    def delete(self, task_id: int, exclude_statuses: Iterable[TaskStatus] = ()) -> bool:
+        """
+        Delete a task by ID in a single statement.
+        
+        Args:
+            task_id: The ID of the task to delete.
+            exclude_statuses: Leave the task in place if it is in one of these statuses.
+        
+        Returns:
+            True if a row was deleted
+        """
+        statement = delete(Task).where(Task.id == task_id)
+        if exclude_statuses:
+            statement = statement.where(Task.status.not_in(exclude_statuses))
+        result = self.db.execute(statement)
         self.db.commit()
-        return True
+        return result.rowcount > 0
@@ -1,59 +1,375 @@
-from typing import List, Optional, Any, Dict
-from sqlalchemy.orm import Session
-from src.db.models import Workflow, WorkflowStatus
+import enum
+from datetime import datetime
+from typing import Iterable, List, Optional, Any, Dict, Set
+from sqlalchemy import delete, func, insert, lambda_stmt, select, text, update
+from sqlalchemy.sql import StatementLambdaElement
+from sqlalchemy.orm import Session, raiseload, selectinload
+from src.db.database import commit_keeping
+from src.db.models import (
+    ACTIVE_WORKFLOW_PREDICATE,
+    TERMINAL_WORKFLOW_STATUSES,
+    Task,
+    Workflow,
+    WorkflowArchive,
+    WorkflowStatus,
+    WorkflowTransition,
+)
+
+def _json_row(row: Any) -> Dict[str, Any]:
+    """A row mapping as a dict that fits in a JSON column (ISO timestamps, enum values)."""
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else
+        value.value if isinstance(value, enum.Enum) else value
+        for key, value in row.items()
+    }
+
 
 class WorkflowDAO:
+    # Columns `update` may write, anything else in the update data is ignored
+    _UPDATABLE = frozenset({
+        "name", "description", "status", "current_state", "config", "retries",
+        "started_at", "completed_at", "error_message",
+    })
+
     def __init__(self, db: Session):
         self.db = db
 
     def create(self, workflow: Workflow) -> Workflow:
         """Create a new workflow."""
         self.db.add(workflow)
-        self.db.commit()
-        self.db.refresh(workflow)
+        # The INSERT fills in the ID and defaults, no need to read the row back
+        commit_keeping(self.db, workflow)
         return workflow
 
+    def create_many(self, rows: List[Dict[str, Any]]) -> List[Workflow]:
+        """
+        Create several workflows with INSERT ... RETURNING, in one transaction.
+        The workflows come back in the order of `rows`. Backends that can match
+        returned rows to their parameters batch the INSERT; SQLite can't, so
+        it runs one INSERT per workflow.
+        
+        Args:
+            rows: Column values per workflow; unset columns get their defaults.
+        """
+        if not rows:
+            return []
+        workflows = list(self.db.scalars(insert(Workflow).returning(Workflow, sort_by_parameter_order=True), rows))
+        commit_keeping(self.db, *workflows)
+        return workflows
+
     def get_by_id(self, workflow_id: int) -> Optional[Workflow]:
         """Get a workflow by its ID."""
-        return self.db.query(Workflow).filter(Workflow.id == workflow_id).first()
+        return self.db.get(Workflow, workflow_id)
+
+    def exists(self, workflow_id: int) -> bool:
+        """Check whether a workflow exists without loading the row."""
+        statement = lambda_stmt(lambda: select(Workflow.id).where(Workflow.id == workflow_id))
+        return self.db.execute(statement).first() is not None
+
+    def existing_ids(self, workflow_ids: Iterable[int]) -> Set[int]:
+        """Return which of `workflow_ids` exist, in a single query."""
+        ids = set(workflow_ids)
+        if not ids:
+            return set()
+        return set(self.db.scalars(select(Workflow.id).where(Workflow.id.in_(ids))))
+
+    def get_full(
+        self, workflow_id: int, include_tasks: bool = False, include_transitions: bool = True
+    ) -> Optional[Workflow]:
+        """
+        Get a workflow with its transition history loaded in one go.
+        Always re-reads the row so callers see the latest state.
+        
+        Args:
+            workflow_id: The ID of the workflow to load.
+            include_tasks: Also eager-load the workflow's tasks.
+            include_transitions: Eager-load the transitions; turn off when
+                they are fetched separately as plain rows.
+        """
+        options = []
+        if include_transitions:
+            options.append(selectinload(Workflow.transitions))
+        if include_tasks:
+            options.append(selectinload(Workflow.tasks))
+        return self.db.get(Workflow, workflow_id, options=options, populate_existing=True)
+
+    def get_updated_at(self, workflow_id: int) -> Optional[datetime]:
+        """Get only a workflow's last modification time, or None if it doesn't exist."""
+        # lambda_stmt caches the built statement, only the ID is bound per call
+        statement = lambda_stmt(lambda: select(Workflow.updated_at).where(Workflow.id == workflow_id))
+        return self.db.execute(statement).scalar_one_or_none()
+
+    def get_version(self, workflow_id: int) -> Optional[Any]:
+        """
+        Get only a workflow's status and last modification time.
+        
+        Returns:
+            Row of (status, updated_at), or None if the workflow doesn't exist
+        """
+        statement = lambda_stmt(
+            lambda: select(Workflow.status, Workflow.updated_at).where(Workflow.id == workflow_id)
+        )
+        return self.db.execute(statement).one_or_none()
 
-    def list_workflows(self, skip: int = 0, limit: int = 100) -> List[Workflow]:
-        """List workflows with pagination."""
-        return self.db.query(Workflow).offset(skip).limit(limit).all()
+    def list_workflows(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[WorkflowStatus] = None,
+        after_id: Optional[int] = None,
+        strict: bool = False
+    ) -> List[Workflow]:
+        """
+        List workflows with pagination, optionally filtered by status.
+        
+        Args:
+            skip: Number of rows to skip (offset pagination).
+            limit: Maximum number of rows to return.
+            status: Only return workflows in this status.
+            after_id: Keyset cursor, only return workflows with a larger ID.
+                Prefer this over `skip` for deep pages.
+            strict: Raise instead of lazy-loading the tasks or transitions of
+                a listed workflow, so an N+1 access pattern fails loudly.
+        """
+        statement = self._page(lambda_stmt(lambda: select(Workflow)), skip, limit, status, after_id)
+        if strict:
+            statement += lambda s: s.options(raiseload("*"))
+        return self.db.execute(statement).scalars().all()
+
+    def list_rows(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[WorkflowStatus] = None,
+        after_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Same page as `list_workflows`, as plain column dicts without ORM objects."""
+        statement = self._page(
+            lambda_stmt(lambda: select(*Workflow.__table__.columns)), skip, limit, status, after_id
+        )
+        return [dict(row) for row in self.db.execute(statement).mappings()]
+
+    def _page(
+        self,
+        statement: StatementLambdaElement,
+        skip: int,
+        limit: int,
+        status: Optional[WorkflowStatus],
+        after_id: Optional[int]
+    ) -> StatementLambdaElement:
+        """Add the filters and ordering of a workflow listing page to a lambda statement."""
+        if status:
+            statement += lambda s: s.where(Workflow.status == status)
+        if after_id is not None:
+            statement += lambda s: s.where(Workflow.id > after_id)
+        statement += lambda s: s.order_by(Workflow.id)
+        if skip:
+            statement += lambda s: s.offset(skip)
+        statement += lambda s: s.limit(limit)
+        return statement
+
+    def list_summary(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[WorkflowStatus] = None,
+        after_id: Optional[int] = None
+    ) -> List[Any]:
+        """
+        List only the columns needed for an overview, without building ORM objects.
+        Paged like `list_workflows`, including the `after_id` keyset cursor.
+        
+        Returns:
+            Rows of (id, name, status, current_state)
+        """
+        statement = self._page(
+            lambda_stmt(lambda: select(Workflow.id, Workflow.name, Workflow.status, Workflow.current_state)),
+            skip, limit, status, after_id
+        )
+        return self.db.execute(statement).all()
 
-    def update(self, workflow_id: int, update_data: Dict[str, Any]) -> Optional[Workflow]:
+    def update(
+        self,
+        workflow_id: int,
+        update_data: Dict[str, Any],
+        exclude_statuses: Iterable[WorkflowStatus] = ()
+    ) -> Optional[Workflow]:
         """
-        Update a workflow.
+        Update a workflow in one UPDATE ... RETURNING statement.
         
         Args:
             workflow_id: The ID of the workflow to update.
-            update_data: A dictionary of attributes to update.
+            update_data: A dictionary of attributes to update, keys that
+                aren't updatable columns are ignored.
+            exclude_statuses: Leave the workflow unchanged if it is in one of these statuses.
+        
+        Returns:
+            The updated workflow, or None if it doesn't exist or is in an excluded status
+        """
+        conditions = [Workflow.id == workflow_id]
+        if exclude_statuses:
+            conditions.append(Workflow.status.not_in(exclude_statuses))
+        values = {key: value for key, value in update_data.items() if key in self._UPDATABLE}
+        if not values:
+            # Nothing to write, only apply the same filters
+            return self.db.scalars(select(Workflow).where(*conditions)).one_or_none()
+        
+        statement = update(Workflow).where(*conditions).values(**values)
+        if not self.db.get_bind().dialect.update_returning:
+            # e.g. MySQL, fall back to a separate read
+            result = self.db.execute(statement)
+            self.db.commit()
+            return self.get_full(workflow_id, include_transitions=False) if result.rowcount else None
+        
+        workflow = self.db.execute(
+            statement.returning(Workflow).execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        # RETURNING filled in every column (updated_at via onupdate), no reload needed
+        commit_keeping(self.db, workflow)
+        return workflow
+
+    def reset_to_init(
+        self, workflow_id: int, from_statuses: Iterable[WorkflowStatus], include_children: bool = False
+    ) -> Optional[Workflow]:
         """
-        workflow = self.get_by_id(workflow_id)
-        if not workflow:
+        Put a workflow back to INIT in one UPDATE ... RETURNING statement,
+        but only if it is currently in one of `from_statuses`.
+        
+        Args:
+            workflow_id: The ID of the workflow to reset.
+            from_statuses: Statuses the workflow may be reset from.
+            include_children: Also load the workflow's transitions and tasks,
+                one batched query each, instead of lazily per attribute access.
+        
+        Returns:
+            The updated workflow, or None if it doesn't exist or is in another status
+        """
+        statement = update(Workflow)\
+            .where(Workflow.id == workflow_id, Workflow.status.in_(from_statuses))\
+            .values(status=WorkflowStatus.INIT, current_state="INIT")
+        if not self.db.get_bind().dialect.update_returning:
+            # e.g. MySQL, fall back to a separate read
+            result = self.db.execute(statement)
+            self.db.commit()
+            if not result.rowcount:
+                return None
+            return self.get_full(
+                workflow_id, include_tasks=include_children, include_transitions=include_children
+            )
+        
+        if include_children:
+            statement = statement.options(selectinload(Workflow.transitions), selectinload(Workflow.tasks))
+        workflow = self.db.execute(
+            statement.returning(Workflow).execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if workflow is None:
+            self.db.commit()
             return None
-            
-        for key, value in update_data.items():
-            if hasattr(workflow, key):
-                setattr(workflow, key, value)
+        # Everything just loaded is current, keep it instead of reloading on access
+        children = [*workflow.transitions, *workflow.tasks] if include_children else []
+        commit_keeping(self.db, workflow, *children)
+        return workflow
+
+    def delete(self, workflow_id: int, exclude_statuses: Iterable[WorkflowStatus] = ()) -> bool:
+        """
+        Delete a workflow by ID in a single statement.
+        Its tasks and transitions go with it through ON DELETE CASCADE.
+        
+        Args:
+            workflow_id: The ID of the workflow to delete.
+            exclude_statuses: Leave the workflow in place if it is in one of these statuses.
         
+        Returns:
+            True if a row was deleted
+        """
+        statement = delete(Workflow).where(Workflow.id == workflow_id)
+        if exclude_statuses:
+            statement = statement.where(Workflow.status.not_in(exclude_statuses))
+        result = self.db.execute(statement)
         self.db.commit()
-        self.db.refresh(workflow)
-        return workflow
+        return result.rowcount > 0
 
-    def delete(self, workflow_id: int) -> bool:
-        """Delete a workflow by ID."""
-        workflow = self.get_by_id(workflow_id)
-        if not workflow:
-            return False
-            
-        self.db.delete(workflow)
+    def archive_terminal(self, before: datetime, batch_size: int = 500) -> int:
+        """
+        Move terminal workflows last updated before `before` to the archive
+        table, with their tasks and transitions inlined, in one transaction.
+        Their live rows are deleted; children go through ON DELETE CASCADE.
+        
+        Args:
+            before: Only archive workflows not updated since this (naive UTC) time.
+            batch_size: Maximum number of workflows moved per call.
+        
+        Returns:
+            Number of workflows archived; call again until it returns 0
+        """
+        archivable = (Workflow.status.in_(TERMINAL_WORKFLOW_STATUSES), Workflow.updated_at < before)
+        # Row locks where the dialect has them (PostgreSQL); SQLite ignores FOR UPDATE
+        workflow_ids = list(self.db.scalars(
+            select(Workflow.id)
+            .where(*archivable)
+            .order_by(Workflow.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ))
+        if not workflow_ids:
+            return 0
+        
+        # Children are read first, deleting the workflows cascades them away
+        tasks = {workflow_id: [] for workflow_id in workflow_ids}
+        statement = select(*Task.__table__.columns)\
+            .where(Task.workflow_id.in_(workflow_ids))\
+            .order_by(Task.id)
+        for row in self.db.execute(statement).mappings():
+            tasks[row["workflow_id"]].append(_json_row(row))
+        transitions = {workflow_id: [] for workflow_id in workflow_ids}
+        statement = select(*WorkflowTransition.__table__.columns)\
+            .where(WorkflowTransition.workflow_id.in_(workflow_ids))\
+            .order_by(WorkflowTransition.created_at, WorkflowTransition.id)
+        for row in self.db.execute(statement).mappings():
+            transitions[row["workflow_id"]].append(_json_row(row))
+        
+        # The DELETE checks the predicate again: a start or retry may have
+        # revived a workflow since it was picked, and that one must stay
+        removal = delete(Workflow)\
+            .where(Workflow.id.in_(workflow_ids), *archivable)\
+            .execution_options(synchronize_session=False)
+        if self.db.get_bind().dialect.delete_returning:
+            removed = self.db.execute(removal.returning(*Workflow.__table__.columns)).mappings().all()
+        else:
+            # The rows are locked by FOR UPDATE, so the ones read are the ones deleted
+            removed = self.db.execute(
+                select(*Workflow.__table__.columns).where(Workflow.id.in_(workflow_ids), *archivable)
+            ).mappings().all()
+            self.db.execute(removal)
+        
+        if removed:
+            self.db.execute(insert(WorkflowArchive), [
+                {**row, "tasks": tasks[row["id"]], "transitions": transitions[row["id"]]}
+                for row in removed
+            ])
         self.db.commit()
-        return True
+        return len(removed)
 
     def count(self, status: Optional[WorkflowStatus] = None) -> int:
         """Count workflows, optionally filtered by status."""
-        query = self.db.query(Workflow)
+        statement = lambda_stmt(lambda: select(func.count(Workflow.id)))
         if status:
-            query = query.filter(Workflow.status == status)
-        return query.count()
+            statement += lambda s: s.where(Workflow.status == status)
+        return self.db.execute(statement).scalar_one()
+
+    def list_active_ids(self) -> List[int]:
+        """IDs of workflows not yet in a terminal status, read from the partial index."""
+        statement = select(Workflow.id)\
+            .where(text(ACTIVE_WORKFLOW_PREDICATE))\
+            .order_by(Workflow.id)
+        return list(self.db.scalars(statement))
+
+    def count_by_status(self) -> Dict[WorkflowStatus, int]:
+        """Count workflows per status in a single grouped query."""
+        counts = {workflow_status: 0 for workflow_status in WorkflowStatus}
+        statement = lambda_stmt(
+            lambda: select(Workflow.status, func.count(Workflow.id)).group_by(Workflow.status)
+        )
+        rows = self.db.execute(statement).all()
+        counts.update(rows)
+        return counts
@@ -1,5 +1,7 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy import and_, false, or_, select
 from sqlalchemy.orm import Session
+from src.db.database import commit_keeping
 from src.db.models import WorkflowTransition
 
 class WorkflowTransitionDAO:
@@ -9,23 +11,101 @@ class WorkflowTransitionDAO:
     def create(self, transition: WorkflowTransition) -> WorkflowTransition:
         """Create a new workflow transition record."""
         self.db.add(transition)
-        self.db.commit()
-        self.db.refresh(transition)
+        # The INSERT fills in the ID and defaults, no need to read the row back
+        commit_keeping(self.db, transition)
         return transition
 
-    def get_by_workflow_id(self, workflow_id: int) -> List[WorkflowTransition]:
-        """Get all transitions for a specific workflow, ordered by creation time."""
-        return self.db.query(WorkflowTransition)\
-            .filter(WorkflowTransition.workflow_id == workflow_id)\
-            .order_by(WorkflowTransition.created_at)\
-            .all()
+    def get_by_workflow_id(
+        self, workflow_id: int, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[WorkflowTransition]:
+        """
+        Get transitions for a specific workflow, ordered by creation time.
+        
+        Args:
+            workflow_id: The ID of the workflow.
+            after_id: Keyset cursor, only return transitions after this one.
+            limit: Maximum number of transitions to return.
+        """
+        query = self.db.query(WorkflowTransition)\
+            .filter(*self._page_criteria(workflow_id, after_id))\
+            .order_by(WorkflowTransition.created_at, WorkflowTransition.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def get_rows_by_workflow_id(
+        self,
+        workflow_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        batch_size: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        Same page as `get_by_workflow_id`, as plain column dicts without ORM objects.
+        Rows are fetched from the cursor in batches of `batch_size`.
+        """
+        query = select(*WorkflowTransition.__table__.columns)\
+            .where(*self._page_criteria(workflow_id, after_id))\
+            .order_by(WorkflowTransition.created_at, WorkflowTransition.id)\
+            .execution_options(yield_per=batch_size)
+        if limit is not None:
+            query = query.limit(limit)
+        return [dict(row) for row in self.db.execute(query).mappings()]
+
+    def iter_rows_by_workflow_id(
+        self,
+        workflow_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Same page as `get_rows_by_workflow_id`, yielded one dict at a time from a
+        server-side cursor so only `batch_size` rows are held in memory.
+        The session must stay open until the iterator is exhausted.
+        """
+        query = select(*WorkflowTransition.__table__.columns)\
+            .where(*self._page_criteria(workflow_id, after_id))\
+            .order_by(WorkflowTransition.created_at, WorkflowTransition.id)\
+            .execution_options(stream_results=True, yield_per=batch_size)
+        if limit is not None:
+            query = query.limit(limit)
+        for row in self.db.execute(query).mappings():
+            yield dict(row)
+
+    def is_cursor(self, workflow_id: int, transition_id: int) -> bool:
+        """Check that a transition exists and belongs to the workflow, so it can serve as `after_id`."""
+        owner = self.db.scalar(
+            select(WorkflowTransition.workflow_id).where(WorkflowTransition.id == transition_id)
+        )
+        return owner == workflow_id
+
+    def _page_criteria(self, workflow_id: int, after_id: Optional[int]) -> List[Any]:
+        """
+        Filter criteria for a workflow's transitions after the `after_id` cursor.
+        An unknown cursor, or one from another workflow, matches nothing rather
+        than restarting from the first page.
+        """
+        criteria = [WorkflowTransition.workflow_id == workflow_id]
+        if after_id is not None:
+            cursor = self.get_by_id(after_id)
+            if cursor is None or cursor.workflow_id != workflow_id:
+                return [false()]
+            criteria.append(or_(
+                WorkflowTransition.created_at > cursor.created_at,
+                and_(
+                    WorkflowTransition.created_at == cursor.created_at,
+                    WorkflowTransition.id > cursor.id
+                )
+            ))
+        return criteria
             
     # Note: Transitions are typically immutable history logs, so update/delete 
     # might not be commonly used, but are provided for completeness if needed.
 
     def get_by_id(self, transition_id: int) -> Optional[WorkflowTransition]:
         """Get a transition by its ID."""
-        return self.db.query(WorkflowTransition).filter(WorkflowTransition.id == transition_id).first()
+        return self.db.get(WorkflowTransition, transition_id)
 
     def delete(self, transition_id: int) -> bool:
         """Delete a transition by ID."""
@@ -1,21 +1,92 @@
 """Database session management and initialization."""
-from sqlalchemy import create_engine
+import sqlite3
+from typing import Any, Optional
+
+import orjson
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool, StaticPool
 from config import settings
 from .models import Base
 
 
+def _is_memory_sqlite(url: str) -> bool:
+    """Check whether the URL points at an in-memory SQLite database."""
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """
+    SQLite ignores foreign keys unless asked per connection; they are needed
+    for the ON DELETE CASCADE on tasks and transitions.
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def _json_serializer(value: Any) -> str:
+    """Encode JSON columns (config, result, metadata) with orjson."""
+    return orjson.dumps(value).decode()
+
+
+# JSON columns go through orjson instead of the stdlib json module
+_JSON_OPTIONS = {"json_serializer": _json_serializer, "json_deserializer": orjson.loads}
+
+
+# Bytes of a file-backed SQLite database read through mmap (256 MiB)
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
+
 # Create engine based on database URL
-# For SQLite, use check_same_thread=False and StaticPool for async compatibility
-if settings.database_url.startswith("sqlite"):
+# In-memory SQLite only exists on a single connection, so it needs StaticPool.
+# File-backed SQLite gets a real connection pool plus WAL journaling so that
+# status reads don't block the worker threads writing transitions.
+if settings.database_url.startswith("sqlite") and _is_memory_sqlite(settings.database_url):
     engine = create_engine(
         settings.database_url,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
+        **_JSON_OPTIONS,
+    )
+elif settings.database_url.startswith("sqlite"):
+    engine = create_engine(
+        settings.database_url,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_pre_ping=True,
+        **_JSON_OPTIONS,
     )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Enable WAL so readers and the writer don't serialize on each other.
+        Reads go through a shared memory map and temporary tables/indexes stay
+        in memory; the page cache is left at its default because every pooled
+        connection would get its own.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
 else:
-    engine = create_engine(settings.database_url)
+    # Server databases drop idle connections on their own schedule, recycle ours first
+    engine = create_engine(
+        settings.database_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=settings.db_pool_recycle,
+        **_JSON_OPTIONS,
+    )
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -26,6 +97,27 @@ def init_db() -> None:
     Base.metadata.create_all(bind=engine)
 
 
+def commit_keeping(db: Session, *instances: object) -> None:
+    """
+    Commit, expiring every object in the session except `instances`.
+
+    Use after inserting rows whose column values are all known client-side
+    (Python defaults, or fetched by INSERT ... RETURNING via `eager_defaults`),
+    so returning them doesn't cost a second SELECT to reload what was just written.
+    """
+    keep = {id(instance) for instance in instances}
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+    if expire_on_commit:
+        for obj in list(db.identity_map.values()):
+            if id(obj) not in keep:
+                db.expire(obj)
+
+
 def get_db() -> Session:
     """Get database session for dependency injection."""
     db = SessionLocal()
@@ -33,3 +125,14 @@ def get_db() -> Session:
         yield db
     finally:
         db.close()
+
+
+def pool_capacity() -> Optional[int]:
+    """
+    Maximum number of connections the engine's pool hands out at once,
+    as configured in settings.
+    Returns None when the pool doesn't bound it (StaticPool, or unlimited overflow).
+    """
+    if not isinstance(engine.pool, QueuePool) or settings.db_max_overflow < 0:
+        return None
+    return settings.db_pool_size + settings.db_max_overflow
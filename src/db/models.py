@@ -1,7 +1,8 @@
 """Database models for workflow orchestration."""
 from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, JSON, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base, relationship
 import enum
 
@@ -9,6 +10,28 @@ import enum
 Base = declarative_base()
 
 
+def _utcnow() -> datetime:
+    """
+    Current UTC time without tzinfo, the form DateTime columns read back as,
+    so freshly inserted objects match what a later query returns.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# JSON documents: binary JSONB on PostgreSQL (parsed once on write, not on
+# every read); elsewhere text, encoded and decoded with orjson by the engine
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+
+def _status_type(enum_class: type) -> Enum:
+    """
+    Column type for a status enum: a plain VARCHAR with a CHECK constraint on
+    every backend, never a native enum type (e.g. PostgreSQL CREATE TYPE) that
+    would need a migration for each new status.
+    """
+    return Enum(enum_class, native_enum=False, create_constraint=True, length=16)
+
+
 class WorkflowStatus(str, enum.Enum):
     """Workflow execution status."""
     INIT = "INIT"
@@ -20,6 +43,28 @@ class WorkflowStatus(str, enum.Enum):
     CANCELLED = "CANCELLED"
 
 
+# Workflows that have not reached a terminal status yet
+ACTIVE_WORKFLOW_STATUSES = (
+    WorkflowStatus.INIT,
+    WorkflowStatus.PREPARE,
+    WorkflowStatus.EXECUTE,
+    WorkflowStatus.VALIDATE,
+)
+
+# Workflows that are done; only these are ever archived
+TERMINAL_WORKFLOW_STATUSES = (
+    WorkflowStatus.COMPLETE,
+    WorkflowStatus.FAILED,
+    WorkflowStatus.CANCELLED,
+)
+
+# Predicate of the partial index over active workflows. Queries must use this
+# exact literal text for the planner to pick the index, bound parameters won't do.
+ACTIVE_WORKFLOW_PREDICATE = "status IN ({})".format(
+    ", ".join(f"'{workflow_status.value}'" for workflow_status in ACTIVE_WORKFLOW_STATUSES)
+)
+
+
 class TaskStatus(str, enum.Enum):
     """Task execution status."""
     PENDING = "pending"
@@ -33,39 +78,61 @@ class TaskStatus(str, enum.Enum):
 class Workflow(Base):
     """Workflow definition and execution tracking."""
     __tablename__ = "workflows"
+    __table_args__ = (
+        # Status filters, per-status counts and keyset pagination within a status
+        Index("ix_workflows_status_id", "status", "id"),
+        # Small index over the few workflows still in flight, terminal rows never enter it
+        Index(
+            "ix_workflows_active_status",
+            "status",
+            sqlite_where=text(ACTIVE_WORKFLOW_PREDICATE),
+            postgresql_where=text(ACTIVE_WORKFLOW_PREDICATE),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
-    status = Column(Enum(WorkflowStatus), default=WorkflowStatus.INIT, nullable=False)
+    status = Column(_status_type(WorkflowStatus), default=WorkflowStatus.INIT, nullable=False)
     current_state = Column(String(50), default="INIT", nullable=False)  # Current workflow state
-    config = Column(JSON, nullable=True)  # Workflow configuration and metadata
+    config = Column(JSONDocument, nullable=True)  # Workflow configuration and metadata
     retries = Column(Integer, default=0, nullable=False)  # Number of retry attempts
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, default=_utcnow, nullable=False)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow, nullable=False)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
     
     # Relationships
-    tasks = relationship("Task", back_populates="workflow", cascade="all, delete-orphan")
-    transitions = relationship("WorkflowTransition", back_populates="workflow", cascade="all, delete-orphan")
+    # Children are removed by ON DELETE CASCADE rather than loaded and deleted one by one
+    tasks = relationship("Task", back_populates="workflow", cascade="all, delete-orphan", passive_deletes=True)
+    transitions = relationship(
+        "WorkflowTransition",
+        back_populates="workflow",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="(WorkflowTransition.created_at, WorkflowTransition.id)",
+    )
 
 
 class Task(Base):
     """Individual task within a workflow."""
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Per-workflow listings filtered by status, in ID order with a keyset cursor
+        Index("ix_tasks_wf_status_id", "workflow_id", "status", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
-    status = Column(Enum(TaskStatus), default=TaskStatus.PENDING, nullable=False)
+    status = Column(_status_type(TaskStatus), default=TaskStatus.PENDING, nullable=False)
     task_type = Column(String(100), nullable=False)  # e.g., 'http_request', 'data_processing'
-    config = Column(JSON, nullable=True)  # Task-specific configuration
-    result = Column(JSON, nullable=True)  # Task execution result
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+    config = Column(JSONDocument, nullable=True)  # Task-specific configuration
+    result = Column(JSONDocument, nullable=True)  # Task execution result
+    created_at = Column(DateTime, default=_utcnow, nullable=False)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow, nullable=False)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
@@ -78,14 +145,43 @@ class Task(Base):
 class WorkflowTransition(Base):
     """State machine transitions for workflow tracking."""
     __tablename__ = "workflow_transitions"
+    __table_args__ = (
+        # History lookups per workflow in order, with a keyset cursor
+        Index("ix_transitions_wf_created", "workflow_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False)
     from_state = Column(String(50), nullable=False)
     to_state = Column(String(50), nullable=False)
     trigger = Column(String(100), nullable=True)  # What triggered the transition
-    transition_metadata = Column(JSON, nullable=True)  # Additional transition information
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    transition_metadata = Column(JSONDocument, nullable=True)  # Additional transition information
+    created_at = Column(DateTime, default=_utcnow, nullable=False)
     
     # Relationships
     workflow = relationship("Workflow", back_populates="transitions")
+
+
+class WorkflowArchive(Base):
+    """
+    Terminal workflows moved out of the live tables by the archive job.
+    Tasks and transitions are kept inline as JSON lists, so the live tables
+    and their indexes only hold recent and in-flight workflows.
+    """
+    __tablename__ = "workflows_archive"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # ID the workflow had while live
+    name = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    status = Column(_status_type(WorkflowStatus), nullable=False)
+    current_state = Column(String(50), nullable=False)
+    config = Column(JSONDocument, nullable=True)
+    retries = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    error_message = Column(Text, nullable=True)
+    tasks = Column(JSONDocument, nullable=False)  # Task rows in ID order
+    transitions = Column(JSONDocument, nullable=False)  # Transition rows in history order
+    archived_at = Column(DateTime, default=_utcnow, nullable=False)
@@ -0,0 +1,51 @@
+"""Shared test fixtures."""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def sql_counter():
+    """
+    Record the SQL statements an engine runs inside a `with` block,
+    to hold code paths to a query budget.
+    
+    Usage: `with sql_counter(engine) as statements: ...`
+    """
+    @contextmanager
+    def count(engine):
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+    
+    return count
+
+
+@pytest.fixture(scope="session")
+def fast_sqlite():
+    """
+    Turn off durability on a file-backed SQLite test engine: the rollback
+    journal stays in memory and commits don't wait for fsync.
+    
+    Usage: `engine = fast_sqlite(create_engine(...))`
+    """
+    def configure(engine):
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=MEMORY")
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+        
+        return engine
+    
+    return configure
@@ -6,7 +6,10 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from main import app
-from src.db import Base, get_db, Workflow, Task, WorkflowStatus, TaskStatus
+from src.db import Base, get_db, Workflow, Task, WorkflowStatus, TaskStatus, WorkflowTransition
+from src.api.schemas import TaskResponse, TransitionResponse, WorkflowResponse, WorkflowStatusDetail
+from src.api.cache import terminal_status_cache, status_body_cache, state_body_cache
+from src.api.execution import _running_workflows, _stats_cache, run_detached, execute_workflow_background
 
 
 # Test database setup with StaticPool to share in-memory database across threads
@@ -30,11 +33,20 @@ def override_get_db():
 app.dependency_overrides[get_db] = override_get_db
 
 
+# The schema is created once; tests only clear the rows
+Base.metadata.create_all(bind=engine)
+
+
 @pytest.fixture(autouse=True)
 def setup_database():
-    """Set up test database before each test."""
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    """Empty every table before each test, without dropping and recreating the schema."""
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    terminal_status_cache.clear()
+    status_body_cache.clear()
+    state_body_cache.clear()
+    _stats_cache.update(ts=0.0, value=None)
     yield
 
 
@@ -88,6 +100,54 @@ def test_list_workflows(client):
     
     workflows = response.json()
     assert len(workflows) == 3
+    assert WorkflowResponse.model_validate(workflows[0]).status == "INIT"
+    
+    response = client.get("/workflows/", params={"after_id": workflows[0]["id"], "limit": 1})
+    assert [workflow["name"] for workflow in response.json()] == ["Workflow 2"]
+
+
+def test_list_workflow_summaries(client):
+    """Test the lightweight workflow listing."""
+    for i in range(3):
+        client.post("/workflows/", json={"name": f"Workflow {i+1}", "description": "unused"})
+    
+    response = client.get("/workflows/summary")
+    assert response.status_code == 200
+    
+    workflows = response.json()
+    assert len(workflows) == 3
+    assert workflows[0] == {"id": 1, "name": "Workflow 1", "status": "INIT", "current_state": "INIT"}
+    
+    response = client.get("/workflows/summary", params={"after_id": 1, "limit": 1})
+    assert [workflow["name"] for workflow in response.json()] == ["Workflow 2"]
+    
+    response = client.get("/workflows/summary", params={"status_filter": "BOGUS"})
+    assert response.status_code == 400
+
+
+def test_read_endpoints_stay_within_query_budget(client, sql_counter):
+    """Test that read endpoints run a fixed number of queries, whatever the row count."""
+    for i in range(5):
+        client.post("/workflows/", json={"name": f"Workflow {i+1}"})
+    client.post("/tasks/bulk", json=[
+        {"workflow_id": 1, "name": f"Task {i}", "task_type": "test"} for i in range(5)
+    ])
+    
+    budgets = {
+        "/workflows/": 1,
+        "/workflows/summary": 1,
+        "/workflows/1": 1,
+        "/workflows/1/tasks": 2,
+        "/workflows/1/transitions": 2,
+        "/tasks/": 1,
+        "/tasks/summary": 1,
+        "/workflow/1": 3,
+        "/execution/workflows/1/status": 4,
+    }
+    for url, budget in budgets.items():
+        with sql_counter(engine) as statements:
+            assert client.get(url).status_code == 200
+        assert len(statements) <= budget, (url, statements)
 
 
 def test_get_workflow(client):
@@ -127,6 +187,23 @@ def test_update_workflow(client):
     assert data["description"] == "New description"
 
 
+def test_update_running_or_missing_workflow(client):
+    """Test that running and unknown workflows are not updated."""
+    db = TestingSessionLocal()
+    workflow = Workflow(name="Running", status=WorkflowStatus.EXECUTE)
+    db.add(workflow)
+    db.commit()
+    workflow_id = workflow.id
+    db.close()
+    
+    response = client.put(f"/workflows/{workflow_id}", json={"name": "Renamed"})
+    assert response.status_code == 400
+    assert client.get(f"/workflows/{workflow_id}").json()["name"] == "Running"
+    
+    response = client.put("/workflows/999", json={"name": "Renamed"})
+    assert response.status_code == 404
+
+
 def test_delete_workflow(client):
     """Test deleting a workflow."""
     # Create a workflow
@@ -140,6 +217,24 @@ def test_delete_workflow(client):
     # Verify it's gone
     get_response = client.get(f"/workflows/{workflow_id}")
     assert get_response.status_code == 404
+    
+    response = client.delete(f"/workflows/{workflow_id}")
+    assert response.status_code == 404
+
+
+def test_delete_running_workflow(client):
+    """Test that running workflows cannot be deleted."""
+    create_response = client.post("/workflows/", json={"name": "Running"})
+    workflow_id = create_response.json()["id"]
+    
+    db = TestingSessionLocal()
+    db.get(Workflow, workflow_id).status = WorkflowStatus.EXECUTE
+    db.commit()
+    db.close()
+    
+    response = client.delete(f"/workflows/{workflow_id}")
+    assert response.status_code == 400
+    assert client.get(f"/workflows/{workflow_id}").status_code == 200
 
 
 def test_create_task(client):
@@ -165,6 +260,34 @@ def test_create_task(client):
     assert data["status"] == "pending"
 
 
+def test_create_tasks_bulk(client):
+    """Test creating several tasks in one request."""
+    first = client.post("/workflows/", json={"name": "Bulk One"}).json()["id"]
+    second = client.post("/workflows/", json={"name": "Bulk Two"}).json()["id"]
+    
+    response = client.post("/tasks/bulk", json=[
+        {"workflow_id": first, "name": "A", "task_type": "sleep", "config": {"duration": 1}},
+        {"workflow_id": second, "name": "B", "task_type": "sleep"},
+        {"workflow_id": first, "name": "C", "task_type": "sleep"},
+    ])
+    assert response.status_code == 201
+    
+    data = response.json()
+    assert [task["name"] for task in data] == ["A", "B", "C"]
+    assert [task["workflow_id"] for task in data] == [first, second, first]
+    assert all(task["status"] == "pending" and task["created_at"] for task in data)
+    assert data[0]["config"] == {"duration": 1}
+    assert client.get("/tasks/count", params={"workflow_id": first}).json() == {"count": 2}
+    
+    # One unknown workflow rejects the whole batch
+    response = client.post("/tasks/bulk", json=[
+        {"workflow_id": first, "name": "D", "task_type": "sleep"},
+        {"workflow_id": 999, "name": "E", "task_type": "sleep"},
+    ])
+    assert response.status_code == 404
+    assert client.get("/tasks/count", params={"workflow_id": first}).json() == {"count": 2}
+
+
 def test_list_tasks(client):
     """Test listing tasks."""
     # Create workflow and tasks
@@ -183,6 +306,55 @@ def test_list_tasks(client):
     
     tasks = response.json()
     assert len(tasks) == 3
+    
+    response = client.get("/tasks/", params={"after_id": tasks[0]["id"], "limit": 1})
+    assert [task["name"] for task in response.json()] == ["Task 2"]
+    
+    response = client.get("/tasks/", params={"workflow_id": workflow_id, "status_filter": "completed"})
+    assert response.json() == []
+
+
+
+def test_delete_task(client):
+    """Test deleting tasks, refusing running ones."""
+    workflow_id = client.post("/workflows/", json={"name": "Test Workflow"}).json()["id"]
+    task_ids = [
+        client.post("/tasks/", json={"workflow_id": workflow_id, "name": f"Task {i}", "task_type": "sleep"}).json()["id"]
+        for i in range(2)
+    ]
+    
+    db = TestingSessionLocal()
+    db.get(Task, task_ids[1]).status = TaskStatus.RUNNING
+    db.commit()
+    db.close()
+    
+    assert client.delete(f"/tasks/{task_ids[0]}").status_code == 204
+    assert client.get(f"/tasks/{task_ids[0]}").status_code == 404
+    assert client.delete(f"/tasks/{task_ids[0]}").status_code == 404
+    assert client.delete(f"/tasks/{task_ids[1]}").status_code == 400
+
+
+def test_task_summaries_and_count(client):
+    """Test the lightweight task listing and the task count."""
+    workflow_id = client.post("/workflows/", json={"name": "Test Workflow"}).json()["id"]
+    for i in range(3):
+        client.post("/tasks/", json={
+            "workflow_id": workflow_id,
+            "name": f"Task {i+1}",
+            "task_type": "sleep",
+            "config": {"payload": "unused"}
+        })
+    
+    response = client.get("/tasks/summary", params={"limit": 2})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "workflow_id": workflow_id, "name": "Task 1", "task_type": "sleep", "status": "pending"},
+        {"id": 2, "workflow_id": workflow_id, "name": "Task 2", "task_type": "sleep", "status": "pending"},
+    ]
+    
+    assert client.get("/tasks/count").json() == {"count": 3}
+    assert client.get("/tasks/count", params={"status_filter": "running"}).json() == {"count": 0}
+    assert client.get("/tasks/count", params={"status_filter": "BOGUS"}).status_code == 400
 
 
 def test_get_workflow_tasks(client):
@@ -203,6 +375,42 @@ def test_get_workflow_tasks(client):
     
     tasks = response.json()
     assert len(tasks) == 2
+    # Rows bypass response validation but must still match the published schema
+    assert TaskResponse.model_validate(tasks[0]).name == "Task 1"
+    assert tasks[0]["status"] == "pending"
+
+
+def test_get_workflow_transitions(client):
+    """Test paging through a workflow's transitions."""
+    create_response = client.post("/workflows/", json={"name": "History Workflow"})
+    workflow_id = create_response.json()["id"]
+    
+    db = TestingSessionLocal()
+    for from_state, to_state in [("INIT", "PREPARE"), ("PREPARE", "EXECUTE"), ("EXECUTE", "VALIDATE")]:
+        db.add(WorkflowTransition(workflow_id=workflow_id, from_state=from_state, to_state=to_state))
+    db.commit()
+    db.close()
+    
+    response = client.get(f"/workflows/{workflow_id}/transitions", params={"limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert [t["to_state"] for t in page] == ["PREPARE", "EXECUTE"]
+    assert TransitionResponse.model_validate(page[0]).workflow_id == workflow_id
+    
+    response = client.get(f"/workflows/{workflow_id}/transitions", params={"after_id": page[-1]["id"]})
+    assert [t["to_state"] for t in response.json()] == ["VALIDATE"]
+    
+    response = client.get(f"/workflows/{workflow_id}/transitions", params={"after_id": response.json()[-1]["id"]})
+    assert response.json() == []
+    
+    # Without a limit the whole history comes back
+    response = client.get(f"/workflows/{workflow_id}/transitions")
+    assert len(response.json()) == 3
+    
+    # Unknown cursors and cursors of other workflows are rejected, not restarted
+    other_id = client.post("/workflows/", json={"name": "Other Workflow"}).json()["id"]
+    assert client.get(f"/workflows/{workflow_id}/transitions", params={"after_id": 999}).status_code == 400
+    assert client.get(f"/workflows/{other_id}/transitions", params={"after_id": page[0]["id"]}).status_code == 400
 
 
 def test_get_execution_stats(client):
@@ -218,3 +426,303 @@ def test_get_execution_stats(client):
     assert "worker_pool" in stats
     assert "workflows" in stats
     assert stats["workflows"]["total"] == 2
+    assert stats["workflows"]["init"] == 2
+    assert stats["workflows"]["complete"] == 0
+    
+    # Pollers within the TTL window share the cached result
+    client.post("/workflows/", json={"name": "Workflow 3"})
+    assert client.get("/execution/stats").json()["workflows"]["total"] == 2
+
+
+def test_start_workflow_execution(client, monkeypatch):
+    """Test starting, restarting and refusing to start workflows."""
+    started = []
+    
+    async def fake_run_detached(func, *args):
+        started.append(args[0])
+    
+    monkeypatch.setattr("src.api.execution.run_detached", fake_run_detached)
+    workflow_id = client.post("/workflows/", json={"name": "Start Workflow"}).json()["id"]
+    
+    db = TestingSessionLocal()
+    db.get(Workflow, workflow_id).status = WorkflowStatus.FAILED
+    db.commit()
+    
+    response = client.post(f"/execution/workflows/{workflow_id}/start")
+    assert response.status_code == 200
+    assert response.json()["status"] == "INIT"
+    assert started == [workflow_id]
+    
+    db.get(Workflow, workflow_id).status = WorkflowStatus.COMPLETE
+    db.commit()
+    db.close()
+    
+    response = client.post(f"/execution/workflows/{workflow_id}/start")
+    assert response.status_code == 400
+    assert "COMPLETE" in response.json()["detail"]
+    
+    response = client.post("/execution/workflows/99999/start")
+    assert response.status_code == 404
+    assert started == [workflow_id]
+
+
+def test_get_execution_status(client):
+    """Test the execution status endpoint."""
+    create_response = client.post("/workflows/", json={"name": "Status Workflow"})
+    workflow_id = create_response.json()["id"]
+    client.post("/tasks/", json={
+        "workflow_id": workflow_id,
+        "name": "Status Task",
+        "task_type": "test"
+    })
+    
+    response = client.get(f"/execution/workflows/{workflow_id}/status")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["workflow_id"] == workflow_id
+    assert data["status"] == "INIT"
+    assert [task["name"] for task in data["tasks"]] == ["Status Task"]
+    assert data["tasks"][0]["status"] == "pending"
+    
+    # Served from the body cache while the row is unchanged
+    assert client.get(f"/execution/workflows/{workflow_id}/status").json() == data
+    
+    etag = response.headers["etag"]
+    response = client.get(f"/execution/workflows/{workflow_id}/status", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    
+    response = client.get("/execution/workflows/99999/status")
+    assert response.status_code == 404
+
+
+def test_cancel_workflow_is_accepted(client, monkeypatch):
+    """Test that cancel returns immediately and cancels in the background."""
+    monkeypatch.setattr("src.db.SessionLocal", TestingSessionLocal)
+    create_response = client.post("/workflows/", json={"name": "Cancel Workflow"})
+    workflow_id = create_response.json()["id"]
+    
+    response = client.post(f"/execution/workflows/{workflow_id}/cancel")
+    assert response.status_code == 202
+    
+    response = client.get(f"/workflow/{workflow_id}")
+    assert response.json()["status"] == "CANCELLED"
+    
+    # Already cancelled workflows cannot be cancelled again
+    response = client.post(f"/execution/workflows/{workflow_id}/cancel")
+    assert response.status_code == 400
+
+
+async def test_run_detached_tracks_task():
+    """Test that detached workflow runs are tracked until they finish."""
+    import asyncio
+    
+    done = asyncio.Event()
+    
+    async def job(flag):
+        await asyncio.sleep(0.01)
+        flag.set()
+    
+    await run_detached(job, done)
+    assert len(_running_workflows) == 1
+    
+    await asyncio.wait_for(done.wait(), timeout=1)
+    await asyncio.sleep(0)
+    assert len(_running_workflows) == 0
+
+
+def test_run_limit_follows_db_pool(monkeypatch):
+    """Test that concurrent workflow runs are bounded by the DB pool, not the compute workers."""
+    import dataclasses
+    from src.api import execution
+    
+    monkeypatch.setattr(execution, "pool_capacity", lambda: 60)
+    assert execution._run_limit() == 60 - execution.RESERVED_DB_CONNECTIONS
+    
+    monkeypatch.setattr(execution, "settings", dataclasses.replace(execution.settings, max_concurrent_runs=8))
+    assert execution._run_limit() == 8
+    
+    monkeypatch.setattr(execution, "pool_capacity", lambda: None)
+    assert execution._run_limit() == 8
+    monkeypatch.setattr(execution, "settings", dataclasses.replace(execution.settings, max_concurrent_runs=0))
+    assert execution._run_limit() is None
+
+
+async def test_background_runs_go_side_by_side(tmp_path, monkeypatch, fast_sqlite):
+    """Test that more workflows than compute workers run at once and take about as long as one."""
+    import asyncio
+    import time
+    from src.core import WorkerManager
+    
+    # The runs commit from several threads at once, which the shared in-memory
+    # connection can't take; give them a file database with its own pool
+    file_engine = fast_sqlite(
+        create_engine(f"sqlite:///{tmp_path / 'batch.db'}", connect_args={"check_same_thread": False})
+    )
+    Base.metadata.create_all(bind=file_engine)
+    BatchSessionLocal = sessionmaker(bind=file_engine)
+    monkeypatch.setattr("src.db.SessionLocal", BatchSessionLocal)
+    monkeypatch.setattr(WorkerManager, "SIMULATED_DURATIONS", {
+        "initialize": 0.1, "prepare": 0.1, "execute": 0.1, "validate": 0.1, "complete": 0.1,
+    })
+    db = BatchSessionLocal()
+    workflows = [Workflow(name=f"Batch {i}", status=WorkflowStatus.INIT) for i in range(8)]
+    db.add_all(workflows)
+    db.commit()
+    ids = [workflow.id for workflow in workflows]
+    
+    worker_manager = WorkerManager(max_workers=2, session_factory=BatchSessionLocal)
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(execute_workflow_background(workflow_id, worker_manager) for workflow_id in ids))
+        elapsed = time.perf_counter() - started
+    finally:
+        worker_manager.shutdown()
+    
+    # Run one after another the eight would need at least 4s
+    assert elapsed < 1.0
+    db.expire_all()
+    assert all(workflow.status == WorkflowStatus.COMPLETE for workflow in workflows)
+    db.close()
+    file_engine.dispose()
+
+
+def test_wait_for_state_returns_on_change(client):
+    """Test long-poll returns immediately when state already differs."""
+    create_response = client.post("/workflows/", json={"name": "Waiting Workflow"})
+    workflow_id = create_response.json()["id"]
+    
+    response = client.get(f"/workflow/{workflow_id}/wait", params={"since_state": "PREPARE", "timeout": 5})
+    assert response.status_code == 200
+    assert response.json()["current_state"] == "INIT"
+
+
+def test_wait_for_state_times_out(client):
+    """Test long-poll returns the unchanged state after the timeout."""
+    create_response = client.post("/workflows/", json={"name": "Idle Workflow"})
+    workflow_id = create_response.json()["id"]
+    
+    response = client.get(f"/workflow/{workflow_id}/wait", params={"since_state": "INIT", "timeout": 0.1})
+    assert response.status_code == 200
+    assert response.json()["current_state"] == "INIT"
+    
+    missing = client.get("/workflow/999/wait", params={"since_state": "INIT", "timeout": 0.1})
+    assert missing.status_code == 404
+
+
+def test_parked_wait_holds_no_connection(client, monkeypatch):
+    """Test that a long-poll hands its DB connection back before it waits."""
+    import asyncio
+    from sqlalchemy import event
+    workflow_id = client.post("/workflows/", json={"name": "Parked Workflow"}).json()["id"]
+    
+    checked_out = [0]
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out[0] += 1
+    def checkin(dbapi_connection, connection_record):
+        checked_out[0] -= 1
+    
+    parked_with = []
+    real_wait_for = asyncio.wait_for
+    async def wait_for(awaitable, timeout):
+        parked_with.append(checked_out[0])
+        return await real_wait_for(awaitable, timeout)
+    monkeypatch.setattr("src.api.workflow_api.asyncio.wait_for", wait_for)
+    
+    event.listen(engine, "checkout", checkout)
+    event.listen(engine, "checkin", checkin)
+    try:
+        response = client.get(f"/workflow/{workflow_id}/wait", params={"since_state": "INIT", "timeout": 0.1})
+    finally:
+        event.remove(engine, "checkout", checkout)
+        event.remove(engine, "checkin", checkin)
+    
+    assert response.status_code == 200
+    assert parked_with == [0]
+
+
+def test_terminal_workflow_state_is_cached(client):
+    """Test that completed workflow status is cached until the row changes."""
+    create_response = client.post("/workflows/", json={"name": "Finished Workflow"})
+    workflow_id = create_response.json()["id"]
+    
+    db = TestingSessionLocal()
+    workflow = db.get(Workflow, workflow_id)
+    workflow.status = WorkflowStatus.COMPLETE
+    workflow.current_state = "COMPLETE"
+    db.commit()
+    
+    response = client.get(f"/workflow/{workflow_id}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "COMPLETE"
+    # Finished workflows can still be deleted, clients must revalidate
+    assert response.headers["cache-control"] == "no-cache"
+    
+    # A change to the row invalidates the cached snapshot
+    workflow.status = WorkflowStatus.FAILED
+    workflow.current_state = "FAILED"
+    db.commit()
+    db.close()
+    
+    response = client.get(f"/workflow/{workflow_id}")
+    assert response.json()["status"] == "FAILED"
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_workflow_state_does_not_build_state_machine(client, monkeypatch):
+    """Test that reading a workflow's state never constructs an orchestrator."""
+    def fail(*args, **kwargs):
+        raise AssertionError("orchestrator constructed on a read path")
+    
+    monkeypatch.setattr("src.core.WorkflowOrchestrator.__init__", fail)
+    workflow_id = client.post("/workflows/", json={"name": "Read Only"}).json()["id"]
+    
+    assert client.get(f"/workflow/{workflow_id}").status_code == 200
+    assert client.get(f"/workflow/{workflow_id}/wait", params={"timeout": 0}).status_code == 200
+    assert client.get(f"/execution/workflows/{workflow_id}/status").status_code == 200
+
+
+def test_workflow_state_matches_schema(client):
+    """Test that the unvalidated state payload has the documented shape."""
+    workflow_id = client.post("/workflows/", json={"name": "Shaped Workflow"}).json()["id"]
+    db = TestingSessionLocal()
+    db.add(WorkflowTransition(workflow_id=workflow_id, from_state="INIT", to_state="PREPARE", trigger="prepare"))
+    db.commit()
+    db.close()
+    
+    for response in (
+        client.get(f"/workflow/{workflow_id}"),
+        client.get(f"/workflow/{workflow_id}/wait", params={"timeout": 0}),
+    ):
+        body = response.json()
+        assert WorkflowStatusDetail.model_validate(body).model_dump(mode="json") == body
+        assert body["transitions"][0]["to_state"] == "PREPARE"
+
+
+def test_workflow_state_not_modified(client):
+    """Test that an unchanged workflow answers If-None-Match with 304."""
+    create_response = client.post("/workflows/", json={"name": "ETag Workflow"})
+    workflow_id = create_response.json()["id"]
+    
+    response = client.get(f"/workflow/{workflow_id}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    
+    # Served from the body cache while the row is unchanged
+    assert client.get(f"/workflow/{workflow_id}").json() == response.json()
+    
+    response = client.get(f"/workflow/{workflow_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    
+    # Any change to the row produces a new tag
+    db = TestingSessionLocal()
+    workflow = db.get(Workflow, workflow_id)
+    workflow.current_state = "PREPARE"
+    db.commit()
+    db.close()
+    
+    response = client.get(f"/workflow/{workflow_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["current_state"] == "PREPARE"
+    assert response.headers["etag"] != etag
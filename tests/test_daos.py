@@ -1,30 +1,50 @@
 """Unit tests for Data Access Objects."""
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from src.db import Base, Workflow, Task, WorkflowTransition, WorkflowStatus, TaskStatus
+from src.db import Base, Workflow, Task, WorkflowTransition, WorkflowArchive, WorkflowStatus, TaskStatus
 from src.db.dao.workflow_dao import WorkflowDAO
 from src.db.dao.task_dao import TaskDAO
 from src.db.dao.workflow_transition_dao import WorkflowTransitionDAO
 
 
-@pytest.fixture
-def db_session():
-    """Create a test database session."""
+@pytest.fixture(scope="module")
+def db_engine():
+    """Create a test database engine."""
     engine = create_engine(
         "sqlite:///:memory:",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool
     )
     Base.metadata.create_all(engine)
-    SessionLocal = sessionmaker(bind=engine)
+    return engine
+
+
+@pytest.fixture(autouse=True)
+def empty_tables(db_engine):
+    """Empty every table before each test, the schema is only created once per module."""
+    with db_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+
+@pytest.fixture
+def db_session(db_engine):
+    """Create a test database session."""
+    SessionLocal = sessionmaker(bind=db_engine)
     session = SessionLocal()
     yield session
     session.close()
 
 
+def _kinds(statements):
+    """The SQL verb of each recorded statement."""
+    return [statement.split()[0] for statement in statements]
+
+
 class TestWorkflowDAO:
     def test_create_workflow(self, db_session):
         dao = WorkflowDAO(db_session)
@@ -35,6 +55,43 @@ class TestWorkflowDAO:
         assert created.name == "Test"
         assert created.status == WorkflowStatus.INIT
 
+    def test_create_does_not_reload_row(self, db_session, sql_counter):
+        dao = WorkflowDAO(db_session)
+        with sql_counter(db_session.get_bind()) as statements:
+            created = dao.create(Workflow(name="Test", status=WorkflowStatus.INIT))
+            assert (created.id, created.retries) == (1, 0)
+            assert created.created_at.tzinfo is None  # same form a query returns
+        assert _kinds(statements) == ["INSERT"]
+
+    def test_create_many_only_inserts_in_input_order(self, db_session, sql_counter):
+        dao = WorkflowDAO(db_session)
+        with sql_counter(db_session.get_bind()) as statements:
+            created = dao.create_many([{"name": f"W{i}", "config": {"i": i}} for i in range(3)])
+        # SQLite can't order a batched RETURNING, so it gets one INSERT per row and nothing else
+        assert set(_kinds(statements)) == {"INSERT"}
+        assert [(w.name, w.config, w.status) for w in created] == [
+            ("W0", {"i": 0}, WorkflowStatus.INIT),
+            ("W1", {"i": 1}, WorkflowStatus.INIT),
+            ("W2", {"i": 2}, WorkflowStatus.INIT),
+        ]
+        assert dao.create_many([]) == []
+
+    def test_status_column_rejects_unknown_values(self, db_session):
+        from sqlalchemy import text
+        from sqlalchemy.exc import IntegrityError
+        with pytest.raises(IntegrityError):
+            db_session.execute(text(
+                "INSERT INTO workflows (name, status, current_state, retries, created_at, updated_at) "
+                "VALUES ('W', 'BOGUS', 'INIT', 0, '2024-01-01', '2024-01-01')"
+            ))
+
+    def test_workflow_exists(self, db_session):
+        dao = WorkflowDAO(db_session)
+        created = dao.create(Workflow(name="Test", status=WorkflowStatus.INIT))
+        
+        assert dao.exists(created.id) is True
+        assert dao.exists(created.id + 1) is False
+
     def test_get_workflow(self, db_session):
         dao = WorkflowDAO(db_session)
         workflow = Workflow(name="Test", status=WorkflowStatus.INIT)
@@ -56,23 +113,91 @@ class TestWorkflowDAO:
         fetched = dao.get_by_id(created.id)
         assert fetched.name == "Updated"
 
+    def test_update_does_not_reload_row(self, db_session, sql_counter):
+        dao = WorkflowDAO(db_session)
+        created = dao.create(Workflow(name="Test", status=WorkflowStatus.INIT))
+        with sql_counter(db_session.get_bind()) as statements:
+            updated = dao.update(created.id, {"status": WorkflowStatus.PREPARE})
+            assert (updated.status, updated.name) == (WorkflowStatus.PREPARE, "Test")
+            assert updated.updated_at >= created.created_at
+        assert _kinds(statements) == ["UPDATE"]
+
+    def test_update_skips_excluded_status_and_unknown_keys(self, db_session):
+        dao = WorkflowDAO(db_session)
+        created = dao.create(Workflow(name="Test", status=WorkflowStatus.EXECUTE))
+        
+        assert dao.update(created.id, {"name": "Renamed"}, exclude_statuses=[WorkflowStatus.EXECUTE]) is None
+        assert dao.update(created.id + 1, {"name": "Renamed"}) is None
+        
+        updated = dao.update(created.id, {"name": "Renamed", "id": 99, "unknown": 1})
+        assert (updated.id, updated.name) == (created.id, "Renamed")
+
     def test_delete_workflow(self, db_session):
         dao = WorkflowDAO(db_session)
         workflow = Workflow(name="Test", status=WorkflowStatus.INIT)
         created = dao.create(workflow)
         
+        db_session.add(Task(workflow_id=created.id, name="T1", task_type="test"))
+        db_session.commit()
+        
+        assert dao.delete(created.id, exclude_statuses=[WorkflowStatus.INIT]) is False
         assert dao.delete(created.id) is True
         assert dao.get_by_id(created.id) is None
+        assert db_session.query(Task).count() == 0
+        assert dao.delete(created.id) is False
 
     def test_list_workflows(self, db_session):
         dao = WorkflowDAO(db_session)
-        for i in range(5):
-            dao.create(Workflow(name=f"Workflow {i}", status=WorkflowStatus.INIT))
-            
+        dao.create_many([{"name": f"Workflow {i}", "status": WorkflowStatus.INIT} for i in range(5)])
+        
         workflows = dao.list_workflows(skip=1, limit=2)
         assert len(workflows) == 2
         assert workflows[0].name == "Workflow 1"
 
+    def test_list_workflow_summaries(self, db_session):
+        dao = WorkflowDAO(db_session)
+        dao.create(Workflow(name="W1", status=WorkflowStatus.INIT, current_state="INIT"))
+        dao.create(Workflow(name="W2", status=WorkflowStatus.COMPLETE, current_state="COMPLETE"))
+        
+        rows = dao.list_summary()
+        assert [tuple(row) for row in rows] == [
+            (1, "W1", WorkflowStatus.INIT, "INIT"),
+            (2, "W2", WorkflowStatus.COMPLETE, "COMPLETE"),
+        ]
+        
+        rows = dao.list_summary(status=WorkflowStatus.COMPLETE)
+        assert len(rows) == 1
+        assert rows[0].name == "W2"
+        assert [row.name for row in dao.list_summary(after_id=1)] == ["W2"]
+
+    def test_strict_list_refuses_lazy_loads(self, db_session, sql_counter):
+        dao = WorkflowDAO(db_session)
+        dao.create_many([{"name": f"W{i}"} for i in range(3)])
+        db_session.expunge_all()
+        with sql_counter(db_session.get_bind()) as statements:
+            workflows = dao.list_workflows(strict=True)
+            assert [w.name for w in workflows] == ["W0", "W1", "W2"]
+            with pytest.raises(InvalidRequestError):
+                workflows[0].transitions
+        assert _kinds(statements) == ["SELECT"]
+
+    def test_list_workflows_by_status(self, db_session):
+        dao = WorkflowDAO(db_session)
+        dao.create_many([
+            {"name": f"Workflow {i}", "status": WorkflowStatus.COMPLETE if i % 2 else WorkflowStatus.INIT}
+            for i in range(6)
+        ])
+        
+        workflows = dao.list_workflows(skip=1, limit=2, status=WorkflowStatus.COMPLETE)
+        assert [w.name for w in workflows] == ["Workflow 3", "Workflow 5"]
+        
+        workflows = dao.list_workflows(limit=2, status=WorkflowStatus.COMPLETE, after_id=workflows[0].id)
+        assert [w.name for w in workflows] == ["Workflow 5"]
+        
+        rows = dao.list_rows(skip=1, limit=2, status=WorkflowStatus.COMPLETE)
+        assert [row["name"] for row in rows] == ["Workflow 3", "Workflow 5"]
+        assert rows[0]["status"] == WorkflowStatus.COMPLETE
+
     def test_count_workflows(self, db_session):
         dao = WorkflowDAO(db_session)
         dao.create(Workflow(name="W1", status=WorkflowStatus.INIT))
@@ -83,6 +208,127 @@ class TestWorkflowDAO:
         assert dao.count(WorkflowStatus.INIT) == 2
         assert dao.count(WorkflowStatus.COMPLETE) == 1
 
+    def test_count_by_status(self, db_session):
+        dao = WorkflowDAO(db_session)
+        dao.create(Workflow(name="W1", status=WorkflowStatus.INIT))
+        dao.create(Workflow(name="W2", status=WorkflowStatus.INIT))
+        dao.create(Workflow(name="W3", status=WorkflowStatus.FAILED))
+        
+        counts = dao.count_by_status()
+        assert counts[WorkflowStatus.INIT] == 2
+        assert counts[WorkflowStatus.FAILED] == 1
+        assert counts[WorkflowStatus.COMPLETE] == 0
+        assert len(counts) == len(WorkflowStatus)
+
+    def test_list_active_ids(self, db_session):
+        dao = WorkflowDAO(db_session)
+        active = dao.create(Workflow(name="W1", status=WorkflowStatus.EXECUTE))
+        dao.create(Workflow(name="W2", status=WorkflowStatus.COMPLETE))
+        pending = dao.create(Workflow(name="W3", status=WorkflowStatus.INIT))
+        
+        assert dao.list_active_ids() == [active.id, pending.id]
+        
+        plan = db_session.connection().exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id FROM workflows "
+            "WHERE status IN ('INIT', 'PREPARE', 'EXECUTE', 'VALIDATE')"
+        ).all()
+        assert "ix_workflows_active_status" in plan[0][3]
+
+    def test_get_full_workflow(self, db_session):
+        dao = WorkflowDAO(db_session)
+        wf = dao.create(Workflow(name="W1", status=WorkflowStatus.INIT))
+        
+        transition_dao = WorkflowTransitionDAO(db_session)
+        transition_dao.create(WorkflowTransition(workflow_id=wf.id, from_state="INIT", to_state="PREPARE", trigger="prepare"))
+        transition_dao.create(WorkflowTransition(workflow_id=wf.id, from_state="PREPARE", to_state="EXECUTE", trigger="execute"))
+        
+        fetched = dao.get_full(wf.id)
+        assert [t.to_state for t in fetched.transitions] == ["PREPARE", "EXECUTE"]
+        assert dao.get_full(999) is None
+
+
+    def test_reset_to_init_loads_children_in_batches(self, db_session, sql_counter):
+        dao = WorkflowDAO(db_session)
+        wf = dao.create(Workflow(name="W1", status=WorkflowStatus.FAILED))
+        db_session.add_all([
+            WorkflowTransition(workflow_id=wf.id, from_state="INIT", to_state="FAILED", trigger="fail"),
+            Task(workflow_id=wf.id, name="T1", task_type="test"),
+        ])
+        db_session.commit()
+        workflow_id = wf.id
+        db_session.expunge_all()
+        
+        with sql_counter(db_session.get_bind()) as statements:
+            reset = dao.reset_to_init(workflow_id, [WorkflowStatus.FAILED], include_children=True)
+            assert _kinds(statements) == ["UPDATE", "SELECT", "SELECT"]
+            
+            assert reset.status == WorkflowStatus.INIT
+            assert [t.to_state for t in reset.transitions] == ["FAILED"]
+            assert [t.name for t in reset.tasks] == ["T1"]
+        assert len(statements) == 3
+        assert dao.reset_to_init(workflow_id, [WorkflowStatus.FAILED]) is None
+
+
+    def test_archive_terminal_moves_old_finished_workflows(self, db_session):
+        from datetime import datetime, timedelta
+        dao = WorkflowDAO(db_session)
+        old = datetime(2024, 1, 1)
+        done, running, recent = dao.create_many([
+            {"name": "Done", "status": WorkflowStatus.COMPLETE, "updated_at": old},
+            {"name": "Running", "status": WorkflowStatus.EXECUTE, "updated_at": old},
+            {"name": "Recent", "status": WorkflowStatus.FAILED},
+        ])
+        done_id = done.id
+        db_session.add_all([
+            Task(workflow_id=done_id, name="T1", task_type="test", status=TaskStatus.COMPLETED),
+            WorkflowTransition(workflow_id=done_id, from_state="VALIDATE", to_state="COMPLETE", trigger="complete"),
+        ])
+        db_session.commit()
+        
+        assert dao.archive_terminal(old + timedelta(days=1)) == 1
+        assert dao.archive_terminal(old + timedelta(days=1)) == 0
+        
+        assert [w.name for w in dao.list_workflows()] == ["Running", "Recent"]
+        assert db_session.query(Task).count() == 0
+        assert db_session.query(WorkflowTransition).count() == 0
+        archived = db_session.get(WorkflowArchive, done_id)
+        assert (archived.name, archived.status, archived.updated_at) == ("Done", WorkflowStatus.COMPLETE, old)
+        assert [(t["name"], t["status"]) for t in archived.tasks] == [("T1", "completed")]
+        assert [t["to_state"] for t in archived.transitions] == ["COMPLETE"]
+
+    def test_archive_terminal_keeps_workflow_revived_meanwhile(self, db_session):
+        from datetime import datetime, timedelta
+        from sqlalchemy import event
+        dao = WorkflowDAO(db_session)
+        old = datetime(2024, 1, 1)
+        failed, done = dao.create_many([
+            {"name": "Failed", "status": WorkflowStatus.FAILED, "updated_at": old},
+            {"name": "Done", "status": WorkflowStatus.COMPLETE, "updated_at": old},
+        ])
+        failed_id, done_id = failed.id, done.id
+        db_session.add(Task(workflow_id=failed_id, name="T1", task_type="test", status=TaskStatus.FAILED))
+        db_session.commit()
+        
+        # A start resets the failed workflow after it was picked, before the DELETE
+        def restart(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("SELECT") and "FROM tasks" in statement:
+                cursor.execute(
+                    "UPDATE workflows SET status = 'INIT', updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (failed_id,)
+                )
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", restart)
+        try:
+            assert dao.archive_terminal(old + timedelta(days=1)) == 1
+        finally:
+            event.remove(engine, "before_cursor_execute", restart)
+        
+        db_session.expire_all()
+        assert db_session.get(Workflow, failed_id).status == WorkflowStatus.INIT
+        assert db_session.query(Task).filter(Task.workflow_id == failed_id).count() == 1
+        assert db_session.get(WorkflowArchive, failed_id) is None
+        assert db_session.get(WorkflowArchive, done_id).name == "Done"
+
 
 class TestTaskDAO:
     def test_create_task(self, db_session):
@@ -113,16 +359,44 @@ class TestTaskDAO:
         tasks_w2 = dao.get_by_workflow_id(wf2.id)
         assert len(tasks_w2) == 1
 
+    def test_create_many_keeps_input_order(self, db_session):
+        wf = WorkflowDAO(db_session).create(Workflow(name="W1", status=WorkflowStatus.INIT))
+        
+        dao = TaskDAO(db_session)
+        names = [f"T{i}" for i in range(5)]
+        created = dao.create_many([
+            {"workflow_id": wf.id, "name": name, "status": TaskStatus.PENDING, "task_type": "sleep"}
+            for name in names
+        ])
+        assert [t.name for t in created] == names
+        assert dao.create_many([]) == []
+
     def test_list_tasks(self, db_session):
         wf_dao = WorkflowDAO(db_session)
         wf = wf_dao.create(Workflow(name="W1", status=WorkflowStatus.INIT))
         
         dao = TaskDAO(db_session)
-        for i in range(5):
-            dao.create(Task(workflow_id=wf.id, name=f"T{i}", status=TaskStatus.PENDING, task_type="sleep"))
-            
+        dao.create_many([
+            {"workflow_id": wf.id, "name": f"T{i}", "status": TaskStatus.PENDING, "task_type": "sleep"}
+            for i in range(5)
+        ])
+        
         tasks = dao.list_tasks(limit=3)
         assert len(tasks) == 3
+        
+        tasks = dao.list_tasks(limit=3, after_id=tasks[-1].id)
+        assert [t.name for t in tasks] == ["T3", "T4"]
+        assert dao.list_tasks(workflow_id=wf.id, status=TaskStatus.COMPLETED) == []
+        with pytest.raises(InvalidRequestError):
+            dao.list_tasks(limit=1, strict=True)[0].workflow
+        
+        rows = dao.list_summary(limit=2, workflow_id=wf.id)
+        assert [tuple(row) for row in rows] == [
+            (1, wf.id, "T0", "sleep", TaskStatus.PENDING),
+            (2, wf.id, "T1", "sleep", TaskStatus.PENDING),
+        ]
+        assert dao.count() == 5
+        assert dao.count(workflow_id=wf.id, status=TaskStatus.COMPLETED) == 0
 
 
 class TestWorkflowTransitionDAO:
@@ -154,3 +428,35 @@ class TestWorkflowTransitionDAO:
         assert len(transitions) == 2
         assert transitions[0].from_state == "A"
         assert transitions[1].from_state == "B"
+
+    def test_get_transitions_after_cursor(self, db_session):
+        wf_dao = WorkflowDAO(db_session)
+        wf = wf_dao.create(Workflow(name="W1", status=WorkflowStatus.INIT))
+        
+        dao = WorkflowTransitionDAO(db_session)
+        created = [
+            dao.create(WorkflowTransition(workflow_id=wf.id, from_state=state, to_state="X"))
+            for state in "ABCD"
+        ]
+        
+        page = dao.get_by_workflow_id(wf.id, limit=2)
+        assert [t.from_state for t in page] == ["A", "B"]
+        
+        page = dao.get_by_workflow_id(wf.id, after_id=page[-1].id, limit=2)
+        assert [t.from_state for t in page] == ["C", "D"]
+        assert page[-1].id == created[-1].id
+
+    def test_unknown_or_foreign_cursor_gives_empty_page(self, db_session):
+        wf_dao = WorkflowDAO(db_session)
+        wf = wf_dao.create(Workflow(name="W1", status=WorkflowStatus.INIT))
+        other = wf_dao.create(Workflow(name="W2", status=WorkflowStatus.INIT))
+        
+        dao = WorkflowTransitionDAO(db_session)
+        dao.create(WorkflowTransition(workflow_id=wf.id, from_state="A", to_state="B"))
+        foreign = dao.create(WorkflowTransition(workflow_id=other.id, from_state="A", to_state="B"))
+        
+        assert dao.get_by_workflow_id(wf.id, after_id=999) == []
+        assert dao.get_by_workflow_id(wf.id, after_id=foreign.id) == []
+        assert dao.get_rows_by_workflow_id(wf.id, after_id=foreign.id) == []
+        assert not dao.is_cursor(wf.id, foreign.id)
+        assert dao.is_cursor(other.id, foreign.id)
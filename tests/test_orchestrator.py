@@ -1,15 +1,16 @@
 """Unit tests for WorkflowOrchestrator."""
 import pytest
 from datetime import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from src.db import Base, Workflow, Task, WorkflowStatus, TaskStatus
+from src.db import Base, Workflow, WorkflowStatus, TaskStatus, WorkflowTransition
 from src.core import WorkflowOrchestrator, WorkerManager
+from src.db.dao.task_dao import TaskDAO
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def db_engine():
     """Create a test database engine."""
     engine = create_engine(
@@ -21,6 +22,14 @@ def db_engine():
     return engine
 
 
+@pytest.fixture(autouse=True)
+def empty_tables(db_engine):
+    """Empty every table before each test, the schema is only created once per module."""
+    with db_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+
 @pytest.fixture
 def db_session(db_engine):
     """Create a test database session."""
@@ -54,23 +63,16 @@ def sample_workflow(db_session):
 @pytest.fixture
 def sample_tasks(db_session, sample_workflow):
     """Create sample tasks for testing."""
-    tasks = []
-    for i in range(3):
-        task = Task(
-            workflow_id=sample_workflow.id,
-            name=f"Task {i+1}",
-            task_type="sleep",
-            config={"duration": 0.1},
-            status=TaskStatus.PENDING
-        )
-        db_session.add(task)
-        tasks.append(task)
-    
-    db_session.commit()
-    for task in tasks:
-        db_session.refresh(task)
-    
-    return tasks
+    return TaskDAO(db_session).create_many([
+        {
+            "workflow_id": sample_workflow.id,
+            "name": f"Task {i+1}",
+            "task_type": "sleep",
+            "config": {"duration": 0.1},
+            "status": TaskStatus.PENDING
+        }
+        for i in range(3)
+    ])
 
 
 def test_orchestrator_initialization(db_session, sample_workflow):
@@ -98,6 +100,63 @@ def test_orchestrator_state_transitions(db_session, sample_workflow):
     assert sample_workflow.status == WorkflowStatus.EXECUTE
 
 
+def test_invalid_trigger_is_rejected(db_session, sample_workflow):
+    """Test that a trigger not valid from the current state leaves it unchanged."""
+    orchestrator = WorkflowOrchestrator(sample_workflow.id, db_session)
+    
+    assert orchestrator.may_cancel()
+    assert not orchestrator.may_trigger('complete')
+    with pytest.raises(ValueError):
+        orchestrator.complete()
+    assert orchestrator.state == 'INIT'
+    
+    orchestrator.cancel()
+    assert orchestrator.state == 'CANCELLED'
+    assert not orchestrator.may_cancel()
+
+
+def test_transition_is_one_insert_and_one_update(db_engine, db_session, sample_workflow, sql_counter):
+    """Test that a state change is written in one commit without reloading the workflow."""
+    orchestrator = WorkflowOrchestrator(sample_workflow.id, db_session)
+    
+    with sql_counter(db_engine) as statements:
+        orchestrator._transition_to_next_state()
+    
+    assert sorted(statement.split()[0] for statement in statements) == ["INSERT", "UPDATE"]
+    assert orchestrator.workflow.status == WorkflowStatus.PREPARE
+    
+    transition = db_session.query(WorkflowTransition).one()
+    assert transition.to_state == "PREPARE"
+    assert "timestamp" in transition.transition_metadata
+    # One clock reading stamps everything the transition writes
+    assert transition.created_at == orchestrator.workflow.updated_at
+    assert transition.transition_metadata["timestamp"] == f"{orchestrator.workflow.started_at.isoformat()}+00:00"
+    # All of the workflow's timestamps are naive UTC, so they compare with each other
+    assert orchestrator.workflow.started_at.tzinfo is None
+    assert orchestrator.workflow.created_at <= orchestrator.workflow.started_at
+
+
+def test_batched_transitions_are_written_when_run_ends(db_session, sample_workflow, monkeypatch):
+    """Test that batched transitions are buffered until a terminal state."""
+    import dataclasses
+    from src.core import orchestrator as orchestrator_module
+    monkeypatch.setattr(
+        orchestrator_module, "settings",
+        dataclasses.replace(orchestrator_module.settings, batch_transitions=True)
+    )
+    orchestrator = WorkflowOrchestrator(sample_workflow.id, db_session)
+    
+    orchestrator._transition_to_next_state()
+    orchestrator._transition_to_next_state()
+    db_session.refresh(sample_workflow)
+    assert sample_workflow.status == WorkflowStatus.EXECUTE
+    assert db_session.query(WorkflowTransition).count() == 0
+    
+    orchestrator.fail(error="boom")
+    to_states = [t.to_state for t in db_session.query(WorkflowTransition).order_by(WorkflowTransition.created_at)]
+    assert to_states == ["PREPARE", "EXECUTE", "FAILED"]
+
+
 def test_orchestrator_fail_transition(db_session, sample_workflow):
     """Test failure transition."""
     orchestrator = WorkflowOrchestrator(sample_workflow.id, db_session)
@@ -145,6 +204,85 @@ async def test_orchestrator_execution(db_session, sample_workflow, sample_tasks,
         worker_manager.shutdown()
 
 
+@pytest.mark.asyncio
+async def test_orchestrator_stops_when_cancelled(db_session, sample_workflow, session_factory):
+    """Test that a run in progress honours a cancel applied from another session."""
+    import asyncio
+    
+    orchestrator = WorkflowOrchestrator(sample_workflow.id, db_session)
+    worker_manager = WorkerManager(max_workers=2, session_factory=session_factory)
+    
+    try:
+        run = asyncio.create_task(orchestrator.execute_next_step(worker_manager))
+        await asyncio.sleep(0.1)
+        
+        # Cancel while the INIT task is still running in the worker pool
+        other_session = session_factory()
+        WorkflowOrchestrator(sample_workflow.id, other_session).cancel()
+        other_session.close()
+        
+        assert await run is False
+        db_session.refresh(sample_workflow)
+        assert sample_workflow.status == WorkflowStatus.CANCELLED
+        assert sample_workflow.current_state == "CANCELLED"
+    
+    finally:
+        worker_manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancel_between_check_and_advance_is_kept(db_session, sample_workflow, session_factory, monkeypatch):
+    """Test that a cancel committed after the cancel check isn't overwritten by the advance."""
+    orchestrator = WorkflowOrchestrator(sample_workflow.id, db_session)
+    worker_manager = WorkerManager(max_workers=2, session_factory=session_factory)
+    check = orchestrator._cancel_requested
+    
+    def cancel_after_check():
+        requested = check()
+        other_session = session_factory()
+        WorkflowOrchestrator(sample_workflow.id, other_session).cancel()
+        other_session.close()
+        return requested
+    
+    monkeypatch.setattr(orchestrator, "_cancel_requested", cancel_after_check)
+    
+    try:
+        assert await orchestrator.execute_next_step(worker_manager) is False
+        assert orchestrator.state == "CANCELLED"
+        
+        db_session.refresh(sample_workflow)
+        assert sample_workflow.status == WorkflowStatus.CANCELLED
+        assert sample_workflow.current_state == "CANCELLED"
+        to_states = [t.to_state for t in db_session.query(WorkflowTransition)]
+        assert to_states == ["CANCELLED"]
+    
+    finally:
+        worker_manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_step_keeps_queries_off_event_loop(db_engine, db_session, sample_workflow, session_factory):
+    """Test that a step's workflow queries run in threads, not on the event loop."""
+    import threading
+    
+    orchestrator = WorkflowOrchestrator(sample_workflow.id, db_session)
+    worker_manager = WorkerManager(max_workers=2, session_factory=session_factory)
+    
+    loop_thread = threading.get_ident()
+    threads = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        threads.append(threading.get_ident())
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        assert await orchestrator.execute_next_step(worker_manager) is True
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+        worker_manager.shutdown()
+    
+    assert threads
+    assert loop_thread not in threads
+
+
 def test_orchestrator_get_status(db_session, sample_workflow, sample_tasks):
     """Test getting workflow status."""
     orchestrator = WorkflowOrchestrator(sample_workflow.id, db_session)
@@ -155,3 +293,35 @@ def test_orchestrator_get_status(db_session, sample_workflow, sample_tasks):
     assert status["name"] == "Test Workflow"
     assert status["status"] == "INIT"
     assert status["current_state"] == "INIT"
+
+
+def test_get_status_loads_history_with_workflow(db_engine, db_session, sample_workflow, sql_counter):
+    """Test that get_status reads the workflow and its whole history in one batch."""
+    orchestrator = WorkflowOrchestrator(sample_workflow.id, db_session)
+    orchestrator._transition_to_next_state()
+    orchestrator._transition_to_next_state()
+    
+    with sql_counter(db_engine) as statements:
+        status = orchestrator.get_status()
+        to_states = [t.to_state for t in status["transitions"]]
+    
+    assert to_states == ["PREPARE", "EXECUTE"]
+    # The workflow row plus one selectinload query, no per-transition loads
+    assert len(statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_state_notifier_wakes_waiter():
+    """Test that a transition notification wakes a long-poll waiter."""
+    import asyncio
+    import threading
+    from src.core import WorkflowStateNotifier
+    
+    notifier = WorkflowStateNotifier()
+    waiter = notifier.subscribe(1)
+    
+    # Transitions may be logged from a worker thread
+    threading.Thread(target=notifier.notify, args=(1,)).start()
+    
+    await asyncio.wait_for(waiter, timeout=1.0)
+    assert waiter.done()
@@ -1,78 +1,104 @@
 """Unit tests for WorkerManager."""
 import pytest
 import time
-from sqlalchemy import create_engine
+from collections import namedtuple
+from concurrent.futures import FIRST_EXCEPTION, as_completed, wait
+from sqlalchemy import create_engine, insert, select
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 
 from src.db import Base, Workflow, Task, WorkflowStatus, TaskStatus
 from src.core import WorkerManager
+from src.db.dao.task_dao import TaskDAO
 
 
-@pytest.fixture
-def db_engine(tmp_path):
+# Sleep of the tasks these tests run; short, but long enough to dwarf scheduling overhead
+DURATION = 0.05
+# Shared by every sleep task row; the JSON column only reads it when binding
+SLEEP_CONFIG = {"duration": DURATION}
+# Longest any test waits for its futures; a hung task fails the test after this
+TIMEOUT = 1.0
+
+
+@pytest.fixture(scope="module")
+def db_engine(tmp_path_factory, fast_sqlite):
     """Create a test database engine."""
     # Use a file-based database for multi-threaded tests to avoid
     # sqlite3 threading issues with shared in-memory connections
-    db_path = tmp_path / "test_worker.db"
-    engine = create_engine(
+    db_path = tmp_path_factory.mktemp("worker") / "test_worker.db"
+    engine = fast_sqlite(create_engine(
         f"sqlite:///{db_path}",
         connect_args={"timeout": 30}
-    )
+    ))
     Base.metadata.create_all(engine)
-    return engine
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def empty_tables(db_engine):
+    """Empty every table before each test, the schema is only created once per module."""
+    with db_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
 
 
 @pytest.fixture
 def db_session(db_engine):
     """Create a test database session."""
-    SessionLocal = sessionmaker(bind=db_engine)
+    # Rows the test just committed stay loaded; worker results are read with explicit selects
+    SessionLocal = sessionmaker(bind=db_engine, autoflush=False, expire_on_commit=False)
     session = SessionLocal()
     yield session
     session.close()
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def session_factory(db_engine):
-    """Create a session factory for the test database."""
-    return sessionmaker(bind=db_engine)
+    """Create a session factory for the test database, configured like `SessionLocal`."""
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def worker_manager(session_factory):
-    """Create a worker manager instance."""
+    """Create a worker manager shared by the module, its threads are started once."""
     manager = WorkerManager(max_workers=3, session_factory=session_factory)
     yield manager
     manager.shutdown()
 
 
-@pytest.fixture
-def sample_workflow(db_session):
-    """Create a sample workflow."""
-    workflow = Workflow(
-        name="Test Workflow",
-        status=WorkflowStatus.INIT
-    )
-    db_session.add(workflow)
-    db_session.commit()
-    db_session.refresh(workflow)
-    return workflow
+def _run_tasks(manager, session, task_ids):
+    """
+    Submit tasks, wait until all succeed (or the first one raises) and
+    return their statuses by task ID, read back in one query.
+    """
+    futures = [manager.submit_task(task_id, session) for task_id in task_ids]
+    done, not_done = wait(futures, timeout=TIMEOUT, return_when=FIRST_EXCEPTION)
+    assert not not_done
+    assert all(future.result() is True for future in done)
+    return dict(session.execute(select(Task.id, Task.status).where(Task.id.in_(task_ids))).all())
+
+
+# IDs of the rows created by the `sample_ids` fixture
+SampleIds = namedtuple("SampleIds", "workflow_id task_id")
 
 
 @pytest.fixture
-def sample_task(db_session, sample_workflow):
-    """Create a sample task."""
-    task = Task(
-        workflow_id=sample_workflow.id,
-        name="Test Task",
-        task_type="sleep",
-        config={"duration": 0.1},
-        status=TaskStatus.PENDING
+def sample_ids(db_session):
+    """Insert a workflow and a task that finishes almost at once, in one transaction."""
+    workflow_id = db_session.scalar(
+        insert(Workflow).values(name="Test Workflow", status=WorkflowStatus.INIT).returning(Workflow.id)
+    )
+    task_id = db_session.scalar(
+        insert(Task).values(
+            workflow_id=workflow_id,
+            name="Test Task",
+            task_type="compute",
+            config={"iterations": 1},
+            status=TaskStatus.PENDING
+        ).returning(Task.id)
     )
-    db_session.add(task)
     db_session.commit()
-    db_session.refresh(task)
-    return task
+    return SampleIds(workflow_id, task_id)
 
 
 def test_worker_manager_initialization(session_factory):
@@ -81,77 +107,107 @@ def test_worker_manager_initialization(session_factory):
     
     assert manager.max_workers == 5
     assert manager.get_active_count() == 0
+    assert manager.get_queue_size() == 0
     
     manager.shutdown()
 
 
-def test_submit_task(worker_manager, db_session, sample_task):
-    """Test submitting a task for execution."""
-    future = worker_manager.submit_task(sample_task.id, db_session)
+def test_queue_size_counts_waiting_work(session_factory):
+    """Test that work waiting for a busy pool shows up in the queue size."""
+    import threading
+    manager = WorkerManager(max_workers=1, session_factory=session_factory)
+    release = threading.Event()
     
-    assert future is not None
-    result = future.result(timeout=5)
-    assert result is True
+    manager.executor.submit(release.wait)
+    waiting = manager.executor.submit(lambda: None)
+    assert manager.get_queue_size() == 1
     
-    # Verify task was updated
-    db_session.refresh(sample_task)
-    assert sample_task.status == TaskStatus.COMPLETED
+    release.set()
+    waiting.result(timeout=TIMEOUT)
+    assert manager.get_queue_size() == 0
+    manager.shutdown()
 
 
-def test_parallel_task_execution(worker_manager, db_session, sample_workflow):
-    """Test parallel execution of multiple tasks."""
-    # Create multiple tasks
-    tasks = []
-    for i in range(5):
-        task = Task(
-            workflow_id=sample_workflow.id,
-            name=f"Task {i+1}",
-            task_type="sleep",
-            config={"duration": 0.2},
-            status=TaskStatus.PENDING
-        )
+def test_worker_thread_reuses_its_session(session_factory, db_session, sample_ids, monkeypatch):
+    """Test that a worker thread keeps one session across tasks."""
+    from sqlalchemy.orm import object_session
+    manager = WorkerManager(max_workers=1, session_factory=session_factory)
+    sessions = []
+    monkeypatch.setattr(manager, "_run_task_logic", lambda task: sessions.append(object_session(task)) or {})
+    
+    for name in ("First", "Second"):
+        task = Task(workflow_id=sample_ids.workflow_id, name=name, task_type="sleep", status=TaskStatus.PENDING)
         db_session.add(task)
-        tasks.append(task)
+        db_session.commit()
+        assert manager.submit_task(task.id, db_session).result(timeout=TIMEOUT) is True
     
-    db_session.commit()
-    for task in tasks:
-        db_session.refresh(task)
+    assert len(sessions) == 2
+    assert sessions[0] is sessions[1]
+    manager.shutdown()
+
+
+def test_task_run_commits_twice(db_engine, worker_manager, db_session, sample_ids, sql_counter):
+    """Test that a task run writes RUNNING and its outcome, and nothing else."""
+    # Count only the worker's statements, submit_task's lookup finds this in the identity map
+    task = db_session.get(Task, sample_ids.task_id)
+    with sql_counter(db_engine) as statements:
+        assert worker_manager.submit_task(task.id, db_session).result(timeout=TIMEOUT) is True
     
-    # Submit all tasks
-    start_time = time.time()
-    futures = [worker_manager.submit_task(task.id, db_session) for task in tasks]
+    kinds = [statement.split()[0] for statement in statements]
+    assert kinds.count("UPDATE") == 2
+    assert kinds.count("SELECT") == 1
+
+
+def test_submit_task(worker_manager, db_session, sample_ids):
+    """Test submitting a task for execution."""
+    statuses = _run_tasks(worker_manager, db_session, [sample_ids.task_id])
     
-    # Wait for completion
-    for future in futures:
-        future.result(timeout=10)
+    # Verify task was updated
+    assert statuses == {sample_ids.task_id: TaskStatus.COMPLETED}
+
+
+def test_parallel_task_execution(worker_manager, db_session, sample_ids):
+    """Test parallel execution of multiple tasks."""
+    # Create multiple tasks in one transaction, only their IDs are needed
+    task_ids = [task.id for task in TaskDAO(db_session).create_many([
+        {
+            "workflow_id": sample_ids.workflow_id,
+            "name": f"Task {i+1}",
+            "task_type": "sleep",
+            "config": SLEEP_CONFIG,
+            "status": TaskStatus.PENDING
+        }
+        for i in range(5)
+    ])]
     
-    end_time = time.time()
+    # Run all tasks; the status read afterwards is a single query
+    started = time.perf_counter()
+    statuses = _run_tasks(worker_manager, db_session, task_ids)
+    elapsed = time.perf_counter() - started
     
     # Should complete in less time than sequential execution
-    # (5 tasks * 0.2s = 1s sequential, but with 3 workers should be ~0.4s)
-    assert end_time - start_time < 0.8
+    # (5 tasks run one after another take 5 * DURATION, 3 workers need two rounds)
+    assert elapsed < 4 * DURATION
     
     # Verify all tasks completed
-    for task in tasks:
-        db_session.refresh(task)
-        assert task.status == TaskStatus.COMPLETED
+    assert statuses == dict.fromkeys(task_ids, TaskStatus.COMPLETED)
 
 
-def test_task_types(worker_manager, db_session, sample_workflow):
+def test_task_types(worker_manager, db_session, sample_ids):
     """Test different task types."""
     # Sleep task
     sleep_task = Task(
-        workflow_id=sample_workflow.id,
+        workflow_id=sample_ids.workflow_id,
         name="Sleep Task",
         task_type="sleep",
-        config={"duration": 0.1},
+        config=SLEEP_CONFIG,
         status=TaskStatus.PENDING
     )
     db_session.add(sleep_task)
     
     # Compute task
     compute_task = Task(
-        workflow_id=sample_workflow.id,
+        workflow_id=sample_ids.workflow_id,
         name="Compute Task",
         task_type="compute",
         config={"iterations": 1000},
@@ -160,48 +216,81 @@ def test_task_types(worker_manager, db_session, sample_workflow):
     db_session.add(compute_task)
     
     db_session.commit()
-    db_session.refresh(sleep_task)
-    db_session.refresh(compute_task)
     
     # Execute tasks
-    future1 = worker_manager.submit_task(sleep_task.id, db_session)
-    future2 = worker_manager.submit_task(compute_task.id, db_session)
-    
-    assert future1.result(timeout=5) is True
-    assert future2.result(timeout=5) is True
+    statuses = _run_tasks(worker_manager, db_session, [sleep_task.id, compute_task.id])
     
     # Check results
-    db_session.refresh(sleep_task)
-    db_session.refresh(compute_task)
-    
-    assert sleep_task.status == TaskStatus.COMPLETED
-    assert compute_task.status == TaskStatus.COMPLETED
-    assert compute_task.result is not None
+    assert statuses == dict.fromkeys([sleep_task.id, compute_task.id], TaskStatus.COMPLETED)
+    compute_result = db_session.scalar(select(Task.result).where(Task.id == compute_task.id))
+    assert compute_result == {"status": "success", "result": sum(i * i for i in range(1000))}
 
 
-def test_task_failure_handling(worker_manager, db_session, sample_workflow):
+def test_task_failure_handling(worker_manager, db_session, sample_ids, monkeypatch):
     """Test handling of task failures."""
-    # Create a task that will fail (invalid task type that raises error)
-    from unittest.mock import patch
-    
     task = Task(
-        workflow_id=sample_workflow.id,
+        workflow_id=sample_ids.workflow_id,
         name="Failing Task",
-        task_type="sleep",
-        config={"duration": 0.1},
+        task_type="compute",
+        config={"iterations": 1},
         status=TaskStatus.PENDING
     )
     db_session.add(task)
     db_session.commit()
-    db_session.refresh(task)
     
-    # Mock the task execution to raise an error
-    with patch.object(worker_manager, '_run_task_logic', side_effect=Exception("Test error")):
-        future = worker_manager.submit_task(task.id, db_session)
-        result = future.result(timeout=5)
+    # Make the task execution raise an error; monkeypatch restores the shared manager afterwards
+    def fail(task):
+        raise Exception("Test error")
+    monkeypatch.setattr(worker_manager, "_run_task_logic", fail)
+    
+    result = worker_manager.submit_task(task.id, db_session).result(timeout=TIMEOUT)
     
     assert result is False
     
-    db_session.refresh(task)
-    assert task.status == TaskStatus.FAILED
-    assert "Test error" in task.error_message
+    task_status, error_message = db_session.execute(
+        select(Task.status, Task.error_message).where(Task.id == task.id)
+    ).one()
+    assert task_status == TaskStatus.FAILED
+    assert "Test error" in error_message
+
+
+async def test_state_tasks_run_without_worker_threads(worker_manager, monkeypatch):
+    """Test that built-in state tasks wait on the event loop, not in the pool."""
+    monkeypatch.setattr(WorkerManager, "SIMULATED_DURATIONS", {"initialize": 0.01})
+    submitted = []
+    monkeypatch.setattr(worker_manager.executor, "submit", lambda *args: submitted.append(args))
+    
+    result = await worker_manager.run_workflow_task(1, "initialize", {"workflow_config": {}})
+    assert result["success"] is True
+    assert result["result"]["status"] == "initialized"
+    assert submitted == []
+    
+    failed = await worker_manager.run_workflow_task(
+        1, "initialize", {"workflow_config": {"simulate_failure": True}, "retries": 0}
+    )
+    assert failed["success"] is False
+    assert "Simulated failure" in failed["error"]
+
+
+async def test_custom_workflow_tasks_use_thread_pool(worker_manager):
+    """Test that task types without a simulated duration still run in a worker thread."""
+    result = await worker_manager.run_workflow_task(1, "custom", {})
+    assert result["success"] is True
+    assert result["result"]["task_type"] == "custom"
+
+
+def test_finished_work_leaves_active_tasks(session_factory, db_session, sample_ids):
+    """Test that task and workflow futures stop counting as active once done."""
+    # Own manager, it is shut down below
+    manager = WorkerManager(max_workers=3, session_factory=session_factory)
+    futures = [
+        manager.submit_task(sample_ids.task_id, db_session),
+        manager.submit_workflow_task(1, "custom", {}, db_session),
+    ]
+    for future in as_completed(futures, timeout=TIMEOUT):
+        future.result()
+    # Done callbacks run just after the result is published
+    manager.shutdown()
+    
+    assert manager.active_tasks == set()
+    assert manager.get_active_count() == 0